@@ -0,0 +1,4 @@
+"""
+.. module:: benchmarks
+    :synopsis: Benchmark suites of SOAP, see the usage of each submodule.
+"""
@@ -0,0 +1,178 @@
+"""
+.. module:: benchmarks.common
+    :synopsis: Results, summaries and comparisons shared by benchmark suites.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+
+def _git(*args):
+    try:
+        return subprocess.check_output(
+            ('git', ) + args, cwd=ROOT_DIR, stderr=subprocess.DEVNULL,
+            universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def git_commit():
+    """The current commit, suffixed with `-dirty` if the tree has
+    uncommitted changes."""
+    commit = _git('rev-parse', '--short=12', 'HEAD')
+    if commit is None:
+        return None
+    # the exit status of diff-index is 1 if there are changes
+    if _git('diff-index', '--quiet', 'HEAD', '--') is None:
+        commit += '-dirty'
+    return commit
+
+
+def environment():
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def summarize(samples):
+    """Statistical summary of timing `samples`."""
+    samples = sorted(samples)
+    summary = {
+        'samples': len(samples),
+        'min': samples[0],
+        'max': samples[-1],
+        'mean': statistics.mean(samples),
+        'median': statistics.median(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+    # interquartile range, robust to outliers from system noise
+    if len(samples) >= 4:
+        half = len(samples) // 2
+        summary['iqr'] = (
+            statistics.median(samples[-half:]) -
+            statistics.median(samples[:half]))
+    return summary
+
+
+def format_time(seconds):
+    for unit, scale in [('s', 1), ('ms', 1e-3), ('us', 1e-6)]:
+        if seconds >= scale:
+            return '{:.3g} {}'.format(seconds / scale, unit)
+    return '{:.3g} ns'.format(seconds / 1e-9)
+
+
+def results_path(suite, commit=None):
+    return os.path.join(
+        RESULTS_DIR, '{}-{}.json'.format(suite, commit or git_commit()))
+
+
+def save_results(suite, benchmarks, settings=None, file_name=None):
+    """Saves `benchmarks` of `suite` with the environment and the
+    `settings` of the runs, by default in `RESULTS_DIR` named by the current
+    commit."""
+    file_name = file_name or results_path(suite)
+    directory = os.path.dirname(file_name)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_name, 'w') as f:
+        json.dump({
+            'suite': suite,
+            'environment': environment(),
+            'settings': settings or {},
+            'benchmarks': benchmarks,
+        }, f, indent=4, sort_keys=True)
+    return file_name
+
+
+def load_results(suite, file_or_commit):
+    """Loads results from a file, or the results of `suite` saved for a
+    commit, which are those saved from a dirty tree of the commit if none
+    were saved from a clean one."""
+    file_name = file_or_commit
+    if not os.path.exists(file_name):
+        commit = _git('rev-parse', '--short=12', file_or_commit)
+        file_name = results_path(suite, commit or file_or_commit)
+        dirty_file_name = results_path(
+            suite, (commit or file_or_commit) + '-dirty')
+        if not os.path.exists(file_name) and os.path.exists(dirty_file_name):
+            file_name = dirty_file_name
+    try:
+        with open(file_name) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        sys.exit('No results found for {!r}.'.format(file_or_commit))
+
+
+def compare(old, new, metrics, threshold):
+    """Compares benchmarks in results `old` and `new`.
+
+    :param metrics: A list of metric names and whether higher values are
+        better, for which relative changes beyond `threshold` in the worse
+        direction are regressions.
+    :type metrics: list of (str, bool)
+    :returns: Rows of benchmark name, metric name, old value, new value and
+        whether it regresses.
+    """
+    rows = []
+    old_benchmarks = old['benchmarks']
+    new_benchmarks = new['benchmarks']
+    for name in sorted(set(old_benchmarks) | set(new_benchmarks)):
+        old_bench = old_benchmarks.get(name, {})
+        new_bench = new_benchmarks.get(name, {})
+        old_status = old_bench.get('status', 'missing')
+        new_status = new_bench.get('status', 'missing')
+        if old_status != 'ok' or new_status != 'ok':
+            regressed = old_status == 'ok' and new_status != 'ok'
+            rows.append((name, 'status', old_status, new_status, regressed))
+            continue
+        for metric, higher_is_better in metrics:
+            old_value = old_bench.get(metric)
+            new_value = new_bench.get(metric)
+            if old_value is None or new_value is None:
+                continue
+            if higher_is_better:
+                regressed = new_value < old_value * (1 - threshold)
+            else:
+                regressed = new_value > old_value * (1 + threshold)
+            rows.append((name, metric, old_value, new_value, regressed))
+    return rows
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return '{:.4g}'.format(value)
+    return str(value)
+
+
+def print_comparison(old, new, rows):
+    """Prints compared `rows`, and returns the number of regressions."""
+    print('Old: {}'.format(old['environment']['commit']))
+    print('New: {}'.format(new['environment']['commit']))
+    if old.get('settings') != new.get('settings'):
+        print('Warning: results are from runs with different settings.')
+    print('{:<40}{:<16}{:>12}{:>12}{:>10}'.format(
+        'Benchmark', 'Metric', 'Old', 'New', 'Change'))
+    regressions = 0
+    for name, metric, old_value, new_value, regressed in rows:
+        try:
+            change = '{:+.1%}'.format(new_value / old_value - 1)
+        except (TypeError, ZeroDivisionError):
+            change = ''
+        flag = '  REGRESSION' if regressed else ''
+        regressions += regressed
+        print('{:<40}{:<16}{:>12}{:>12}{:>10}{}'.format(
+            name, metric, _format_value(old_value), _format_value(new_value),
+            change, flag))
+    print('{} regression(s).'.format(regressions))
+    return regressions
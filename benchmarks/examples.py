@@ -0,0 +1,223 @@
+"""
+End-to-end benchmarks, which optimize each example under fixed settings.
+Run from the repository root with `python -m benchmarks.examples`.
+
+Usage:
+    examples run [options] [<file>...]
+    examples run-one [options] <file>
+    examples compare [options] <old> <new>
+    examples (-h | --help)
+
+Commands:
+    run                     Benchmark the examples, by default all of
+                            `examples/*.soap`, each in a fresh process, and
+                            save the results as JSON.
+    run-one                 Benchmark an example in this process, and print
+                            the result as JSON.
+    compare                 Compare two results, given as files or commits
+                            with saved results, and flag regressions.  Exits
+                            with status 1 if there are any.
+
+Options:
+    -h --help               Show this help message.
+    --algorithm=<str>       The optimization algorithm.  [default: partition]
+    --time-budget=<float>   The time budget of optimization in seconds, 0
+                            for no limit.  [default: 0]
+    --multiprocessing       Optimize with worker processes, which are
+                            excluded from the peak RSS.
+    --repeat=<int>          The number of runs of each example, the median
+                            wall time is compared.  [default: 1]
+    --timeout=<float>       Stop an example after this many seconds.
+                            [default: 3600]
+    --hash-seed=<int>       The hash seed of runs, as the order of
+                            exploration and thus the results depend on it.
+                            [default: 0]
+    --output=<file>         The file to save results in, by default
+                            `benchmarks/results/examples-<commit>.json`.
+    --threshold=<float>     The relative change of a metric in the worse
+                            direction which counts as a regression.
+                            [default: 0.1]
+"""
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from docopt import docopt
+
+from benchmarks.common import (
+    ROOT_DIR, compare, load_results, print_comparison, save_results, summarize
+)
+
+
+SUITE = 'examples'
+EXAMPLES_DIR = os.path.join(ROOT_DIR, 'examples')
+# statistics of original programs scaled to 1, up to which frontiers are
+# measured by hypervolume
+HYPERVOLUME_REFERENCE = 2
+COMPARED_METRICS = [
+    ('wall_time', False),
+    ('peak_rss', False),
+    ('hypervolume', True),
+]
+
+
+def _cache_statistics():
+    from soap.common.cache import _cached_funcs
+    functions = {}
+    total_hits = total_misses = 0
+    for func in _cached_funcs:
+        hits, misses, _ = func.cache_info()
+        if not hits and not misses:
+            continue
+        functions[func.__qualname__] = {'hits': hits, 'misses': misses}
+        total_hits += hits
+        total_misses += misses
+    total = total_hits + total_misses
+    return (total_hits / total if total else None), functions
+
+
+def _frontier(emir):
+    from soap.analysis import AnalysisResult, frontier
+    from soap.semantics import BoxState
+    results = emir['results']
+    if all(isinstance(r, AnalysisResult) for r in results):
+        return results
+    # discoverers give expressions
+    return frontier(results, BoxState(emir['inputs']), emir['outputs'])
+
+
+def _hypervolume(original, results):
+    from soap.analysis.core import hypervolume
+    scales = [float(v) or 1.0 for v in original.stats()]
+    points = [
+        [float(v) / s for v, s in zip(r.stats(), scales)] for r in results]
+    reference = [HYPERVOLUME_REFERENCE] * len(scales)
+    return hypervolume(points, reference)
+
+
+def run_one(file_name, args):
+    """Optimizes `file_name` in the current process, and returns its
+    benchmark result."""
+    from soap import logger
+    from soap.context import context
+    from soap.shell.utils import optimize
+
+    logger.set_context(level=logger.levels.off)
+    context.algorithm = args['--algorithm']
+    context.time_budget = float(args['--time-budget'])
+    context.multiprocessing = args['--multiprocessing']
+
+    with open(file_name) as f:
+        source = f.read()
+    start_time = time.time()
+    emir = optimize(source, file_name)
+    wall_time = time.time() - start_time
+
+    results = _frontier(emir)
+    hit_rate, cache = _cache_statistics()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        'status': 'ok',
+        'wall_time': wall_time,
+        'optimize_time': emir['time'],
+        # kilobytes on Linux
+        'peak_rss': usage.ru_maxrss * 1024,
+        'cache_hit_rate': hit_rate,
+        'cache': cache,
+        'frontier_size': len(results),
+        'hypervolume': _hypervolume(emir['original'], results),
+        'original': [float(v) for v in emir['original'].stats()],
+        'frontier': sorted([float(v) for v in r.stats()] for r in results),
+    }
+
+
+def _options(args):
+    options = [
+        '--algorithm={}'.format(args['--algorithm']),
+        '--time-budget={}'.format(args['--time-budget']),
+    ]
+    if args['--multiprocessing']:
+        options.append('--multiprocessing')
+    return options
+
+
+def _run_process(file_name, args):
+    env = dict(os.environ, PYTHONHASHSEED=args['--hash-seed'])
+    command = [
+        sys.executable, '-m', 'benchmarks.examples', 'run-one', file_name,
+    ] + _options(args)
+    try:
+        process = subprocess.run(
+            command, cwd=ROOT_DIR, env=env, timeout=float(args['--timeout']),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout'}
+    if process.returncode != 0:
+        # tracebacks may be printed to either stream
+        output = process.stderr or process.stdout
+        return {'status': 'error', 'output': output[-2000:]}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def _examples(files):
+    if files:
+        return files
+    return sorted(glob.glob(os.path.join(EXAMPLES_DIR, '*.soap')))
+
+
+def run(args):
+    benchmarks = {}
+    repeat = int(args['--repeat'])
+    for file_name in _examples(args['<file>']):
+        name = os.path.splitext(os.path.basename(file_name))[0]
+        print('{}... '.format(name), end='', flush=True)
+        runs = [
+            _run_process(os.path.abspath(file_name), args)
+            for _ in range(repeat)]
+        failed = [r for r in runs if r['status'] != 'ok']
+        if failed:
+            result = failed[0]
+        else:
+            # the frontier is deterministic with a fixed hash seed
+            result = dict(runs[0])
+            summary = summarize([r['wall_time'] for r in runs])
+            result['wall_time'] = summary['median']
+            result['wall_times'] = summary
+            result['peak_rss'] = max(r['peak_rss'] for r in runs)
+        benchmarks[name] = result
+        if result['status'] == 'ok':
+            print('{:.2f}s, {:.0f} MB, frontier {}, hypervolume {:.4g}'.format(
+                result['wall_time'], result['peak_rss'] / 2 ** 20,
+                result['frontier_size'], result['hypervolume']))
+        else:
+            print(result['status'])
+    settings = {
+        key.lstrip('-'): args[key] for key in (
+            '--algorithm', '--time-budget', '--multiprocessing', '--repeat',
+            '--hash-seed')}
+    file_name = save_results(SUITE, benchmarks, settings, args['--output'])
+    print('Results saved in {}.'.format(file_name))
+
+
+def main():
+    args = docopt(__doc__)
+    if args['run-one']:
+        print(json.dumps(run_one(args['<file>'][0], args)))
+    elif args['run']:
+        run(args)
+    elif args['compare']:
+        old = load_results(SUITE, args['<old>'])
+        new = load_results(SUITE, args['<new>'])
+        rows = compare(
+            old, new, COMPARED_METRICS, float(args['--threshold']))
+        if print_comparison(old, new, rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Micro-benchmarks of the inner kernels of analysis and optimization.
+Run from the repository root with `python -m benchmarks.micro`.
+
+Each benchmark is warmed up, then timed in samples of enough calls to last
+at least `--min-time` seconds, so that timer resolution and per-sample
+noise are small relative to the measured time.
+
+Usage:
+    micro run [options] [<name>...]
+    micro compare [options] <old> <new>
+    micro list
+    micro (-h | --help)
+
+Commands:
+    run                     Run the benchmarks, by default all of them, and
+                            save the per-call times as JSON.
+    compare                 Compare two results, given as files or commits
+                            with saved results, and flag regressions in
+                            median times.  Exits with status 1 if there are
+                            any.
+    list                    List the names of benchmarks.
+
+Options:
+    -h --help               Show this help message.
+    --samples=<int>         The number of timed samples.  [default: 20]
+    --min-time=<float>      The minimum duration of a sample in seconds.
+                            [default: 0.1]
+    --output=<file>         The file to save results in, by default
+                            `benchmarks/results/micro-<commit>.json`.
+    --threshold=<float>     The relative increase of median time which
+                            counts as a regression.  [default: 0.1]
+"""
+import collections
+import random
+import sys
+import time
+
+from docopt import docopt
+
+from benchmarks.common import (
+    compare, format_time, load_results, print_comparison, save_results,
+    summarize
+)
+
+
+SUITE = 'micro'
+COMPARED_METRICS = [('median', False)]
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(setup):
+    """Registers a benchmark, `setup` prepares its data and returns the
+    function to time."""
+    BENCHMARKS[setup.__name__] = setup
+    return setup
+
+
+def _variables():
+    from soap.datatype import float_type
+    from soap.expression import Variable
+    return [Variable(name, float_type) for name in 'abcd']
+
+
+def _mid_size_expression():
+    a, b, c, d = _variables()
+    return (
+        (a + b) * (c - d) + (a * c - b * d) * (a + d) +
+        (b - c) * (a * b + c * d))
+
+
+def _state():
+    from soap.semantics import BoxState
+    return BoxState(
+        a=[1.0, 2.0], b=[-1.0, 3.0], c=[0.5, 1.5], d=[2.0, 4.0])
+
+
+@benchmark
+def expression_construction():
+    from soap.expression import BinaryArithExpr, operators
+    a, b, _, _ = _variables()
+    return lambda: BinaryArithExpr(operators.ADD_OP, a, b)
+
+
+@benchmark
+def cached_key():
+    from soap.common import cached
+
+    @cached
+    def identity(expr, state):
+        return expr
+
+    expr, state = _mid_size_expression(), _state()
+    identity(expr, state)
+    # cache hits, which pickle the arguments into keys
+    return lambda: identity(expr, state)
+
+
+@benchmark
+def arith_eval():
+    from soap.semantics.functions.arithmetic import (
+        arith_eval, ArithmeticEvaluator
+    )
+    expr, state = _mid_size_expression(), _state()
+    cache_clear = ArithmeticEvaluator.__call__.cache_clear
+
+    def evaluate():
+        cache_clear()
+        arith_eval(expr, state)
+    return evaluate
+
+
+@benchmark
+def error_semantics_arithmetic():
+    from soap.semantics import ErrorSemantics
+    e1 = ErrorSemantics(['1.2', '2.3'], ['0', '0.1'])
+    e2 = ErrorSemantics(['3.4', '5.6'], ['-0.1', '0.1'])
+    return lambda: (e1 + e2) * e1 - e2 * e2
+
+
+@benchmark
+def recursive_walk():
+    from soap.transformer.arithmetic import ArithTreeTransformer
+    from soap.transformer.core import _recursive_walk, RECURSION_LIMIT
+    a, b, c, d = _variables()
+    expr = (a + b) * (c - d) + a * c
+    rules = ArithTreeTransformer.transform_rules
+
+    def walk():
+        _recursive_walk.cache_clear()
+        _recursive_walk(expr, rules, RECURSION_LIMIT)
+    return walk
+
+
+@benchmark
+def pareto_frontier_10k():
+    from soap.analysis.core import _pareto_frontier
+    rand = random.Random(0)
+    points = [
+        (rand.randint(0, 10000), rand.randint(0, 100), rand.random(),
+         rand.randint(0, 1000), index)
+        for index in range(10000)]
+    return lambda: _pareto_frontier(points)
+
+
+@benchmark
+def rec_init_int_check_50():
+    import networkx
+    from soap.semantics.schedule.ii import rec_init_int_check
+    size = 50
+    graph = networkx.DiGraph()
+    for node in range(size):
+        # edges wrapping around are loop-carried, so that every cycle has a
+        # positive distance
+        for step, latency in [(1, 1), (7, 2)]:
+            graph.add_edge(
+                node, (node + step) % size, latency=latency,
+                distance=int(node + step >= size))
+    # a valid II, which checks all paths
+    return lambda: rec_init_int_check(graph, 1000)
+
+
+@benchmark
+def dependence_vector():
+    from soap.datatype import int_type
+    from soap.expression import (
+        expression_factory, operators, Subscript, Variable
+    )
+    from soap.semantics.error import IntegerInterval
+    from soap.semantics.schedule.distance import dependence_vector
+    x, y = Variable('x', int_type), Variable('y', int_type)
+    source = Subscript(
+        expression_factory(operators.ADD_OP, x, IntegerInterval(2)), y)
+    sink = Subscript(
+        x, expression_factory(operators.SUBTRACT_OP, y, IntegerInterval(1)))
+    iter_slices = [slice(0, 10, 1), slice(1, 11, 1)]
+    return lambda: dependence_vector([x, y], iter_slices, source, sink)
+
+
+@benchmark
+def dependence_graph():
+    from soap.program.graph import DependenceGraph
+    from soap.semantics import label
+    out_label, env = label(
+        _mid_size_expression(), None, None, fusion=False)
+    graph = DependenceGraph(env, [out_label])
+    # the graph is a cached property of flyweight instances
+    build = DependenceGraph.graph.func
+    return lambda: build(graph)
+
+
+def _time(func, loops):
+    loop_range = range(loops)
+    start = time.perf_counter()
+    for _ in loop_range:
+        func()
+    return time.perf_counter() - start
+
+
+def _calibrate(func, min_time):
+    loops = 1
+    while True:
+        elapsed = _time(func, loops)
+        if elapsed >= min_time:
+            return loops
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+
+def measure(func, samples, min_time):
+    """Times `func`, and returns the summary of per-call times."""
+    func()
+    loops = _calibrate(func, min_time)
+    times = [_time(func, loops) / loops for _ in range(samples)]
+    summary = summarize(times)
+    summary['loops'] = loops
+    return summary
+
+
+def run(args):
+    names = args['<name>'] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        sys.exit('Unknown benchmarks: {}.'.format(', '.join(unknown)))
+    samples = int(args['--samples'])
+    min_time = float(args['--min-time'])
+    benchmarks = {}
+    for name in names:
+        print('{}: '.format(name), end='', flush=True)
+        summary = measure(BENCHMARKS[name](), samples, min_time)
+        summary['status'] = 'ok'
+        benchmarks[name] = summary
+        print('Mean +- std dev: {} +- {}, median {}, min {}'.format(
+            format_time(summary['mean']), format_time(summary['stdev']),
+            format_time(summary['median']), format_time(summary['min'])))
+    settings = {'samples': samples, 'min_time': min_time}
+    file_name = save_results(SUITE, benchmarks, settings, args['--output'])
+    print('Results saved in {}.'.format(file_name))
+
+
+def main():
+    args = docopt(__doc__)
+    if args['list']:
+        print('\n'.join(BENCHMARKS))
+    elif args['run']:
+        run(args)
+    elif args['compare']:
+        old = load_results(SUITE, args['<old>'])
+        new = load_results(SUITE, args['<new>'])
+        rows = compare(
+            old, new, COMPARED_METRICS, float(args['--threshold']))
+        if print_comparison(old, new, rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
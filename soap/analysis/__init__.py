@@ -1,3 +1,5 @@
 from soap.analysis.core import AnalysisResult
-from soap.analysis.utils import analyze, frontier, thick_frontier
+from soap.analysis.utils import (
+    analyze, frontier, thick_frontier, beam_frontier
+)
 from soap.analysis.plot import Plot, plot
@@ -0,0 +1,111 @@
+"""
+.. module:: soap.analysis.bound
+    :synopsis: Cheap lower bounds of resource usage and latency.
+"""
+import collections
+import math
+
+from soap.context import context
+from soap.datatype import int_type, float_type
+from soap.expression import (
+    is_variable, operators, UnaryArithExpr, BinaryArithExpr
+)
+from soap.semantics import is_numeral, IntegerInterval, mpz_type
+from soap.semantics.schedule.table import (
+    LATENCY_TABLE, MAX_SHARE_COUNT, MULTIPLEXER_SIZE_PER_INPUT,
+    RESOURCE_TABLE, SHARED_DATATYPE_OPERATORS
+)
+
+
+_arith_expr_types = (UnaryArithExpr, BinaryArithExpr)
+_scalar_types = (int_type, float_type)
+
+
+def _visit(expr, nodes, visited):
+    """Finds the data type of `expr` and the latency of its critical path,
+    and collects the operator nodes in `expr` into `nodes`.  Nodes of unknown
+    types are not descended into, and contribute nothing to the bounds."""
+    result = visited.get(expr)
+    if result is not None:
+        return result
+    if is_variable(expr):
+        dtype = expr.dtype if expr.dtype in _scalar_types else None
+        result = dtype, 0
+    elif isinstance(expr, (IntegerInterval, mpz_type)):
+        result = int_type, 0
+    elif is_numeral(expr):
+        result = float_type, 0
+    elif type(expr) in _arith_expr_types:
+        arg_results = [_visit(arg, nodes, visited) for arg in expr.args]
+        arg_dtypes = [dtype for dtype, _ in arg_results]
+        latency = max(latency for _, latency in arg_results)
+        if None in arg_dtypes:
+            dtype = None
+        elif all(dtype == int_type for dtype in arg_dtypes):
+            dtype = int_type
+        else:
+            dtype = float_type
+        if dtype is not None:
+            nodes[expr] = dtype, expr.op
+            if expr.op != operators.BARRIER_OP:
+                latency += LATENCY_TABLE[dtype].get(expr.op, 0)
+        result = dtype, latency
+    else:
+        result = None, 0
+    visited[expr] = result
+    return result
+
+
+def _resource_lower_bound(nodes, round_values):
+    counts = collections.defaultdict(int)
+    for dtype, op in nodes.values():
+        if not LATENCY_TABLE[dtype].get(op, 0):
+            # nodes of no latency begin and end on the same event, so the
+            # schedule never counts them as active at a control point
+            continue
+        if op == operators.SUBTRACT_OP:
+            op = operators.ADD_OP
+        counts[dtype, op] += 1
+    lut = dsp = 0
+    for (dtype, op), count in counts.items():
+        stat = RESOURCE_TABLE[dtype].get(op)
+        if stat is None:
+            continue
+        if (dtype, op) in SHARED_DATATYPE_OPERATORS:
+            lut += MULTIPLEXER_SIZE_PER_INPUT * count
+            count /= MAX_SHARE_COUNT
+            if round_values:
+                count = int(math.ceil(count))
+        lut += stat.lut * count
+        dsp += stat.dsp * count
+    return lut, dsp
+
+
+def stats_lower_bound(expr, out_vars=None, recurrences=None,
+                      round_values=None):
+    """Computes lower bounds of the LUT count, DSP count and latency of
+    `expr` from its operator counts and critical path.
+
+    The bounds never exceed the statistics from the schedule of `expr` by
+    :func:`soap.semantics.schedule_graph`, so a candidate expression can be
+    discarded if its bounds are dominated.
+
+    :returns: a tuple of LUT count, DSP count and latency bounds.
+    """
+    if isinstance(expr, collections.Mapping):
+        out_vars = out_vars or expr.keys()
+        expr_list = [expr[var] for var in out_vars if var in expr]
+    else:
+        expr_list = [expr]
+    nodes = {}
+    visited = {}
+    latency = 0
+    for each_expr in expr_list:
+        _, expr_latency = _visit(each_expr, nodes, visited)
+        latency = max(latency, expr_latency)
+    if recurrences:
+        # recurrence-weighted latency can be smaller than the critical path
+        latency = 0
+    lut, dsp = _resource_lower_bound(
+        nodes, round_values or context.round_values)
+    return lut, dsp, latency
@@ -6,17 +6,27 @@ import collections
 import random
 
 from soap import logger
+from soap.common.budget import (
+    budget_exceeded, current_budget, expire_budget, time_budget
+)
 from soap.common.parallel import pool
+from soap.common.trace import (
+    local_tracing, merge_trace_events, trace_span, tracing_enabled
+)
 from soap.context import context
-from soap.semantics import error_eval, ErrorSemantics, inf, schedule_graph
+from soap.semantics import (
+    error_eval, ErrorSemantics, inf, schedule_graph, SharedArithmeticEvaluator
+)
+from soap.expression import canonicalize
+from soap.analysis.bound import stats_lower_bound
 
 
-def abs_error(expr, state, out_vars):
+def abs_error(expr, state, out_vars, evaluator=None):
     if isinstance(expr, collections.Mapping):
         expr = expr.__class__({
             var: var_expr for var, var_expr in expr.items()
             if var in out_vars})
-    e = error_eval(expr, state)
+    e = error_eval(expr, state, evaluator=evaluator)
     v = ErrorSemantics(e)
     if v.is_bottom():
         logger.error(
@@ -47,12 +57,14 @@ class AnalysisResult(_analysis_result_tuple):
             self.latency, self.expression)
 
 
-def _pareto_frontier(points, ignore_last=True):
-    # Last row can be an expression
-    dom_func = lambda dominator_row, dominated_row: not any(
+def _dominates(dominator_row, dominated_row):
+    return not any(
         dominator > dominated
         for dominator, dominated in zip(dominator_row, dominated_row))
 
+
+def _pareto_frontier(points, ignore_last=True):
+    # Last row can be an expression
     pareto_points = set()
     for candidate_row in points:
         candidate_stat = candidate_row[:-1] if ignore_last else candidate_row
@@ -61,9 +73,9 @@ def _pareto_frontier(points, ignore_last=True):
             pareto_stat = pareto_row[:-1] if ignore_last else pareto_row
             if pareto_stat == candidate_stat:
                 continue
-            if dom_func(candidate_stat, pareto_stat):
+            if _dominates(candidate_stat, pareto_stat):
                 to_remove.add(pareto_row)
-            if dom_func(pareto_stat, candidate_stat):
+            if _dominates(pareto_stat, candidate_stat):
                 break
         else:
             pareto_points.add(candidate_row)
@@ -98,9 +110,88 @@ def thick_frontier(points):
     return frontier
 
 
-def _analyze_expression(args):
+def _crowding_distances(points):
+    """Computes the crowding distances of `points`, i.e. the normalized
+    perimeters of the boxes formed by their neighbours in each statistic.
+    Boundary points have infinite distances."""
+    points = sorted(points, key=str)
+    distances = {point: 0 for point in points}
+    for index in range(len(_analysis_result_tuple._fields) - 1):
+        ordered = sorted(points, key=lambda point: point[index])
+        low, high = ordered[0][index], ordered[-1][index]
+        distances[ordered[0]] = distances[ordered[-1]] = float('inf')
+        if high == low:
+            continue
+        for prev_point, point, next_point in zip(
+                ordered, ordered[1:], ordered[2:]):
+            distances[point] += \
+                (next_point[index] - prev_point[index]) / (high - low)
+    return distances
+
+
+def beam_frontier(points, width=None):
+    """Selects at most `width` points by their Pareto ranks, where the
+    least crowded points of the last selected rank are preferred."""
+    width = width or context.beam_width
+    beam = []
+    while points and len(beam) < width:
+        optimal, points = _pareto_frontier(points)
+        if len(beam) + len(optimal) > width:
+            distances = _crowding_distances(optimal)
+            optimal = sorted(
+                optimal, key=lambda point: (-distances[point], str(point)))
+            optimal = optimal[:width - len(beam)]
+        beam += optimal
+    return beam
+
+
+def _hypervolume(points, reference):
+    if not points:
+        return 0
+    if len(reference) == 1:
+        return reference[0] - min(point[0] for point in points)
+    if len(reference) == 2:
+        volume, bound = 0, reference[1]
+        for x, y in sorted(points):
+            if y < bound:
+                volume += (reference[0] - x) * (bound - y)
+                bound = y
+        return volume
+    # sums up slices between consecutive values of the last coordinate
+    points = sorted(points, key=lambda point: point[-1])
+    volume = 0
+    for index, point in enumerate(points):
+        if index + 1 < len(points):
+            upper = points[index + 1][-1]
+        else:
+            upper = reference[-1]
+        if upper > point[-1]:
+            volume += (upper - point[-1]) * _hypervolume(
+                [p[:-1] for p in points[:index + 1]], reference[:-1])
+    return volume
+
+
+def hypervolume(points, reference):
+    """Computes the volume of the region dominated by `points` and bounded
+    by the point `reference`, which is larger for better frontiers.
+    Coordinates beyond the reference point are clipped to it."""
+    reference = tuple(reference)
+    points = [
+        tuple(min(v, r) for v, r in zip(point, reference))
+        for point in points]
+    return _hypervolume(points, reference)
+
+
+def _canonical_expressions(expr_set):
+    """Removes the expressions in `expr_set` which differ only in the order
+    of commutative arguments, as their analysis results are the same."""
+    return list(collections.OrderedDict.fromkeys(
+        canonicalize(expr) for expr in expr_set))
+
+
+def _analyze_expression(args, evaluator=None):
     expr, state, out_vars, recurrences, round_values = args
-    error = abs_error(expr, state, out_vars)
+    error = abs_error(expr, state, out_vars, evaluator)
     graph = schedule_graph(
         expr, out_vars, recurrences=recurrences, round_values=round_values)
     latency = graph.latency()
@@ -109,6 +200,98 @@ def _analyze_expression(args):
         resource.lut, resource.dsp, error, latency, expr)
 
 
+def _is_pruned(archive, bound):
+    for stats in archive:
+        if stats != bound and _dominates(stats, bound):
+            return True
+    return False
+
+
+def _archive_add(archive, stats):
+    archive = [s for s in archive if not _dominates(stats, s)]
+    archive.append(stats)
+    return archive
+
+
+def _prune_expressions(expr_list, state, out_vars, recurrences,
+                       round_values, evaluator):
+    """Analyzes expressions in the order of cheap lower bounds of their
+    statistics, skipping the schedules of expressions with bounds dominated
+    by results found so far.  Only bounds strictly dominated by a result are
+    pruned, so expressions whose statistics tie a result are kept, and
+    :func:`sample_unique` picks from the same expressions as without
+    pruning."""
+    bounds = []
+    for expr in expr_list:
+        if bounds and budget_exceeded():
+            logger.debug('Time budget exceeded, bounded: {}/{}.'.format(
+                len(bounds), len(expr_list)))
+            break
+        error = abs_error(expr, state, out_vars, evaluator)
+        lut, dsp, latency = stats_lower_bound(
+            expr, out_vars, recurrences, round_values)
+        bounds.append(((lut, dsp, error, latency), expr))
+    bounds.sort(key=lambda bound_expr: bound_expr[0])
+
+    archive = []
+    pruned = 0
+    for bound, expr in bounds:
+        if _is_pruned(archive, bound):
+            pruned += 1
+            continue
+        args = (expr, state, out_vars, recurrences, round_values)
+        result = _analyze_expression(args, evaluator)
+        archive = _archive_add(archive, result.stats())
+        yield result
+    logger.debug('Pruned {}/{} expressions by lower bounds.'.format(
+        pruned, len(bounds)))
+
+
+def analyze_expressions(
+        expr_list, state, out_vars=None, recurrences=None, round_values=None,
+        prune=False):
+    """Analyzes a list of expressions together, and generates their
+    results.
+
+    The expressions are evaluated as one DAG, in which the value of each
+    unique subexpression shared by candidate expressions is evaluated once.
+    Expressions which differ only in the order of commutative arguments are
+    analyzed once.
+    If `prune` is set, expressions which cannot be on the Pareto frontier
+    are skipped, as the lower bounds of their statistics by
+    :func:`soap.analysis.bound.stats_lower_bound` are dominated by results
+    of other expressions.
+    """
+    expr_list = _canonical_expressions(expr_list)
+    evaluator = SharedArithmeticEvaluator(state)
+    if prune:
+        yield from _prune_expressions(
+            expr_list, state, out_vars, recurrences, round_values, evaluator)
+        return
+    for expr in expr_list:
+        args = (expr, state, out_vars, recurrences, round_values)
+        yield _analyze_expression(args, evaluator)
+
+
+def _analyze_expressions(args):
+    *args, seconds, tracing = args
+    results = []
+    # workers stop with the remaining time of the parent process
+    with time_budget(seconds), local_tracing(tracing) as events:
+        with trace_span('analysis batch', size=len(args[0])):
+            for result in analyze_expressions(*args):
+                results.append(result)
+                if budget_exceeded():
+                    break
+    return results, events
+
+
+def _merge_batches(batches):
+    for results, events in batches:
+        merge_trace_events(events)
+        yield from results
+
+
 class Analysis(object):
 
     def __init__(
@@ -134,11 +317,15 @@ class Analysis(object):
         else:
             self.multiprocessing = context.multiprocessing
         self._results = None
+        self._pruned_results = None
 
-    def analyze(self):
+    def analyze(self, prune=False):
         """Analyzes the set of expressions with input ranges and precisions
         provided in initialisation.
 
+        :param prune: Skips expressions which cannot be on the Pareto
+            frontier.
+        :type prune: bool
         :returns: a list of dictionaries each containing results and the
             expression.
         """
@@ -162,30 +349,60 @@ class Analysis(object):
             expr_set = random.sample(expr_set, limit)
         size = len(expr_set)
 
+        expr_list = list(expr_set)
         if self.multiprocessing:
-            map = pool.map
+            # each worker analyzes a batch of expressions together
+            batch_count = pool.cpu_count
+            seconds = current_budget().remaining()
+            tracing = tracing_enabled()
+            args_list = [
+                (expr_list[i::batch_count], state, out_vars, recurrences,
+                 round_values, prune, seconds, tracing)
+                for i in range(min(batch_count, size))]
+            batches = pool.map(_analyze_expressions, args_list, chunksize=1)
+            result_iter = _merge_batches(batches)
         else:
-            map = lambda func, args_list: (func(args) for args in args_list)
-        args_list = [
-            (expr, state, out_vars, recurrences, round_values)
-            for expr in expr_set]
+            result_iter = analyze_expressions(
+                expr_list, state, out_vars, recurrences, round_values, prune)
 
         try:
             results = set()
-            for i, result in enumerate(map(_analyze_expression, args_list)):
-                logger.persistent('Analysing', '{}/{}'.format(i, size))
-                results.add(result)
+            with trace_span('analysis', size=size, prune=prune):
+                for i, result in enumerate(result_iter):
+                    logger.persistent('Analysing', '{}/{}'.format(i, size))
+                    results.add(result)
+                    if budget_exceeded():
+                        logger.debug(
+                            'Time budget exceeded, completed: {}/{}.'
+                            .format(len(results), size))
+                        break
         except KeyboardInterrupt:
             logger.warning(
                 'Analysis interrupted, completed: {}.'.format(len(results)))
+            expire_budget()
         logger.unpersistent('Analysing')
 
-        self._results = results
+        if not prune:
+            self._results = results
         return results
 
+    def _frontier_results(self, prune):
+        if self._results or not (prune and context.prune_analysis):
+            return self.analyze()
+        if not self._pruned_results:
+            self._pruned_results = self.analyze(prune=True)
+        return self._pruned_results
+
     def frontier(self):
         """Computes the Pareto frontier from analyzed results."""
-        return sample_unique(pareto_frontier(self.analyze()))
+        return sample_unique(pareto_frontier(self._frontier_results(True)))
 
     def thick_frontier(self):
-        return thick_frontier(self.analyze())
+        # suboptimal layers need expressions dominated by the frontier
+        results = self._frontier_results(context.thickness == 0)
+        return thick_frontier(results)
+
+    def beam_frontier(self, width=None):
+        """Selects at most `width` results by :func:`beam_frontier`."""
+        # narrow frontiers are filled with dominated expressions
+        return beam_frontier(self._frontier_results(False), width)
@@ -48,3 +48,22 @@ def thick_frontier(expr_set, state, out_vars=None, **kwargs):
     :type out_vars: :class:`collections.Sequence`
     """
     return Analysis(expr_set, state, out_vars, **kwargs).thick_frontier()
+
+
+def beam_frontier(expr_set, state, out_vars=None, width=None, **kwargs):
+    """Provides at most `width` results of the area and error analysis of
+    expressions, which are selected by their Pareto ranks and crowding
+    distances.
+
+    :param expr_set: A set of expressions.
+    :type expr_set: set or list
+    :param state: The ranges of input variables.
+    :type state: dictionary containing mappings from variables to
+        :class:`soap.semantics.error.Interval`
+    :param out_vars: The output variables of the metastate
+    :type out_vars: :class:`collections.Sequence`
+    :param width: The maximum number of results, defaults to
+        `context.beam_width`.
+    :type width: int
+    """
+    return Analysis(expr_set, state, out_vars, **kwargs).beam_frontier(width)
@@ -0,0 +1,109 @@
+"""
+.. module:: soap.common.budget
+    :synopsis: Wall-clock time budgets for anytime optimization.
+"""
+import time
+from contextlib import contextmanager
+
+
+_inf = float('inf')
+
+
+class TimeBudget(object):
+    """A wall-clock deadline for a task.
+
+    A budget split from a parent budget never outlasts its parent, and
+    expiring a budget early, e.g. on interrupts, also expires its parents, so
+    that all enclosing tasks wind down with the results found so far.  A
+    budget which ran out marks its parents incomplete, as their results are
+    built from truncated ones, even if the parents have time left.
+    """
+    def __init__(self, seconds=None, parent=None):
+        super().__init__()
+        self.parent = parent
+        self.deadline = _inf if seconds is None else time.time() + seconds
+        if parent is not None:
+            self.deadline = min(self.deadline, parent.deadline)
+        self._expired = False
+        self._incomplete = False
+
+    def exceeded(self):
+        budget = self
+        while budget is not None:
+            if budget._expired:
+                return True
+            budget = budget.parent
+        return time.time() >= self.deadline
+
+    def incomplete(self):
+        """Whether results of tasks in this budget may be truncated."""
+        return self._incomplete or self.exceeded()
+
+    def remaining(self):
+        if self.exceeded():
+            return 0
+        return self.deadline - time.time()
+
+    def expire(self):
+        budget = self
+        # the unlimited budget outside all tasks never expires
+        while budget is not None and budget is not _root_budget:
+            budget._expired = True
+            budget = budget.parent
+
+    def mark_incomplete(self):
+        budget = self
+        while budget is not None and budget is not _root_budget:
+            budget._incomplete = True
+            budget = budget.parent
+
+    def split(self, count):
+        """Returns a budget for the first of `count` remaining tasks, which
+        takes an even share of the remaining time."""
+        remaining = self.remaining()
+        if remaining == _inf:
+            return self.__class__(parent=self)
+        return self.__class__(remaining / max(count, 1), parent=self)
+
+
+_root_budget = TimeBudget()
+_budgets = [_root_budget]
+
+
+def current_budget():
+    return _budgets[-1]
+
+
+def budget_exceeded():
+    return current_budget().exceeded()
+
+
+def budget_incomplete():
+    return current_budget().incomplete()
+
+
+def expire_budget():
+    current_budget().expire()
+
+
+@contextmanager
+def _local_budget(budget):
+    _budgets.append(budget)
+    try:
+        yield budget
+    finally:
+        _budgets.pop()
+        if budget.exceeded():
+            budget.mark_incomplete()
+
+
+def time_budget(seconds=None):
+    """Withable budget of `seconds` within the current budget, `None` for no
+    additional limit."""
+    return _local_budget(TimeBudget(seconds, current_budget()))
+
+
+def split_budget(count):
+    """Withable budget for the first of `count` remaining tasks in the
+    current budget."""
+    return _local_budget(current_budget().split(count))
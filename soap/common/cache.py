@@ -4,6 +4,8 @@ import functools
 
 
 _cached_funcs = []
+# whether the results of active calls of cached functions are to be cached
+_uncached_calls = []
 
 
 def process_invalidate_cache():
@@ -20,6 +22,13 @@ def invalidate_cache():
     logger.info('Cache invalidated.')
 
 
+def uncache_result():
+    """Tells the innermost active call of a :func:`cached` function not to
+    cache its result, e.g. if the result is truncated by a time budget."""
+    if _uncached_calls:
+        _uncached_calls[-1] = True
+
+
 def cached(f):
     class NonLocals(object):
         pass
@@ -48,7 +57,14 @@ def cached(f):
             link[NEXT] = NonLocals.root
             NonLocals.hits += 1
             return r
-        r = f(*args, **kwargs)
+        _uncached_calls.append(False)
+        try:
+            r = f(*args, **kwargs)
+        finally:
+            uncached = _uncached_calls.pop()
+        if uncached:
+            NonLocals.misses += 1
+            return r
         if NonLocals.full:
             NonLocals.root[KEY] = key
             NonLocals.root[RESULT] = r
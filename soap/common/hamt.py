@@ -0,0 +1,419 @@
+"""
+.. module:: soap.common.hamt
+    :synopsis: Persistent hash array mapped tries.
+"""
+from collections.abc import ItemsView, Mapping, ValuesView
+
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+_missing = object()
+
+
+def _popcount(value):
+    return bin(value).count('1')
+
+
+def _key_hash(key):
+    return hash(key) & _HASH_MASK
+
+
+def _item_hash(leaf):
+    key_hash, _, value = leaf
+    return hash((key_hash, value))
+
+
+class _Node(object):
+    """Trie nodes hold leaves of `(key_hash, key, value)` tuples and child
+    nodes.  A node is only modified in place by the builder that owns it,
+    otherwise it is copied on write, so it can memoize facts about its
+    values once it is built."""
+    __slots__ = ('entries', 'owner', 'memo')
+
+    def _editable(self, owner):
+        if owner is not None and self.owner is owner:
+            return self
+        return self._copy(owner)
+
+
+class _BitmapNode(_Node):
+    __slots__ = ('bitmap', )
+
+    def __init__(self, bitmap, entries, owner):
+        super().__init__()
+        self.bitmap = bitmap
+        self.entries = entries
+        self.owner = owner
+        self.memo = None
+
+    def _copy(self, owner):
+        return _BitmapNode(self.bitmap, list(self.entries), owner)
+
+    def get(self, shift, key_hash, key, default):
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return default
+        entry = self.entries[_popcount(self.bitmap & (bit - 1))]
+        if type(entry) is not tuple:
+            return entry.get(shift + _BITS, key_hash, key, default)
+        if entry[1] is key or entry[1] == key:
+            return entry[2]
+        return default
+
+    def assoc(self, shift, leaf, owner):
+        """Returns the node with `leaf` added, and the replaced leaf or
+        `None` if the key of `leaf` is new."""
+        key_hash, key, value = leaf
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        index = _popcount(self.bitmap & (bit - 1))
+        if not self.bitmap & bit:
+            node = self._editable(owner)
+            node.entries.insert(index, leaf)
+            node.bitmap |= bit
+            return node, None
+        entry = self.entries[index]
+        if type(entry) is not tuple:
+            new_entry, replaced = entry.assoc(shift + _BITS, leaf, owner)
+            if new_entry is entry:
+                return self, replaced
+        elif entry[1] is key or entry[1] == key:
+            if entry[2] is value:
+                return self, entry
+            new_entry, replaced = leaf, entry
+        else:
+            new_entry = _make_node(shift + _BITS, entry, leaf, owner)
+            replaced = None
+        node = self._editable(owner)
+        node.entries[index] = new_entry
+        return node, replaced
+
+    def dissoc(self, shift, key_hash, key, owner):
+        """Returns the node without `key`, and the removed leaf or `None` if
+        `key` does not exist."""
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return self, None
+        index = _popcount(self.bitmap & (bit - 1))
+        entry = self.entries[index]
+        if type(entry) is not tuple:
+            new_entry, removed = entry.dissoc(
+                shift + _BITS, key_hash, key, owner)
+            if removed is None:
+                return self, None
+            node = self._editable(owner)
+            if new_entry.entries:
+                node.entries[index] = _collapse(new_entry)
+            else:
+                del node.entries[index]
+                node.bitmap ^= bit
+            return node, removed
+        if not (entry[1] is key or entry[1] == key):
+            return self, None
+        node = self._editable(owner)
+        del node.entries[index]
+        node.bitmap ^= bit
+        return node, entry
+
+    def leaves(self):
+        for entry in self.entries:
+            if type(entry) is tuple:
+                yield entry
+            else:
+                yield from entry.leaves()
+
+
+class _CollisionNode(_Node):
+    """Holds leaves with keys of the same hash."""
+    __slots__ = ('key_hash', )
+
+    def __init__(self, key_hash, entries, owner):
+        super().__init__()
+        self.key_hash = key_hash
+        self.entries = entries
+        self.owner = owner
+        self.memo = None
+
+    def _copy(self, owner):
+        return _CollisionNode(self.key_hash, list(self.entries), owner)
+
+    def _index(self, key):
+        for index, entry in enumerate(self.entries):
+            if entry[1] is key or entry[1] == key:
+                return index
+        return -1
+
+    def get(self, shift, key_hash, key, default):
+        if key_hash != self.key_hash:
+            return default
+        index = self._index(key)
+        if index < 0:
+            return default
+        return self.entries[index][2]
+
+    def assoc(self, shift, leaf, owner):
+        if leaf[0] != self.key_hash:
+            bit = 1 << ((self.key_hash >> shift) & _MASK)
+            node = _BitmapNode(bit, [self], owner)
+            return node.assoc(shift, leaf, owner)
+        index = self._index(leaf[1])
+        if index < 0:
+            node = self._editable(owner)
+            node.entries.append(leaf)
+            return node, None
+        entry = self.entries[index]
+        if entry[2] is leaf[2]:
+            return self, entry
+        node = self._editable(owner)
+        node.entries[index] = leaf
+        return node, entry
+
+    def dissoc(self, shift, key_hash, key, owner):
+        if key_hash != self.key_hash:
+            return self, None
+        index = self._index(key)
+        if index < 0:
+            return self, None
+        node = self._editable(owner)
+        entry = node.entries.pop(index)
+        return node, entry
+
+    def leaves(self):
+        return iter(self.entries)
+
+
+def _make_node(shift, leaf, other_leaf, owner):
+    if leaf[0] == other_leaf[0]:
+        return _CollisionNode(leaf[0], [leaf, other_leaf], owner)
+    node = _BitmapNode(0, [], owner)
+    node, _ = node.assoc(shift, leaf, owner)
+    node, _ = node.assoc(shift, other_leaf, owner)
+    return node
+
+
+def _collapse(node):
+    """Replaces a child node holding a single leaf by the leaf."""
+    if len(node.entries) == 1 and type(node.entries[0]) is tuple:
+        return node.entries[0]
+    return node
+
+
+def _changes(node, other, changes):
+    """Appends `(key, value, other_value)` to `changes` for leaves with values
+    that are not identical in `node` and `other`, skipping shared nodes.
+    Returns `False` if the nodes are not laid out alike."""
+    if node is other:
+        return True
+    if type(node) is not _BitmapNode or type(other) is not _BitmapNode:
+        return False
+    if node.bitmap != other.bitmap:
+        return False
+    for entry, other_entry in zip(node.entries, other.entries):
+        if entry is other_entry:
+            continue
+        if type(entry) is not tuple:
+            if type(other_entry) is tuple:
+                return False
+            if not _changes(entry, other_entry, changes):
+                return False
+            continue
+        if type(other_entry) is not tuple:
+            return False
+        key = entry[1]
+        if not (other_entry[1] is key or other_entry[1] == key):
+            return False
+        if entry[2] is not other_entry[2]:
+            changes.append((key, entry[2], other_entry[2]))
+    return True
+
+
+def _any_value(node, predicate):
+    """Checks if any value under `node` satisfies `predicate`, the result is
+    memoized on the node for the last predicate checked."""
+    memo = node.memo
+    if memo is not None and memo[0] is predicate:
+        return memo[1]
+    result = False
+    for entry in node.entries:
+        if type(entry) is tuple:
+            result = predicate(entry[2])
+        else:
+            result = _any_value(entry, predicate)
+        if result:
+            break
+    node.memo = (predicate, result)
+    return result
+
+
+class _ItemsView(ItemsView):
+    def __iter__(self):
+        for _, key, value in self._mapping._root.leaves():
+            yield key, value
+
+
+class _ValuesView(ValuesView):
+    def __iter__(self):
+        for _, _, value in self._mapping._root.leaves():
+            yield value
+
+
+class PersistentMap(Mapping):
+    """An immutable mapping implemented as a hash array mapped trie.
+
+    Updates return new mappings sharing all unchanged nodes with the
+    original in O(log n) time.  The hash is computed once and maintained
+    incrementally by updates.
+    """
+    __slots__ = ('_root', '_len', '_hash')
+
+    def __init__(self, items=None, **kwargs):
+        super().__init__()
+        self._root = _BitmapNode(0, [], None)
+        self._len = 0
+        self._hash = None
+        if items or kwargs:
+            if isinstance(items, Mapping):
+                items = items.items()
+            other = self.merge(list(items or ()) + list(kwargs.items()))
+            self._root, self._len = other._root, other._len
+
+    @classmethod
+    def _make(cls, root, length, hash_val):
+        mapping = cls.__new__(cls)
+        mapping._root = root
+        mapping._len = length
+        mapping._hash = hash_val
+        return mapping
+
+    def __getitem__(self, key):
+        value = self._root.get(0, _key_hash(key), key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        return self._root.get(0, _key_hash(key), key, default)
+
+    def __contains__(self, key):
+        return self._root.get(0, _key_hash(key), key, _missing) is not _missing
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for _, key, _ in self._root.leaves():
+            yield key
+
+    def items(self):
+        return _ItemsView(self)
+
+    def values(self):
+        return _ValuesView(self)
+
+    def set(self, key, value):
+        """Returns a new mapping with `key` mapped to `value`."""
+        return self.merge([(key, value)])
+
+    def merge(self, items):
+        """Returns a new mapping updated with the key-value pairs in `items`,
+        which is a mapping or an iterable of pairs."""
+        if isinstance(items, Mapping):
+            items = items.items()
+        owner = object()
+        root, length, hash_val = self._root, self._len, self._hash
+        for key, value in items:
+            leaf = (_key_hash(key), key, value)
+            root, replaced = root.assoc(0, leaf, owner)
+            if replaced is None:
+                length += 1
+            elif replaced[2] is value:
+                continue
+            if hash_val is not None:
+                if replaced is not None:
+                    hash_val ^= _item_hash(replaced)
+                hash_val ^= _item_hash(leaf)
+        if root is self._root:
+            return self
+        return self._make(root, length, hash_val)
+
+    def delete(self, key):
+        """Returns a new mapping without `key`."""
+        root, removed = self._root.dissoc(0, _key_hash(key), key, None)
+        if removed is None:
+            raise KeyError(key)
+        hash_val = self._hash
+        if hash_val is not None:
+            hash_val ^= _item_hash(removed)
+        return self._make(root, self._len - 1, hash_val)
+
+    def changes(self, other):
+        """Returns a list of `(key, value, other_value)` for keys with values
+        that are not identical in `self` and `other`, or `None` if their keys
+        differ.
+
+        Subtrees shared by both mappings are skipped, so mappings derived from
+        each other are compared in time proportional to their differences.
+        """
+        if self._len != other._len:
+            return None
+        changes = []
+        if _changes(self._root, other._root, changes):
+            return changes
+        changes = []
+        for key_hash, key, value in self._root.leaves():
+            other_value = other._root.get(0, key_hash, key, _missing)
+            if other_value is _missing:
+                return None
+            if other_value is not value:
+                changes.append((key, value, other_value))
+        return changes
+
+    def any_value(self, predicate):
+        """Checks if any value satisfies `predicate`, which must depend only
+        on the value.
+
+        Results are memoized on the nodes, so mappings derived from each
+        other are checked in time proportional to their differences.
+        """
+        return _any_value(self._root, predicate)
+
+    def __hash__(self):
+        hash_val = self._hash
+        if hash_val is None:
+            hash_val = 0
+            for leaf in self._root.leaves():
+                hash_val ^= _item_hash(leaf)
+            self._hash = hash_val
+        return hash_val
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        if isinstance(other, PersistentMap):
+            if self._root is other._root:
+                return True
+            if self._hash is not None and other._hash is not None:
+                if self._hash != other._hash:
+                    return False
+        for key, value in self.items():
+            other_value = other.get(key, _missing)
+            if other_value is not value and not other_value == value:
+                return False
+        return True
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __reduce__(self):
+        return self.__class__, (list(self.items()), )
+
+    def __repr__(self):
+        return '{cls}({items!r})'.format(
+            cls=self.__class__.__name__, items=dict(self.items()))
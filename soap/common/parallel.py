@@ -27,6 +27,10 @@ class _Pool(object):
         self.map = self._map_func_wrapper('imap')
         self.map_unordered = self._map_func_wrapper('imap_unordered')
 
+    @property
+    def cpu_count(self):
+        return self._cpu
+
     @property
     def pool(self):
         if not self._pool:
@@ -0,0 +1,103 @@
+"""
+.. module:: soap.common.trace
+    :synopsis: Nested trace spans of stages, exported as Chrome trace events.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+# events traced in the current process, and in the tasks running in it
+_event_buffers = [[]]
+# workers may be forked before tracing starts, so tasks are told by the
+# parent process whether to trace
+_tracing = [False]
+
+
+def tracing_enabled():
+    return _tracing[-1]
+
+
+@contextmanager
+def local_tracing(enabled=True):
+    """Withable context of a task, e.g. in a worker, which traces spans if
+    `enabled`, and yields the list of traced events for
+    :func:`merge_trace_events`."""
+    events = []
+    _tracing.append(enabled)
+    _event_buffers.append(events)
+    try:
+        yield events
+    finally:
+        _event_buffers.pop()
+        _tracing.pop()
+
+
+def _timestamp():
+    # microseconds of the wall clock, which is shared by all processes
+    return time.time() * 1e6
+
+
+@contextmanager
+def trace_span(name, category='soap', **args):
+    """Withable span named `name`, which records a complete trace event
+    with `args` if tracing is enabled."""
+    if not _tracing[-1]:
+        yield
+        return
+    start = _timestamp()
+    try:
+        yield
+    finally:
+        pid = os.getpid()
+        _event_buffers[-1].append({
+            'name': name, 'cat': category, 'ph': 'X', 'ts': start,
+            'dur': _timestamp() - start, 'pid': pid, 'tid': pid,
+            'args': args,
+        })
+
+
+def merge_trace_events(events):
+    """Merges events of a task from :func:`local_tracing`."""
+    _event_buffers[-1].extend(events)
+
+
+def trace_events():
+    """Returns all traced events, with metadata events naming the
+    processes."""
+    events = _event_buffers[0]
+    main_pid = os.getpid()
+    pids = sorted({e['pid'] for e in events} | {main_pid})
+    metadata = [{
+        'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': pid,
+        'args': {'name': 'main' if pid == main_pid else 'worker'},
+    } for pid in pids]
+    return metadata + sorted(events, key=lambda e: (e['pid'], e['ts']))
+
+
+def dump_trace(file_name):
+    """Writes traced events to `file_name` in the JSON trace event format of
+    Chrome and Perfetto."""
+    with open(file_name, 'w') as f:
+        json.dump({
+            'traceEvents': trace_events(),
+            'displayTimeUnit': 'ms',
+        }, f)
+
+
+@contextmanager
+def trace(file_name):
+    """Withable context which traces spans within it, and writes them to
+    `file_name` on exit.  Does nothing if `file_name` is `None`."""
+    if file_name is None:
+        yield
+        return
+    _event_buffers[0] = []
+    _tracing.append(True)
+    try:
+        yield
+    finally:
+        _tracing.pop()
+        dump_trace(file_name)
+        _event_buffers[0] = []
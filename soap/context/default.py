@@ -18,13 +18,25 @@ context = dict(
     fast_outer=True,     # analyze only innermost loop for error
     fast_factor=0.05,    # accelerate error analysis by computing a fraction
                          # of iterations and extrapolate
+    loop_acceleration=1000,  # min trip count of counted loops for closed-form
+                             # bounds instead of iterations, 0 disables
     scalar_array=True,
+    array_segments=0,    # max regions in each dimension of segmented arrays,
+                         # 0 disables segmentation
     unroll_factor=0,     # steps before no unrolling in static analysis
     widen_factor=0,      # steps before widening in static analysis
+    widen_thresholds=(),  # landmarks widening stops at, in addition to
+                          # constants in loops
+    narrow_steps=3,      # decreasing iterations after widening
     precision='single',
+    interval_backend='mpfr',  # 'float' computes bounds with outward rounded
+                              # doubles if the precision fits in a double
+    intern_values=False,  # share equal interval and error values
     norm='mse_error',    # function for computing multiple variable avg error
     ii_precision=5,      # how precise are IIs computed
     round_values=True,
+    prune_analysis=True,  # skip full analysis of candidates with dominated
+                          # lower bounds when computing frontiers
     scheduler='alap',    # the scheduler used for sequential nodes
     # transform related
     rand_seed=42,
@@ -36,9 +48,20 @@ context = dict(
     max_steps=10,        # max no of steps for equivalent expr discovery
     plugin_every=1,      # no of steps before plugins are executed
     thickness=0,         # no of iterations of pareto suboptimal inclusion
+    beam_width=10,       # max no of expressions kept by beam search steps
     small_steps=5,       # transition steps for finding equivalent small exprs
     small_depth=3,       # transition depth for finding equivalent small exprs
     window_depth=3,      # depth limit window for equivalent expr discovery
     unroll_depth=7,      # partial unroll depth limit
+    population_size=40,  # no of candidates in each generation of evolution
+    evaluation_budget=1000,  # max no of candidates analyzed by evolution
+    crossover_rate=0.5,  # probability of crossing over evolved candidates
+    time_budget=0,       # wall-clock seconds for optimization, returns the
+                         # best results found so far when exceeded, 0 for
+                         # no limit
+    state_dir=None,      # directory to checkpoint optimization runs in
+    resume=False,        # resume from the checkpoint in state_dir
+    checkpoint_interval=60,  # min seconds between saving checkpoints
+    rule_statistics=False,   # profile the yield of transform rules
 )
 context = SoapContext(context)
@@ -37,6 +37,26 @@ class SoapContext(_Context):
         gmpy2.get_context().precision = value + 1
         return value
 
+    def interval_backend_hook(self, value):
+        allowed = ['mpfr', 'float']
+        if value not in allowed:
+            raise ConfigError(
+                'Config interval_backend must take values in {allowed}'
+                .format(allowed=allowed))
+        return value
+
+    def widen_thresholds_hook(self, value):
+        if isinstance(value, str):
+            value = [v for v in value.split(',') if v.strip()]
+        try:
+            return tuple(sorted(
+                int(v) if float(v).is_integer() else float(v)
+                for v in value))
+        except (TypeError, ValueError):
+            raise ConfigError(
+                'Config widen_thresholds must be a list of numbers, '
+                'got {!r}'.format(value))
+
     def repr_hook(self, value):
         str_to_func = {'repr': _repr, 'str': _str}
         value = str_to_func.get(value, value)
@@ -131,6 +131,9 @@ def type_cast(dtype, value=None, top=False, bottom=False):
     shape = dtype.shape
     if isinstance(dtype, ArrayType):
         if not isinstance(value, collections.Sequence):
+            if context.array_segments > 0:
+                value = cls.value_class(value, top=top, bottom=bottom)
+                return cls.segmented(value, shape)
             if context.scalar_array:
                 return cls(scalar=value, _shape=shape, top=top, bottom=bottom)
             for dim in reversed(dtype.shape):
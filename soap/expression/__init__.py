@@ -9,8 +9,8 @@ from soap.expression.operators import (
     COMPARISON_NEGATE_DICT, COMPARISON_MIRROR_DICT,
 )
 from soap.expression.common import (
-    expression_factory, expression_variables, is_expression, is_variable,
-    fix_expr_has_inner_loop, GenericExecuter
+    canonicalize, expression_factory, expression_variables, is_expression,
+    is_variable, fix_expr_has_inner_loop, GenericExecuter
 )
 from soap.expression.base import (
     Expression, UnaryExpression, BinaryExpression, TernaryExpression,
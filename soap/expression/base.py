@@ -21,6 +21,11 @@ class Expression(Flyweight):
         self._args = args
         self._hash = None
 
+    def __getstate__(self):
+        # leaves out the cached hash, so that equal expressions pickle to the
+        # same cache keys
+        return None, {'_op': self._op, '_args': self._args}
+
     def __setstate__(self, state):
         self._hash = None
         state = state[1]
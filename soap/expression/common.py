@@ -189,6 +189,40 @@ class HasInnerLoop(GenericExecuter):
 _has_inner_loop = HasInnerLoop()
 
 
+class CanonicalOrder(GenericExecuter):
+    """Orders the arguments of commutative operators in expressions.
+
+    Expressions which differ only in the order of commutative arguments are
+    already equal, and cannot be told apart by analyses, but pickle to
+    different cache keys.  Ordering arguments by their structural hashes,
+    which are cached and insensitive to commutative orders, gives the same
+    representative for all of them within a process and its workers.  The
+    parenthesization of associative operators is kept, as it changes the
+    error and latency of expressions.
+    """
+    def generic_execute(self, expr):
+        return expr
+
+    def _execute_atom(self, expr):
+        return expr
+
+    def _execute_expression(self, expr):
+        from soap.expression.operators import COMMUTATIVITY_OPERATORS
+        args = [self(arg) for arg in expr.args]
+        if expr.op in COMMUTATIVITY_OPERATORS:
+            args = sorted(args, key=hash)
+        if all(new is old for new, old in zip(args, expr.args)):
+            return expr
+        return expression_factory(expr.op, *args)
+
+    def _execute_mapping(self, meta_state):
+        return meta_state.__class__(
+            {var: self(expr) for var, expr in meta_state.items()})
+
+
+canonicalize = CanonicalOrder()
+
+
 def fix_expr_has_inner_loop(expr):
     from soap.expression.fixpoint import FixExpr
     if isinstance(expr, FixExpr):
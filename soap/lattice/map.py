@@ -4,6 +4,7 @@
 """
 from collections import Mapping
 
+from soap.common.hamt import PersistentMap
 from soap.lattice import Lattice
 
 
@@ -14,13 +15,24 @@ class MapLattice(Lattice, Mapping):
     def __init__(self, dictionary=None, top=False, bottom=False, **kwargs):
         super().__init__(top=top, bottom=bottom)
         if top or bottom:
-            self._mapping = {}
+            self._mapping = PersistentMap()
             return
-        mapping = {}
-        for k, v in dict(dictionary or {}, **kwargs).items():
-            k, v = self._init_key_value(k, v)
-            mapping[k] = v
+        if isinstance(dictionary, MapLattice) and not kwargs:
+            if type(dictionary) is type(self):
+                self._mapping = dictionary._mapping
+                return
+        self._mapping = PersistentMap(
+            self._init_key_value(k, v)
+            for k, v in dict(dictionary or {}, **kwargs).items())
+
+    @classmethod
+    def _from_persistent_map(cls, mapping):
+        """Creates a mapping from the persistent map `mapping` with cast keys
+        and values, which shares its structure."""
+        self = cls.__new__(cls)
+        Lattice.__init__(self)
         self._mapping = mapping
+        return self
 
     def __getstate__(self):
         return (self.top, self.bottom, sorted(self.items(), key=hash))
@@ -28,7 +40,7 @@ class MapLattice(Lattice, Mapping):
     def __setstate__(self, state):
         self._hash = None
         self.top, self.bottom = state[:2]
-        self._mapping = {k: v for k, v in state[2]}
+        self._mapping = PersistentMap(state[2])
 
     def _init_key_value(self, key, value, top=False, bottom=False):
         key = self._cast_key(key, value)
@@ -48,13 +60,17 @@ class MapLattice(Lattice, Mapping):
         return all(v.is_bottom() for v in self._mapping.values())
 
     def join(self, other):
-        join_dict = dict(self)
-        for k in other:
-            if k in self:
-                join_dict[k] = self[k].join(other[k])
-            else:
-                join_dict[k] = other[k]
-        return self.__class__(join_dict)
+        if self._mapping is other._mapping:
+            return self
+        join_items = []
+        for k, v in other.items():
+            u = self._mapping.get(k)
+            if u is v:
+                continue
+            if u is not None:
+                v = u.join(v)
+            join_items.append(self._init_key_value(k, v))
+        return self._from_persistent_map(self._mapping.merge(join_items))
 
     def meet(self, other):
         meet_dict = {}
@@ -67,6 +83,8 @@ class MapLattice(Lattice, Mapping):
         return self.__class__(meet_dict)
 
     def le(self, other):
+        if self._mapping is other._mapping:
+            return True
         for k, v in self.items():
             if k not in other:
                 return False
@@ -81,7 +99,7 @@ class MapLattice(Lattice, Mapping):
         return iter(self._mapping)
 
     def __contains__(self, key):
-        return super().__contains__(self._cast_key(key))
+        return self._cast_key(key) in self._mapping
 
     def __getitem__(self, key):
         try:
@@ -91,8 +109,14 @@ class MapLattice(Lattice, Mapping):
                 return self._cast_value(key=key, bottom=True)
             return self._cast_value(key=key, top=True)
 
+    def items(self):
+        return self._mapping.items()
+
+    def values(self):
+        return self._mapping.values()
+
     def __hash__(self):
-        self._hash = hash_val = hash(tuple(sorted(self.items(), key=hash)))
+        self._hash = hash_val = hash(self._mapping)
         return hash_val
 
     def __str__(self):
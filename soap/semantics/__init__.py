@@ -5,7 +5,8 @@ from soap.semantics.error import (
     inf, ulp, round_off_error, cast
 )
 from soap.semantics.functions import (
-    arith_eval, error_eval, label, luts, resource_eval
+    arith_eval, batch_arith_eval, error_eval, label, luts, resource_eval,
+    SharedArithmeticEvaluator
 )
 from soap.semantics.label import (
     Label, LabelContext, LabelSemantics, label_to_expr
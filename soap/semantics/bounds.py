@@ -0,0 +1,156 @@
+"""
+.. module:: soap.semantics.bounds
+    :synopsis: Outward rounded arithmetic on NumPy arrays of bounds.
+"""
+import math
+
+import gmpy2
+import numpy
+
+from soap.context import context
+from soap.semantics.error import (
+    _double_precision, _exact_product_limit, _exact_product_tiny, _split,
+    _two_sum
+)
+
+
+_inf = numpy.inf
+
+
+def _round(v, e, up):
+    """Rounds `v` outwards to the analyzed precision towards the exact values
+    `v + e`, an unknown error is denoted by NaN.
+
+    The vectorized counterpart of :func:`soap.semantics.error._round`.
+    """
+    step = ~(e <= 0) if up else ~(e >= 0)
+    double = numpy.where(
+        step, numpy.nextafter(v, _inf if up else -_inf), v)
+    p = _precision()
+    if p > _double_precision:
+        return double
+    m, x = numpy.frexp(v)
+    s = numpy.ldexp(m, p)
+    r = numpy.ceil(s) if up else numpy.floor(s)
+    u = numpy.ldexp(1.0, x - p)
+    # stepping towards zero into the binade below
+    u = numpy.where(
+        ((v > 0) != up) & (numpy.abs(s) == 2.0 ** (p - 1)), u / 2, u)
+    stepped = numpy.where(step, v + u if up else v - u, v)
+    rounded = numpy.where(r == s, stepped, numpy.ldexp(r, x - p))
+    # outside the range where we can scale exactly
+    scalable = (numpy.abs(v) > _exact_product_tiny) & numpy.isfinite(v)
+    return numpy.where(scalable, rounded, double)
+
+
+def _down(v, e):
+    return _round(v, e, False)
+
+
+def _up(v, e):
+    return _round(v, e, True)
+
+
+def _two_product(a, b):
+    """The vectorized counterpart of
+    :func:`soap.semantics.error._two_product`, an unknown error is denoted
+    by NaN."""
+    p = a * b
+    a_hi, a_lo = _split(a)
+    b_hi, b_lo = _split(b)
+    e = ((a_hi * b_hi - p) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+    abs_p = numpy.abs(p)
+    exact = (
+        (numpy.abs(a) < _exact_product_limit) &
+        (numpy.abs(b) < _exact_product_limit) &
+        (abs_p < _exact_product_limit) & (abs_p > _exact_product_tiny))
+    return p, numpy.where(exact, e, numpy.nan)
+
+
+def _mul_exact(a, b):
+    p, e = _two_product(a, b)
+    zero = (a == 0) | (b == 0) | numpy.isinf(a) | numpy.isinf(b)
+    return p, numpy.where(zero, 0.0, e)
+
+
+def _div_exact(a, b):
+    q = a / b
+    p, e = _two_product(q, b)
+    # the exact quotient is q + ((a - p) - e) / b
+    e = ((a - p) - e) / b
+    exact = (a == 0) | numpy.isinf(a) | numpy.isinf(b)
+    return q, numpy.where(exact, 0.0, e)
+
+
+def _interval_add(a_min, a_max, b_min, b_max):
+    return _down(*_two_sum(a_min, b_min)), _up(*_two_sum(a_max, b_max))
+
+
+def _interval_sub(a_min, a_max, b_min, b_max):
+    return _interval_add(a_min, a_max, -b_max, -b_min)
+
+
+def _interval_arith(func, a_min, a_max, b_min, b_max):
+    values = [
+        func(a_min, b_min), func(a_min, b_max),
+        func(a_max, b_min), func(a_max, b_max)]
+    v_min = numpy.minimum.reduce([_down(v, e) for v, e in values])
+    v_max = numpy.maximum.reduce([_up(v, e) for v, e in values])
+    return v_min, v_max
+
+
+def _interval_mul(a_min, a_max, b_min, b_max):
+    return _interval_arith(_mul_exact, a_min, a_max, b_min, b_max)
+
+
+def _interval_div(a_min, a_max, b_min, b_max):
+    return _interval_arith(_div_exact, a_min, a_max, b_min, b_max)
+
+
+def _precision():
+    return context.precision + 1
+
+
+def _round_off_error(v_min, v_max):
+    """Computes round-off errors of values, returns the error bounds and a
+    mask of values whose ulp is not representable by doubles."""
+    p = _precision()
+    emin = gmpy2.get_context().emin
+    underflow = math.ldexp(1.0, emin)
+    a = numpy.maximum(numpy.abs(v_min), numpy.abs(v_max))
+    m, exp = numpy.frexp(a)
+    # rounding away from zero to the precision may carry into next binade
+    exp = exp + (numpy.ceil(numpy.ldexp(m, p)) >= 2.0 ** p)
+    invalid = (exp - p < emin) & (a != 0) & numpy.isfinite(a)
+    invalid |= underflow == 0
+    u = _up(*_two_sum(numpy.ldexp(1.0, exp - p), underflow))
+    u = numpy.where(a == 0, underflow, u)
+    u = numpy.where(numpy.isinf(a), _inf, u) / 2
+    return -u, u, invalid
+
+
+def _exact_round(hi, lo):
+    """Rounds the exact values `hi + lo` to the analyzed precision.
+
+    Returns the rounded values, the bounds of the exact round-off errors,
+    and a mask of values that cannot be rounded with doubles.
+    """
+    p = _precision()
+    emin = gmpy2.get_context().emin
+    invalid = ~numpy.isfinite(hi) | ~numpy.isfinite(lo)
+    invalid |= (hi != 0) & (numpy.abs(hi) < 2.0 ** (emin + p))
+    if p > _double_precision:
+        # hi is already the nearest double
+        f = hi
+    else:
+        m, exp = numpy.frexp(hi)
+        scaled = numpy.ldexp(m, p)
+        r = numpy.rint(scaled)
+        # double rounding, lo breaks the tie
+        tie = (numpy.abs(scaled - numpy.trunc(scaled)) == 0.5) & (lo != 0)
+        r = numpy.where(
+            tie, numpy.where(lo > 0, numpy.ceil(scaled), numpy.floor(scaled)),
+            r)
+        f = numpy.ldexp(r, exp - p)
+    s, e = _two_sum(hi - f, lo)
+    return f, _down(s, e), _up(s, e), invalid
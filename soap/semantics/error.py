@@ -3,6 +3,8 @@
     :synopsis: Intervals and error semantics.
 """
 import functools
+import math
+import struct
 
 import gmpy2
 from gmpy2 import mpfr as _mpfr, mpq as _mpq, mpz
@@ -18,6 +20,8 @@ mpz_type = type(mpz('1'))
 mpfr_type = type(_mpfr('1.0'))
 mpq_type = type(_mpq('1.0'))
 inf = _mpfr('Inf')
+_float_inf = float('Inf')
+_double_precision = 52   # mantissa bits of a double, excluding implicit bit
 
 
 def _unpack(v):
@@ -57,6 +61,248 @@ def mpq(v):
     return _mpq(m, mpq(2) ** (-e))
 
 
+try:
+    from math import nextafter as _nextafter
+except ImportError:  # Python < 3.9
+    def _nextafter(x, y):
+        if x != x or y != y:
+            return x + y
+        if x == y:
+            return y
+        if x == 0:
+            return math.copysign(5e-324, y)
+        bits = struct.unpack('<q', struct.pack('<d', x))[0]
+        bits += 1 if (x < y) == (x > 0) else -1
+        return struct.unpack('<d', struct.pack('<q', bits))[0]
+
+
+def _next_up(x):
+    return _nextafter(x, _float_inf)
+
+
+def _next_down(x):
+    return _nextafter(x, -_float_inf)
+
+
+def _float_backend():
+    """Checks if the hardware double backend is in use.
+
+    Doubles are only used if the precision to analyze fits in a double, in
+    which case values rounded to that precision are exactly representable.
+    """
+    return (context.interval_backend == 'float' and
+            context.precision <= _double_precision)
+
+
+def _float(v):
+    """Rounds a value to the analyzed precision and stores it in a double.
+    """
+    if type(v) is float:
+        p = context.precision + 1
+        if p > _double_precision or v == 0 or not math.isfinite(v):
+            return v
+        if abs(v) > _exact_product_tiny:
+            m, e = math.frexp(v)
+            return math.ldexp(round(math.ldexp(m, p)), e - p)
+    return float(mpfr(v))
+
+
+def _float_bound(v, up):
+    """Converts a value to the nearest double in the analyzed precision
+    that is not less than it if `up`, or not greater than it otherwise."""
+    if type(v) is str:
+        v = mpq(v)
+    f = float(v)
+    return _round(f, 0 if f == v else 1 if f < v else -1, up)
+
+
+def _two_sum(a, b):
+    """Error-free transformation of a + b into s + e."""
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+
+_splitter = 134217729.0  # 2 ** 27 + 1
+_exact_product_limit = 2.0 ** 995
+_exact_product_tiny = 2.0 ** -969
+
+
+def _split(a):
+    c = _splitter * a
+    hi = c - (c - a)
+    return hi, a - hi
+
+
+def _two_product(a, b):
+    """Error-free transformation of a * b into p + e.
+
+    Returns a `None` error if the operands are out of the range where the
+    transformation is exact.
+    """
+    p = a * b
+    if not (_exact_product_tiny < abs(p) < _exact_product_limit and
+            abs(a) < _exact_product_limit and
+            abs(b) < _exact_product_limit):
+        return p, None
+    a_hi, a_lo = _split(a)
+    b_hi, b_lo = _split(b)
+    e = ((a_hi * b_hi - p) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+    return p, e
+
+
+def _round_double(v, e, up):
+    if e is None:
+        if not math.isfinite(v):
+            return v if (v > 0) == up else _nextafter(v, 0)
+        return _next_up(v) if up else _next_down(v)
+    if up and e > 0:
+        return _next_up(v)
+    if not up and e < 0:
+        return _next_down(v)
+    return v
+
+
+def _round(v, e, up):
+    """Rounds the exact value `v + e` outwards to the analyzed precision, an
+    unknown error `e` is denoted by `None`."""
+    p = context.precision + 1
+    if p > _double_precision or not _exact_product_tiny < abs(v) < _float_inf:
+        # doubles, or outside the range where we can scale exactly
+        return _round_double(v, e, up)
+    m, x = math.frexp(v)
+    s = math.ldexp(m, p)
+    r = math.ceil(s) if up else math.floor(s)
+    if r != s:
+        return math.ldexp(r, x - p)
+    if e is not None and (e <= 0 if up else e >= 0):
+        return v
+    u = math.ldexp(1.0, x - p)
+    if (v > 0) != up and abs(s) == 2 ** (p - 1):
+        # stepping towards zero into the binade below
+        u /= 2
+    return v + u if up else v - u
+
+
+def _add_round(a, b, up):
+    s, e = _two_sum(a, b)
+    if not math.isfinite(s):
+        if math.isinf(a) or math.isinf(b):
+            return s
+        e = None
+    return _round(s, e, up)
+
+
+def _mul_exact(a, b):
+    if a == 0 or b == 0 or math.isinf(a) or math.isinf(b):
+        return a * b, 0
+    return _two_product(a, b)
+
+
+def _div_exact(a, b):
+    if a == 0 or math.isinf(a) or math.isinf(b):
+        return a / b, 0
+    q = a / b
+    p, e = _two_product(q, b)
+    if e is not None:
+        # the exact quotient is q + ((a - p) - e) / b
+        e = ((a - p) - e) / b
+    return q, e
+
+
+def _lower_key(value):
+    v, e = value
+    return v, -_float_inf if e is None else e
+
+
+def _upper_key(value):
+    v, e = value
+    return v, _float_inf if e is None else e
+
+
+def _float_ulp(v, underflow):
+    """Computes the ulp of a value with doubles, returns `None` if doubles
+    cannot represent it exactly."""
+    p = context.precision + 1
+    emin = gmpy2.get_context().emin
+    if underflow:
+        underflow_error = math.ldexp(1.0, emin)
+        if underflow_error == 0:
+            return None
+    else:
+        underflow_error = 0.0
+    if v == 0:
+        return underflow_error
+    v = _float_bound(abs(v), True)
+    if math.isinf(v):
+        return _float_inf
+    m, e = math.frexp(v)
+    # rounding away from zero to the precision may carry into next binade
+    if math.ceil(math.ldexp(m, p)) >= 2 ** p:
+        e += 1
+    if e - p < emin:
+        return None
+    u = math.ldexp(1.0, e - p)
+    if math.isinf(u):
+        return _float_inf
+    return _add_round(u, underflow_error, True)
+
+
+class _UlpTable(object):
+    """Ulps and round-off errors in a precision indexed by the exponents of
+    the ulps, entries are computed as exponents are looked up."""
+    def __init__(self, emin):
+        super().__init__()
+        self.underflow_error = mpq(2) ** emin
+        self.ulps = {}
+        self.errors = {}
+
+    def ulp(self, exponent, underflow):
+        key = (exponent, underflow)
+        value = self.ulps.get(key)
+        if value is not None:
+            return value
+        underflow_error = self.underflow_error if underflow else 0
+        try:
+            with gmpy2.local_context(round=gmpy2.RoundUp):
+                value = mpfr(mpq(2) ** exponent + underflow_error)
+        except (OverflowError, ValueError):
+            value = inf
+        self.ulps[key] = value
+        return value
+
+    def round_off_error(self, exponent):
+        error = self.errors.get(exponent)
+        if error is None:
+            error = self.ulp(exponent, True) / 2
+            error = self.errors[exponent] = FloatInterval([-error, error])
+        return error
+
+
+_ulp_tables = {}
+
+
+def _ulp_table():
+    """The table of ulps for the current precision."""
+    gmpy2_context = gmpy2.get_context()
+    key = gmpy2_context.precision, gmpy2_context.emin
+    table = _ulp_tables.get(key)
+    if table is None:
+        table = _ulp_tables[key] = _UlpTable(gmpy2_context.emin)
+    return table
+
+
+def _ulp_exponent(v):
+    """The exponent of the ulp of a non-zero value, or `None` if it is not
+    finite."""
+    if type(v) is not mpfr_type:
+        with gmpy2.local_context(round=gmpy2.RoundAwayZero):
+            v = mpfr(v)
+    if not gmpy2.is_finite(v):
+        return None
+    return gmpy2.get_exp(v) - v.precision
+
+
 def ulp(v, underflow=True):
     """Computes the unit of the last place for a value.
 
@@ -73,25 +319,25 @@ def ulp(v, underflow=True):
     :param v: The value.
     :type v: any gmpy2 values
     """
-    if underflow:
-        underflow_error = mpq(2) ** gmpy2.get_context().emin
-    else:
-        underflow_error = 0
+    if _float_backend():
+        u = _float_ulp(v, underflow)
+        if u is not None:
+            return u
+    table = _ulp_table()
     if v == 0:  # corner case, exponent is 1
-        return underflow_error
-    if type(v) is not mpfr_type:
-        with gmpy2.local_context(round=gmpy2.RoundAwayZero):
-            v = mpfr(v)
-    try:
-        with gmpy2.local_context(round=gmpy2.RoundUp):
-            return mpfr(mpq(2) ** v.as_mantissa_exp()[1] + underflow_error)
-    except (OverflowError, ValueError):
+        return table.underflow_error if underflow else 0
+    exponent = _ulp_exponent(v)
+    if exponent is None:
         return inf
+    return table.ulp(exponent, underflow)
 
 
 def overapproximate_error(e):
-    f = []
     e_min, e_max = _unpack(e)
+    if _float_backend():
+        return FloatInterval([
+            _float_bound(e_min, False), _float_bound(e_max, True)])
+    f = []
     for v, r in [(e_min, gmpy2.RoundDown), (e_max, gmpy2.RoundUp)]:
         with gmpy2.local_context(round=r):
             f.append(mpfr(v))
@@ -100,7 +346,12 @@ def overapproximate_error(e):
 
 def round_off_error(v):
     v_min, v_max = _unpack(v)
-    error = ulp(max(abs(v_min), abs(v_max))) / 2
+    v = max(abs(v_min), abs(v_max))
+    if v != 0 and not _float_backend():
+        exponent = _ulp_exponent(v)
+        if exponent is not None:
+            return _ulp_table().round_off_error(exponent)
+    error = ulp(v) / 2
     return FloatInterval([-error, error])
 
 
@@ -136,95 +387,139 @@ def _decorate_coerce(func):
 
 
 def _decorate_operator(func):
+    coerced_func = _decorate_coerce(func)
+
     @functools.wraps(func)
     def wrapper(self, other):
-        with ignored(AttributeError):
+        try:
             if self.is_top() or other.is_top():
                 # top denotes no information or non-termination
                 return _coerce(self, other)(top=True)
-        with ignored(AttributeError):
+        except AttributeError:
+            pass
+        try:
             if self.is_bottom() or other.is_bottom():
                 # bottom denotes conflict
                 return _coerce(self, other)(bottom=True)
+        except AttributeError:
+            pass
         try:
-            return _decorate_coerce(func)(self, other)
+            return coerced_func(self, other)
         except gmpy2.RangeError:
             logger.warning('gmpy2 throws RangeError, default to top.')
             return self.__class__(top=True)
     return wrapper
 
 
+def _restore(cls, *args):
+    return cls._make(*args)
+
+
+def _intern(value):
+    """Shares `value` with an equal value constructed earlier if interning is
+    enabled."""
+    if not context.intern_values:
+        return value
+    key = (value.__class__, value._intern_key())
+    interned = Lattice._cache.get(key)
+    if interned is not None:
+        return interned
+    Lattice._cache[key] = value
+    return value
+
+
+def _bound_key(v):
+    if v == 0:
+        # distinguishes signed zeros
+        return type(v), v, math.copysign(1, v)
+    return type(v), v
+
+
 class Interval(Lattice):
-    """The interval base class."""
-    def __init__(self, v=None, top=False, bottom=False):
+    """The interval base class.
+
+    Intervals are immutable and constructed by :meth:`__new__`, which does
+    not look up the cache of :class:`soap.common.cache.Flyweight` by
+    pickling its arguments.  The top and bottom checks done by
+    :class:`soap.lattice.base.Lattice` are inlined in the operators.
+    """
+    __slots__ = ('min', 'max')
+
+    def __new__(cls, v=None, top=False, bottom=False):
         if isinstance(v, Interval):
             top = top or v.is_top()
             bottom = bottom or v.is_bottom()
-        super().__init__(top=top, bottom=bottom)
-        if top or bottom:
-            return
-        self.min, self.max = _unpack(v)
-        if self.min > self.max:
+        if top and bottom:
+            raise ValueError(
+                'Lattice element cannot be bottom and top simultaneously.')
+        if bottom:
+            return cls._make(bottom=True)
+        if top:
+            return cls._make(-inf, inf)
+        v_min, v_max = _unpack(v)
+        if v_min > v_max:
             raise ValueError('min_val cannot be greater than max_val')
+        return cls._make(*cls._cast_bounds(v_min, v_max))
+
+    def __init__(self, v=None, top=False, bottom=False):
+        pass
+
+    @classmethod
+    def _make(cls, min_val=None, max_val=None, bottom=False):
+        self = object.__new__(cls)
+        self._hash = None
+        self.bottom = bottom
+        if bottom:
+            self.top = False
+        else:
+            self.min = min_val
+            self.max = max_val
+            self.top = min_val == -inf and max_val == inf
+        return _intern(self)
+
+    def _intern_key(self):
+        if self.bottom:
+            return None
+        return _bound_key(self.min), _bound_key(self.max)
+
+    @classmethod
+    def _cast_bounds(cls, v_min, v_max):
+        return v_min, v_max
+
+    def __reduce__(self):
+        if self.bottom:
+            return _restore, (self.__class__, None, None, True)
+        return _restore, (self.__class__, self.min, self.max)
 
     def is_top(self):
-        return self.min == float('-Inf') and self.max == float('Inf')
+        return self.top
 
     def is_bottom(self):
-        return False
-
-    @property
-    def min(self):
-        try:
-            return self._min
-        except AttributeError:
-            pass
-        if self.is_top():
-            return -inf
-        if self.is_bottom():
-            raise AttributeError('{!r} has no attribute "min"'.format(self))
-        raise AttributeError(
-            '{!r} is not top or bottom but has no attribute "min"'
-            .format(self))
-
-    @min.setter
-    def min(self, v):
-        self._min = v
-
-    @property
-    def max(self):
-        try:
-            return self._max
-        except AttributeError:
-            pass
-        if self.is_top():
-            return inf
-        if self.is_bottom():
-            raise AttributeError(
-                'Bottom {!r} has no attribute "max"'.format(self))
-        raise AttributeError(
-            '{!r} is not top or bottom but has no attribute "max"'
-            .format(self))
-
-    @max.setter
-    def max(self, v):
-        self._max = v
+        return self.bottom
 
     def to_constant(self):
         if self.min != self.max:
             raise ValueError('Value is not a constant.')
         return self.min
 
-    @_decorate_coerce
-    def join(self, other, cls):
-        if cls is not None:
+    def join(self, other):
+        if self.top or other.is_bottom():
+            return self
+        if self.bottom or other.is_top():
+            return other
+        if type(other) is not type(self):
+            cls = _coerce(self, other)
             return cls(self) | cls(other)
         return self.__class__(
             [min(self.min, other.min), max(self.max, other.max)])
 
-    @_decorate_coerce
-    def meet(self, other, cls):
-        if cls is not None:
+    def meet(self, other):
+        if self.top or other.is_bottom():
+            return other
+        if self.bottom or other.is_top():
+            return self
+        if type(other) is not type(self):
+            cls = _coerce(self, other)
             return cls(self) & cls(other)
         try:
             return self.__class__(
@@ -232,12 +527,28 @@ class Interval(Lattice):
         except ValueError:  # min >= max
             return self.__class__(bottom=True)
 
-    @_decorate_coerce
-    def le(self, other, cls):
-        if cls is not None:
+    def le(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        if self.bottom or other.is_top():
+            return True
+        if self.top or other.is_bottom():
+            return False
+        if type(other) is not type(self):
+            cls = _coerce(self, other)
             return cls(self).le(cls(other))
         return (self.min >= other.min) and (self.max <= other.max)
 
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return False
+        if self.bottom or other.bottom:
+            return self.bottom and other.bottom
+        return self.min == other.min and self.max == other.max
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
     def __iter__(self):
         return iter((self.min, self.max))
 
@@ -328,33 +639,44 @@ class Interval(Lattice):
         return self.__class__([min_val, max_val])
 
     def __str__(self):
+        if self.top or self.bottom:
+            return Lattice.__str__(self)
+        return self._str()
+
+    def _str(self):
         min_val = '-∞' if self.min == -inf else self.min
         max_val = '∞' if self.max == inf else self.max
         if min_val == max_val:
             return str(min_val)
         return '[{}, {}]'.format(min_val, max_val)
-    format = __str__
+    format = _str
 
     def __repr__(self):
+        if self.top or self.bottom:
+            return Lattice.__repr__(self)
         return '{cls}([{min!r}, {max!r}])'.format(
             cls=self.__class__.__name__, min=self.min, max=self.max)
 
     def __hash__(self):
-        self._hash = hash_val = hash(tuple(self))
+        hash_val = self._hash
+        if hash_val is None:
+            if self.top or self.bottom:
+                hash_val = hash((self.top, self.bottom))
+            else:
+                hash_val = hash((self.min, self.max))
+            self._hash = hash_val
         return hash_val
 
 
 class IntegerInterval(Interval):
     """The interval containing integer values."""
-    def __init__(self, v=None, top=False, bottom=False):
-        super().__init__(v, top=top, bottom=bottom)
-        try:
-            if self.min not in (-inf, inf):
-                self.min = mpz(self.min)
-            if self.max not in (-inf, inf):
-                self.max = mpz(self.max)
-        except AttributeError:
-            'The interval is a top or bottom.'
+    @classmethod
+    def _cast_bounds(cls, v_min, v_max):
+        if v_min not in (-inf, inf):
+            v_min = mpz(v_min)
+        if v_max not in (-inf, inf):
+            v_max = mpz(v_max)
+        return v_min, v_max
 
     def __truediv__(self, other):
         return FloatInterval(self) / other
@@ -366,92 +688,185 @@ class _FloatIntervalFormatMixin(object):
         max_val = '∞' if self.max == inf else '{:.5g}'.format(self.max)
         return min_val, max_val
 
-    def __str__(self):
+    def _str(self):
         if self.min == self.max:
             return '{}f'.format(self._vals_to_str()[0])
         return '[{}, {}]'.format(*self._vals_to_str())
 
 
+def _are_float_bounds(self, other):
+    return type(self.min) is float and type(other.min) is float
+
+
 class FloatInterval(_FloatIntervalFormatMixin, Interval):
-    """The interval containing floating point values."""
-    def __init__(self, v=None, top=False, bottom=False):
-        super().__init__(v, top=top, bottom=bottom)
-        if top or bottom:
-            return
-        try:
-            self.min = mpfr(self.min)
-            self.max = mpfr(self.max)
-        except AttributeError:
-            'The interval is a top or bottom.'
+    """The interval containing floating point values.
+
+    With the 'float' interval backend, bounds are stored as doubles and
+    arithmetic on them is rounded outwards.
+    """
+    @classmethod
+    def _cast_bounds(cls, v_min, v_max):
+        if _float_backend():
+            return _float(v_min), _float(v_max)
+        return mpfr(v_min), mpfr(v_max)
+
+    @_decorate_operator
+    def __add__(self, other, cls):
+        if cls is not None or not _are_float_bounds(self, other):
+            return Interval.__add__.__wrapped__(self, other, cls)
+        return self.__class__([
+            _add_round(self.min, other.min, False),
+            _add_round(self.max, other.max, True)])
+    __radd__ = __add__
+
+    @_decorate_operator
+    def __sub__(self, other, cls):
+        if cls is not None or not _are_float_bounds(self, other):
+            return Interval.__sub__.__wrapped__(self, other, cls)
+        return self.__class__([
+            _add_round(self.min, -other.max, False),
+            _add_round(self.max, -other.min, True)])
+
+    def _float_arith(self, other, func):
+        values = [
+            func(self.min, other.min), func(self.min, other.max),
+            func(self.max, other.min), func(self.max, other.max)]
+        return self.__class__([
+            _round(*min(values, key=_lower_key), up=False),
+            _round(*max(values, key=_upper_key), up=True)])
+
+    @_decorate_operator
+    def __mul__(self, other, cls):
+        if cls is not None or not _are_float_bounds(self, other):
+            return Interval.__mul__.__wrapped__(self, other, cls)
+        return self._float_arith(other, _mul_exact)
+    __rmul__ = __mul__
+
+    @_decorate_operator
+    def __truediv__(self, other, cls):
+        if cls is not None or not _are_float_bounds(self, other):
+            return Interval.__truediv__.__wrapped__(self, other, cls)
+        if 0 in other:
+            # rare case, lets gmpy2 deal with divisions by zero
+            value = Interval([mpfr(self.min), mpfr(self.max)]) / \
+                Interval([mpfr(other.min), mpfr(other.max)])
+            return self.__class__([value.min, value.max])
+        return self._float_arith(other, _div_exact)
 
 
 class FractionInterval(_FloatIntervalFormatMixin, Interval):
     """The interval containing real rational values."""
-    def __init__(self, v=None, top=False, bottom=False):
-        super().__init__(v, top=top, bottom=bottom)
-        if top or bottom:
-            return
-        self.min = mpq(self.min)
-        self.max = mpq(self.max)
+    @classmethod
+    def _cast_bounds(cls, v_min, v_max):
+        return mpq(v_min), mpq(v_max)
+
+
+def _error(v, e):
+    if isinstance(e, FloatInterval):
+        return e
+    if e is not None:
+        return overapproximate_error(e)
+    if isinstance(v, Lattice):
+        if v.is_top():
+            return FloatInterval(top=True)
+        if v.is_bottom():
+            return FloatInterval(bottom=True)
+    v_min, v_max = _unpack(v)
+    if _are_instance(v, (int, mpz_type)):
+        abs_val = max(abs(v_min), abs(v_max))
+        if mpfr(abs_val) == abs_val:
+            # some integers cannot be expressed exactly in fp values
+            return FloatInterval(0)
+    if v_min == v_max:
+        return round_off_error_from_exact(v_min)
+    return round_off_error(FloatInterval(v))
 
 
 class ErrorSemantics(Lattice):
-    """The error semantics."""
-    def __init__(self, v=None, e=None, top=False, bottom=False):
-        super().__init__(top=top, bottom=bottom)
-        if top or bottom:
-            self.v = self.e = FloatInterval(top=top, bottom=bottom)
-            return
-
-        def error(v, e):
-            if isinstance(e, FloatInterval):
-                return e
-            if e is not None:
-                return overapproximate_error(e)
-            if isinstance(v, Lattice):
-                if v.is_top():
-                    return FloatInterval(top=True)
-                if v.is_bottom():
-                    return FloatInterval(bottom=True)
-            v_min, v_max = _unpack(v)
-            if _are_instance(v, (int, mpz_type)):
-                abs_val = max(abs(v_min), abs(v_max))
-                if mpfr(abs_val) == abs_val:
-                    # some integers cannot be expressed exactly in fp values
-                    return FloatInterval(0)
-            if v_min == v_max:
-                return round_off_error_from_exact(v_min)
-            return round_off_error(FloatInterval(v))
+    """The error semantics.
 
+    As with :class:`Interval`, values are immutable and constructed by
+    :meth:`__new__`.
+    """
+    __slots__ = ('v', 'e')
+
+    def __new__(cls, v=None, e=None, top=False, bottom=False):
+        if top and bottom:
+            raise ValueError(
+                'Lattice element cannot be bottom and top simultaneously.')
+        if top or bottom:
+            value = FloatInterval(top=top, bottom=bottom)
+            return cls._make(value, value)
         if isinstance(v, ErrorSemantics):
-            self.v, self.e = v
-        else:
-            self.v, self.e = FloatInterval(v), error(v, e)
+            return cls._make(v.v, v.e)
+        return cls._make(FloatInterval(v), _error(v, e))
+
+    def __init__(self, v=None, e=None, top=False, bottom=False):
+        pass
+
+    @classmethod
+    def _make(cls, v, e):
+        self = object.__new__(cls)
+        self._hash = None
+        self.v = v
+        self.e = e
+        self.top = v.top
+        self.bottom = v.bottom
+        return _intern(self)
+
+    def _intern_key(self):
+        return self.v._intern_key(), self.e._intern_key()
+
+    def __reduce__(self):
+        return _restore, (self.__class__, self.v, self.e)
 
     def is_top(self):
-        return self.v.is_top()
+        return self.top
 
     def is_bottom(self):
-        return self.v.is_bottom()
+        return self.bottom
 
-    @_decorate_coerce
-    def join(self, other, cls):
-        if cls is not None:
+    def join(self, other):
+        if self.top or other.is_bottom():
+            return self
+        if self.bottom or other.is_top():
+            return other
+        if type(other) is not type(self):
+            cls = _coerce(self, other)
             return cls(self) | cls(other)
-        return self.__class__(self.v | other.v, self.e | other.e)
+        return self._make(self.v | other.v, self.e | other.e)
 
-    @_decorate_coerce
-    def meet(self, other, cls):
-        if cls is not None:
+    def meet(self, other):
+        if self.top or other.is_bottom():
+            return other
+        if self.bottom or other.is_top():
+            return self
+        if type(other) is not type(self):
+            cls = _coerce(self, other)
             return cls(self) & cls(other)
-        return self.__class__(self.v & other.v, self.e & other.e)
-
-    @_decorate_coerce
-    def le(self, other, cls):
-        if cls is not None:
-            return cls(self).le(cls(other))
+        return self._make(self.v & other.v, self.e & other.e)
+
+    def le(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        if self.bottom or other.is_top():
+            return True
+        if self.top or other.is_bottom():
+            return False
         return self.v.le(other.v) and self.e.le(other.e)
 
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return False
+        if self.top or other.top:
+            return self.top and other.top
+        if self.bottom or other.bottom:
+            return self.bottom and other.bottom
+        return self.v == other.v and self.e == other.e
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
     def __iter__(self):
         return iter((self.v, self.e))
 
@@ -577,6 +992,8 @@ class ErrorSemantics(Lattice):
         return ErrorSemantics(self.v, [k_min, k_max])
 
     def __str__(self):
+        if self.top or self.bottom:
+            return Lattice.__str__(self)
         v = str(self.v)
         e = '' if self.e.min == self.e.max == 0 else str(self.e)
         if not e:
@@ -588,11 +1005,19 @@ class ErrorSemantics(Lattice):
         return v + e
 
     def __repr__(self):
+        if self.top or self.bottom:
+            return Lattice.__repr__(self)
         return '{cls}({value!r}, {error!r})'.format(
             cls=self.__class__.__name__, value=self.v, error=self.e)
 
     def __hash__(self):
-        self._hash = hash_val = hash((self.v, self.e))
+        hash_val = self._hash
+        if hash_val is None:
+            if self.top or self.bottom:
+                hash_val = hash((self.top, self.bottom))
+            else:
+                hash_val = hash((self.v, self.e))
+            self._hash = hash_val
         return hash_val
 
 
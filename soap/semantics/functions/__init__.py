@@ -1,4 +1,7 @@
-from soap.semantics.functions.arithmetic import arith_eval, error_eval
+from soap.semantics.functions.arithmetic import (
+    arith_eval, error_eval, SharedArithmeticEvaluator
+)
+from soap.semantics.functions.batch import batch_arith_eval
 from soap.semantics.functions.boolean import bool_eval
 from soap.semantics.functions.fixpoint import (
     fixpoint_eval, unroll_fix_expr, fix_expr_eval
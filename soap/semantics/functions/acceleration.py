@@ -0,0 +1,246 @@
+"""
+.. module:: soap.semantics.functions.acceleration
+    :synopsis: Closed-form bounds of counted loops.
+"""
+import gmpy2
+
+from soap.context import context
+from soap.expression import operators, BinaryArithExpr
+from soap.semantics.common import is_numeral
+from soap.semantics.error import (
+    ErrorSemantics, FloatInterval, IntegerInterval, inf, mpfr, mpq,
+    overapproximate_error, ulp
+)
+from soap.semantics.functions.arithmetic import arith_eval
+
+
+def _expr_vars(expr):
+    if is_numeral(expr):
+        return set()
+    return expr.vars()
+
+
+def _counted_loop(fix_expr, state):
+    """Finds the iteration variable, its start and step values, and the trip
+    count of a counted loop starting from `state`."""
+    from soap.semantics.schedule.extract import ForLoopExtractor
+    extractor = ForLoopExtractor(fix_expr)
+    if not extractor.is_for_loop or extractor.has_inner_loops:
+        return
+    iter_var = extractor.iter_var
+    stop, step = extractor.iter_slice.stop, extractor.iter_slice.step
+    start = state[iter_var]
+    if not isinstance(stop, int) or not isinstance(start, IntegerInterval):
+        return
+    if start.is_top() or start.is_bottom() or start.min != start.max:
+        return
+    start = int(start.min)
+    if fix_expr.bool_expr.op == operators.NOT_EQUAL_OP:
+        if (stop - start) % step:
+            return
+    trip_count = max(0, -((start - stop) // step))
+    return iter_var, start, step, trip_count
+
+
+def _recurrence(var, expr):
+    if not isinstance(expr, BinaryArithExpr):
+        return None, None
+    arg_1, arg_2 = expr.args
+    if expr.op == operators.ADD_OP:
+        if arg_1 == var:
+            return 'add', arg_2
+        if arg_2 == var:
+            return 'add', arg_1
+    if expr.op == operators.SUBTRACT_OP and arg_1 == var:
+        return 'subtract', arg_2
+    if expr.op == operators.MULTIPLY_OP:
+        if arg_1 == var:
+            return 'multiply', arg_2
+        if arg_2 == var:
+            return 'multiply', arg_1
+    return None, None
+
+
+def _recurrences(loop_state, iter_var, state):
+    """Classifies variables updated in the loop, returns `None` if any
+    variable is not an affine or a geometric recurrence.
+
+    Variables can be computed afresh from loop invariants and the iteration
+    variable in each iteration ('free'), incremented by such a value
+    ('add', 'subtract'), or multiplied by a loop invariant ('multiply').
+    """
+    invariants = {var for var, expr in loop_state.items() if expr == var}
+    invariants |= set(state) - set(loop_state)
+    inputs = invariants | {iter_var}
+    recurrences = {}
+    for var, expr in loop_state.items():
+        if var == iter_var or var in invariants:
+            continue
+        if _expr_vars(expr) <= inputs:
+            recurrences[var] = ('free', expr)
+            continue
+        kind, arg = _recurrence(var, expr)
+        if kind is None:
+            return
+        arg_vars = _expr_vars(arg)
+        if kind == 'multiply' and not arg_vars <= invariants:
+            return
+        if not arg_vars <= inputs:
+            return
+        value = state[var]
+        if not isinstance(value, (IntegerInterval, ErrorSemantics)):
+            return
+        if value.is_top() or value.is_bottom():
+            return
+        recurrences[var] = (kind, arg)
+    return recurrences
+
+
+def _magnitude(interval):
+    return max(abs(interval.min), abs(interval.max))
+
+
+def _round_off_sum(magnitude, increment, count):
+    """Bounds the sum of round-off errors of values with magnitudes up to
+    `magnitude + k * increment` for `k` from 1 to `count`.
+
+    Round-off errors are constant within each binade, so the sum is
+    computed with a term for each binade the values cross.
+    """
+    magnitude, increment = mpq(magnitude), mpq(increment)
+    total = 0
+    k = 1
+    while k <= count:
+        value = magnitude + k * increment
+        if value == 0 or increment == 0:
+            last = count
+        else:
+            # smallest power of two larger than value
+            bound = mpq(2) ** (
+                value.numerator.bit_length() -
+                value.denominator.bit_length() - 1)
+            while bound <= value:
+                bound *= 2
+            last = min(count, int(gmpy2.ceil((bound - magnitude) / increment)))
+            if magnitude + last * increment >= bound:
+                last -= 1
+        total += (last - k + 1) * mpq(ulp(magnitude + last * increment)) / 2
+        k = last + 1
+    with gmpy2.local_context(round=gmpy2.RoundUp):
+        return mpfr(total)
+
+
+def _add_bounds(value, increment, count, every):
+    """Bounds of `value` after `count` additions of `increment`, or all
+    values from the first to the `count`-th addition if `every` is set."""
+    if isinstance(value, IntegerInterval):
+        if every:
+            return value + IntegerInterval([1, count]) * increment
+        return value + IntegerInterval(count) * increment
+    v, e = value
+    inc_v, inc_e = increment
+    factor = FloatInterval([1, count]) if every else FloatInterval(count)
+    v_max, inc_max = _magnitude(v), _magnitude(inc_v)
+    if v_max == inf or inc_max == inf:
+        round_off = FloatInterval(top=True)
+    else:
+        round_off = _round_off_sum(v_max, inc_max, count)
+        round_off = FloatInterval([-round_off, round_off])
+    return ErrorSemantics(
+        v + factor * inc_v, e + factor * inc_e + round_off)
+
+
+def _multiply_bounds(value, factor, count, every):
+    """Bounds of `value` after `count` multiplications by `factor`, or all
+    values from the first to the `count`-th multiplication if `every` is
+    set."""
+    f_min, f_max = mpfr(factor.v.min), mpfr(factor.v.max)
+    with gmpy2.local_context(round=gmpy2.RoundDown):
+        p_min = f_min ** count
+    with gmpy2.local_context(round=gmpy2.RoundUp):
+        p_max = f_max ** count
+    power = overapproximate_error([p_min, p_max])
+    if every:
+        power |= factor.v
+    v, e = value
+    # relative round-off error, and absolute underflow error
+    unit = mpq(2) ** -gmpy2.get_context().precision
+    underflow = ulp(0) / 2
+    with gmpy2.local_context(round=gmpy2.RoundUp):
+        # |e'| <= |e| * (|f.v| + |f.e|) + |v| * |f.e| + |v'| * unit + underflow
+        f_error = mpfr(_magnitude(factor.e))
+        growth = f_max + f_error
+        if every:
+            growth, f_max = max(1, growth), max(1, f_max)
+        e_max = mpfr(_magnitude(e)) * growth ** count
+        e_max += count * (
+            mpfr(_magnitude(v)) * (f_error + unit * f_max) *
+            growth ** (count - 1) + underflow * max(1, growth) ** (count - 1))
+    return ErrorSemantics(v * power, [-e_max, e_max])
+
+
+def accelerate_fixpoint(fix_expr, state):
+    """Computes loop information of `fixpoint_eval` in closed form for
+    counted loops with at least `context.loop_acceleration` iterations,
+    returns `None` if the loop cannot be accelerated."""
+    loop = _counted_loop(fix_expr, state)
+    if loop is None:
+        return
+    iter_var, start, step, trip_count = loop
+    if trip_count == 0 or trip_count < context.loop_acceleration:
+        return
+    recurrences = _recurrences(fix_expr.loop_state, iter_var, state)
+    if recurrences is None:
+        return
+
+    def iter_state(first, last):
+        return state.immu_update(iter_var, IntegerInterval(
+            [start + first * step, start + last * step]))
+
+    # increments and factors over all iterations
+    loop_state = iter_state(0, trip_count - 1)
+    args = {}
+    for var, (kind, arg) in recurrences.items():
+        if kind == 'free':
+            continue
+        arg = arith_eval(arg, loop_state)
+        if kind == 'subtract':
+            arg = -arg
+        value = state[var]
+        if isinstance(value, ErrorSemantics) and \
+                isinstance(arg, IntegerInterval):
+            arg = ErrorSemantics(arg)
+        if type(arg) is not type(value) or arg.is_top() or arg.is_bottom():
+            return
+        if kind == 'multiply':
+            if not isinstance(arg, ErrorSemantics) or arg.v.min < 0:
+                return
+        args[var] = arg
+
+    def bounds(count, every):
+        first = 0 if every else count - 1
+        body_state = iter_state(first, count - 1)
+        values = {iter_var: body_state[iter_var] + IntegerInterval(step)}
+        for var, (kind, expr) in recurrences.items():
+            if kind == 'free':
+                values[var] = arith_eval(expr, body_state)
+            elif kind == 'multiply':
+                values[var] = _multiply_bounds(
+                    state[var], args[var], count, every)
+            else:
+                values[var] = _add_bounds(state[var], args[var], count, every)
+        return state.immu_merge(values)
+
+    exit_state = bounds(trip_count, False)
+    entry_state = state
+    if trip_count > 1:
+        entry_state |= bounds(trip_count - 1, True)
+    return {
+        'entry': entry_state,
+        'exit': exit_state,
+        'last_entry': state.empty(),
+        'last_exit': exit_state,
+        'end': bounds(trip_count, True),
+        'trip_count': trip_count,
+        'path': 'acceleration',
+    }
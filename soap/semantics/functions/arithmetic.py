@@ -106,6 +106,34 @@ class ArithmeticEvaluator(base_dispatcher()):
 arith_eval = ArithmeticEvaluator()
 
 
+class SharedArithmeticEvaluator(ArithmeticEvaluator):
+    """Evaluates expressions in a fixed state, where the value of each
+    unique subexpression is evaluated once for all expressions evaluated by
+    the same evaluator.
+
+    Values are looked up by expression instead of by pickling expressions and
+    the state.  Expressions evaluated in other states, e.g. the branches of
+    :class:`soap.expression.SelectExpr`, use
+    :func:`soap.semantics.functions.arith_eval`.
+    """
+    def __init__(self, state):
+        super().__init__()
+        self.state = state
+        self._values = {}
+
+    def __call__(self, expr, state):
+        if state is not self.state:
+            return arith_eval(expr, state)
+        try:
+            return self._values[expr]
+        except KeyError:
+            pass
+        except TypeError:
+            return arith_eval(expr, state)
+        value = self._values[expr] = self._dispatch(expr)(expr, state)
+        return value
+
+
 def _to_norm(value):
     if isinstance(value, IntegerIntervalArray):
         if value.is_scalar():
@@ -120,10 +148,10 @@ def _to_norm(value):
     return value
 
 
-def error_eval(expr, state, to_norm=True):
+def error_eval(expr, state, to_norm=True, evaluator=None):
     if isinstance(expr, (BinaryBoolExpr, Subscript)):
         return 0
-    value = arith_eval(expr, state)
+    value = (evaluator or arith_eval)(expr, state)
     if to_norm:
         value = _to_norm(value)
     if isinstance(value, IntegerInterval):
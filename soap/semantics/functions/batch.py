@@ -0,0 +1,339 @@
+"""
+.. module:: soap.semantics.functions.batch
+    :synopsis: Batched evaluation of an expression for many states.
+"""
+import math
+
+import numpy
+
+from soap.common import base_dispatcher
+from soap.context import context
+from soap.expression import operators
+from soap.semantics.bounds import (
+    _exact_round, _interval_add, _interval_div, _interval_mul, _interval_sub,
+    _mul_exact, _precision, _round_off_error
+)
+from soap.semantics.error import (
+    ErrorSemantics, IntegerInterval, mpfr_type, mpz_type, _double_precision,
+    _two_sum
+)
+from soap.semantics.functions.arithmetic import (
+    arith_eval, _binary_operator_function_dictionary,
+    _unary_operator_function_dictionary
+)
+
+
+_integer_limit = 2.0 ** 53
+
+
+class _Batch(object):
+    """Bounds of values in a batch of states.
+
+    Values of all states are stored as NumPy arrays of bounds.  Values that
+    are not representable, such as tops, bottoms, arrays or values out of
+    range, are kept as scalar objects in `scalars` and masked out of the
+    arrays.
+    """
+    __slots__ = ('v_min', 'v_max', 'e_min', 'e_max', 'integer', 'scalars')
+
+    def __init__(self, v_min, v_max, e_min, e_max, integer, scalars=None):
+        super().__init__()
+        self.v_min = v_min
+        self.v_max = v_max
+        self.e_min = e_min
+        self.e_max = e_max
+        self.integer = integer
+        self.scalars = scalars or {}
+
+    def __len__(self):
+        return len(self.v_min)
+
+    @classmethod
+    def from_values(cls, values):
+        n = len(values)
+        v_min, v_max = numpy.zeros(n), numpy.zeros(n)
+        e_min, e_max = numpy.zeros(n), numpy.zeros(n)
+        integer = any(isinstance(v, IntegerInterval) for v in values)
+        value_class = IntegerInterval if integer else ErrorSemantics
+        scalars = {}
+        for i, value in enumerate(values):
+            bounds = _value_bounds(value, value_class)
+            if bounds is None:
+                scalars[i] = value
+                continue
+            v_min[i], v_max[i], e_min[i], e_max[i] = bounds
+        return cls(v_min, v_max, e_min, e_max, integer, scalars)
+
+    @classmethod
+    def broadcast(cls, value, n):
+        batch = cls.from_values([value])
+        if batch.scalars:
+            return cls.from_values([value] * n)
+        full = lambda v: numpy.full(n, v[0])
+        return cls(
+            full(batch.v_min), full(batch.v_max),
+            full(batch.e_min), full(batch.e_max), batch.integer)
+
+    def value(self, i):
+        try:
+            return self.scalars[i]
+        except KeyError:
+            pass
+        v = [float(self.v_min[i]), float(self.v_max[i])]
+        if self.integer:
+            return IntegerInterval([int(v[0]), int(v[1])])
+        return ErrorSemantics(
+            v, [float(self.e_min[i]), float(self.e_max[i])])
+
+    def values(self):
+        return [self.value(i) for i in range(len(self))]
+
+    def to_error(self, float_cast=False):
+        """Coerces an integer batch into an error batch.
+
+        Integer values have no errors, unless `float_cast`, where as with
+        the cast of :class:`IntegerInterval` into
+        :class:`soap.semantics.error.FloatInterval`, non-constant values
+        have round-off errors.
+        """
+        if not self.integer:
+            return self
+        abs_val = numpy.maximum(numpy.abs(self.v_min), numpy.abs(self.v_max))
+        scalars = dict(self.scalars)
+        for i in numpy.nonzero(abs_val >= 2.0 ** _precision())[0]:
+            # values not exactly representable in the precision
+            scalars.setdefault(i, self.value(i))
+        e_min, e_max = numpy.zeros(len(self)), numpy.zeros(len(self))
+        if float_cast:
+            r_min, r_max, invalid = _round_off_error(self.v_min, self.v_max)
+            constant = self.v_min == self.v_max
+            e_min = numpy.where(constant, e_min, r_min)
+            e_max = numpy.where(constant, e_max, r_max)
+            for i in numpy.nonzero(invalid & ~constant)[0]:
+                scalars.setdefault(i, self.value(i))
+        return self.__class__(
+            self.v_min, self.v_max, e_min, e_max, False, scalars)
+
+
+def _value_bounds(value, value_class):
+    if type(value) is not value_class:
+        return None
+    if value.is_top() or value.is_bottom():
+        return None
+    if value_class is IntegerInterval:
+        v_min, v_max = value.min, value.max
+        if not (abs(v_min) < _integer_limit and abs(v_max) < _integer_limit):
+            return None
+        return float(v_min), float(v_max), 0.0, 0.0
+    bounds = (value.v.min, value.v.max, value.e.min, value.e.max)
+    if any(type(b) not in (float, mpfr_type, int, mpz_type) for b in bounds):
+        return None
+    bounds = tuple(float(b) for b in bounds)
+    if not all(math.isfinite(b) for b in bounds):
+        return None
+    return bounds
+
+
+def _coerce(op, a, b):
+    if a.integer and b.integer:
+        return a, b
+    # integer intervals are divided as float intervals
+    return a.to_error(op == operators.DIVIDE_OP), b.to_error()
+
+
+def _integer_op(op, a, b):
+    # integers are exact in doubles if they are within the limit
+    if op == operators.ADD_OP:
+        v_min, v_max = a.v_min + b.v_min, a.v_max + b.v_max
+    elif op == operators.SUBTRACT_OP:
+        v_min, v_max = a.v_min - b.v_max, a.v_max - b.v_min
+    elif op == operators.MULTIPLY_OP:
+        values = [
+            a.v_min * b.v_min, a.v_min * b.v_max,
+            a.v_max * b.v_min, a.v_max * b.v_max]
+        v_min = numpy.minimum.reduce(values)
+        v_max = numpy.maximum.reduce(values)
+    else:
+        return None
+    invalid = ~(
+        (numpy.abs(v_min) < _integer_limit) &
+        (numpy.abs(v_max) < _integer_limit))
+    zeros = numpy.zeros(len(a))
+    return v_min, v_max, zeros, zeros, invalid
+
+
+def _constant_rounding(op, a, b):
+    if op == operators.ADD_OP:
+        hi, lo = _two_sum(a.v_min, b.v_min)
+    elif op == operators.SUBTRACT_OP:
+        hi, lo = _two_sum(a.v_min, -b.v_min)
+    elif op == operators.MULTIPLY_OP:
+        hi, lo = _mul_exact(a.v_min, b.v_min)
+    else:
+        return None
+    # unknown errors from TwoProduct are not exact
+    invalid = numpy.isnan(lo)
+    lo = numpy.where(invalid, 0.0, lo)
+    f, r_min, r_max, round_invalid = _exact_round(hi, lo)
+    return f, r_min, r_max, invalid | round_invalid
+
+
+def _error_op(op, a, b):
+    if op == operators.ADD_OP:
+        v_min, v_max = _interval_add(a.v_min, a.v_max, b.v_min, b.v_max)
+    elif op == operators.SUBTRACT_OP:
+        v_min, v_max = _interval_sub(a.v_min, a.v_max, b.v_min, b.v_max)
+    elif op == operators.MULTIPLY_OP:
+        v_min, v_max = _interval_mul(a.v_min, a.v_max, b.v_min, b.v_max)
+    elif op == operators.DIVIDE_OP:
+        v_min, v_max = _interval_div(a.v_min, a.v_max, b.v_min, b.v_max)
+    else:
+        return None
+    r_min, r_max, invalid = _round_off_error(v_min, v_max)
+
+    constant = (a.v_min == a.v_max) & (b.v_min == b.v_max)
+    if numpy.any(constant):
+        rounding = _constant_rounding(op, a, b)
+        if rounding is None:
+            # constant divisions are exact rationals
+            invalid |= constant
+        else:
+            f, c_min, c_max, c_invalid = rounding
+            v_min = numpy.where(constant, f, v_min)
+            v_max = numpy.where(constant, f, v_max)
+            r_min = numpy.where(constant, c_min, r_min)
+            r_max = numpy.where(constant, c_max, r_max)
+            invalid |= constant & c_invalid
+
+    # same order of operations as ErrorSemantics
+    if op == operators.ADD_OP:
+        e = _interval_add(a.e_min, a.e_max, b.e_min, b.e_max)
+        e = _interval_add(r_min, r_max, *e)
+    elif op == operators.SUBTRACT_OP:
+        e = _interval_sub(a.e_min, a.e_max, b.e_min, b.e_max)
+        e = _interval_add(r_min, r_max, *e)
+    elif op == operators.MULTIPLY_OP:
+        e = _interval_mul(a.e_min, a.e_max, b.e_min, b.e_max)
+        e = _interval_add(*e, r_min, r_max)
+        e = _interval_add(*e, *_interval_add(
+            *_interval_mul(a.v_min, a.v_max, b.e_min, b.e_max),
+            *_interval_mul(b.v_min, b.v_max, a.e_min, a.e_max)))
+    else:
+        # e = (a.e - v * b.e) / (b.v + b.e)
+        d = _interval_add(b.v_min, b.v_max, b.e_min, b.e_max)
+        invalid |= (b.v_min <= 0) & (b.v_max >= 0)
+        invalid |= (d[0] <= 0) & (d[1] >= 0)
+        e = _interval_sub(
+            a.e_min, a.e_max, *_interval_mul(v_min, v_max, b.e_min, b.e_max))
+        e = _interval_div(*e, *d)
+        e = _interval_add(*e, r_min, r_max)
+    e_min, e_max = e
+    return v_min, v_max, e_min, e_max, invalid
+
+
+class BatchArithmeticEvaluator(base_dispatcher()):
+    """Evaluates an expression for a batch of states.
+
+    Each node of the expression is evaluated once for all states, with
+    bounds of values and errors of all states as NumPy arrays, and outward
+    rounding of bounds.  Nodes that cannot be vectorized fall back to
+    :func:`soap.semantics.functions.arith_eval` for each state.
+    """
+    def __init__(self):
+        super().__init__()
+        self._results = {}
+
+    def generic_execute(self, expr, states):
+        return _Batch.from_values([arith_eval(expr, s) for s in states])
+
+    def execute_numeral(self, expr, states):
+        return _Batch.broadcast(expr, len(states))
+
+    def execute_PartitionLabel(self, expr, states):
+        return _Batch.broadcast(expr.bound, len(states))
+
+    def execute_Variable(self, expr, states):
+        return _Batch.from_values([s[expr] for s in states])
+
+    def _scalar_fallback(self, func, batches, result, mask):
+        indices = set(numpy.nonzero(mask)[0])
+        for batch in batches:
+            indices |= set(batch.scalars)
+        for i in indices:
+            result.scalars[i] = func(*(b.value(i) for b in batches))
+        return result
+
+    def execute_UnaryArithExpr(self, expr, states):
+        a = self(expr.a, states)
+        func = _unary_operator_function_dictionary[expr.op]
+        n = len(states)
+        if expr.op != operators.UNARY_SUBTRACT_OP:
+            result = _Batch(*([numpy.zeros(n)] * 4), integer=a.integer)
+            return self._scalar_fallback(
+                func, [a], result, numpy.ones(n, dtype=bool))
+        result = _Batch(-a.v_max, -a.v_min, -a.e_max, -a.e_min, a.integer)
+        return self._scalar_fallback(
+            func, [a], result, numpy.zeros(n, dtype=bool))
+
+    def execute_BinaryArithExpr(self, expr, states):
+        a, b = self(expr.a1, states), self(expr.a2, states)
+        func = _binary_operator_function_dictionary[expr.op]
+        a, b = _coerce(expr.op, a, b)
+        n = len(states)
+        with numpy.errstate(all='ignore'):
+            if a.integer:
+                bounds = _integer_op(expr.op, a, b)
+            else:
+                bounds = _error_op(expr.op, a, b)
+        if bounds is None:
+            result = _Batch(*([numpy.zeros(n)] * 4), integer=a.integer)
+            return self._scalar_fallback(
+                func, [a, b], result, numpy.ones(n, dtype=bool))
+        *bounds, invalid = bounds
+        invalid = invalid | numpy.isnan(numpy.sum(bounds, axis=0))
+        result = _Batch(*bounds, integer=a.integer)
+        return self._scalar_fallback(func, [a, b], result, invalid)
+
+    def execute_MetaState(self, meta_state, states):
+        values = {
+            var: self(expr, states).values()
+            for var, expr in meta_state.items()}
+        return [
+            state.__class__({var: v[i] for var, v in values.items()})
+            for i, state in enumerate(states)]
+
+    def __call__(self, expr, states):
+        key = expr
+        try:
+            return self._results[key]
+        except KeyError:
+            pass
+        except TypeError:
+            return super().__call__(expr, states)
+        value = self._results[key] = super().__call__(expr, states)
+        return value
+
+
+def batch_arith_eval(expr, states):
+    """Evaluates `expr` for each state in `states`.
+
+    The result is a sound approximation of ``[arith_eval(expr, state) for
+    state in states]``, it agrees with the 'float' interval backend, as
+    bounds are rounded outwards to the analyzed precision.
+
+    :param expr: The expression or meta state to evaluate.
+    :type expr: :class:`soap.expression.Expression` or
+        :class:`soap.semantics.state.MetaState`
+    :param states: The states to evaluate `expr` with.
+    :type states: list of :class:`soap.semantics.state.BoxState`
+    """
+    states = list(states)
+    if not states:
+        return []
+    if context.precision > _double_precision:
+        return [arith_eval(expr, state) for state in states]
+    evaluator = BatchArithmeticEvaluator()
+    result = evaluator(expr, states)
+    if isinstance(result, _Batch):
+        return result.values()
+    return result
@@ -1,17 +1,25 @@
+import bisect
+import collections
+import math
+
 from soap import logger
 from soap.context import context
 from soap.common.cache import cached
 from soap.expression import (
     operators, BinaryArithExpr, BinaryBoolExpr, FixExpr, SelectExpr,
-    fix_expr_has_inner_loop
+    GenericExecuter, fix_expr_has_inner_loop
+)
+from soap.semantics.common import is_numeral
+from soap.semantics.error import (
+    inf, Interval, IntegerInterval, ErrorSemantics
 )
-from soap.semantics.error import IntegerInterval, ErrorSemantics
+from soap.semantics.functions.acceleration import accelerate_fixpoint
 from soap.semantics.functions.arithmetic import arith_eval
 from soap.semantics.functions.boolean import bool_eval
 from soap.semantics.functions.meta import (
     expand_expr, expand_meta_state
 )
-from soap.semantics.linalg import MultiDimensionalArray
+from soap.semantics.linalg import ErrorSemanticsArray, MultiDimensionalArray
 
 
 def _is_fixpoint(state, prev_state, curr_join_state, prev_join_state,
@@ -23,11 +31,131 @@ def _is_fixpoint(state, prev_state, curr_join_state, prev_join_state,
     return state.is_fixpoint(prev_state)
 
 
-def _widen(obj, prev_obj, iteration):
-    if context.widen_factor > 0 and iteration % context.widen_factor == 0:
-        logger.info('Widening', iteration)
-        obj = prev_obj.widen(obj)
-    return obj
+class LandmarkGenerator(GenericExecuter):
+    """Collects the bounds of numerals in expressions as widening landmarks.
+    """
+    def generic_execute(self, expr):
+        return set()
+
+    def _execute_atom(self, expr):
+        return set()
+
+    def execute_tuple(self, expr):
+        return set()
+
+    def execute_numeral(self, expr):
+        if isinstance(expr, ErrorSemantics):
+            expr = expr.v
+        if not isinstance(expr, Interval):
+            values = {expr}
+        elif expr.is_top() or expr.is_bottom():
+            return set()
+        else:
+            values = {expr.min, expr.max}
+        return {value for value in values if value not in (-inf, inf)}
+
+    def _execute_expression(self, expr):
+        landmarks = set()
+        for arg in expr.args:
+            landmarks |= self(arg)
+        return landmarks
+
+    def _execute_mapping(self, meta_state):
+        landmarks = set()
+        for expr in meta_state.values():
+            landmarks |= self(expr)
+        return landmarks
+
+    def execute_FixExpr(self, expr):
+        return self(expr.bool_expr) | self(expr.loop_state)
+
+
+_landmark_generator = LandmarkGenerator()
+
+
+def _widen_landmarks(fix_expr, state):
+    """Sorted landmarks for threshold widening, which are the bounds of the
+    loop condition in `state` and their neighbours, numerals in the loop
+    body, and `context.widen_thresholds`."""
+    landmarks = set(context.widen_thresholds)
+    landmarks |= _landmark_generator(fix_expr.loop_state)
+    for arg in fix_expr.bool_expr.args:
+        for value in _landmark_generator(arith_eval(arg, state)):
+            landmarks |= {value - 1, value, value + 1}
+    return sorted(landmarks)
+
+
+def _threshold_widen(widened, value, landmarks):
+    """Replaces infinite bounds in `widened` obtained from widening with
+    `value` by the nearest landmarks enclosing `value`."""
+    if isinstance(widened, MultiDimensionalArray):
+        if widened.is_scalar() and value.is_scalar():
+            scalar = _threshold_widen(widened.scalar, value.scalar, landmarks)
+            return widened.__class__(scalar=scalar, _shape=widened.shape)
+        return widened
+    if widened.is_bottom() or value.is_top() or value.is_bottom():
+        return widened
+    if isinstance(widened, ErrorSemantics):
+        v = _threshold_widen(widened.v, ErrorSemantics(value).v, landmarks)
+        return ErrorSemantics(v, widened.e)
+    if not isinstance(widened, Interval):
+        return widened
+    min_val, max_val = widened.min, widened.max
+    if min_val == -inf:
+        index = bisect.bisect_right(landmarks, value.min)
+        if index > 0:
+            min_val = landmarks[index - 1]
+            if isinstance(widened, IntegerInterval):
+                min_val = math.ceil(min_val)
+    if max_val == inf:
+        index = bisect.bisect_left(landmarks, value.max)
+        if index < len(landmarks):
+            max_val = landmarks[index]
+            if isinstance(widened, IntegerInterval):
+                max_val = math.floor(max_val)
+    return widened.__class__([min_val, max_val])
+
+
+def _widen(obj, prev_obj, iteration, landmarks):
+    if context.widen_factor <= 0 or iteration % context.widen_factor != 0:
+        return obj, False
+    logger.info('Widening', iteration)
+    widened = prev_obj.widen(obj)
+    if not landmarks or widened.is_top() or widened.is_bottom():
+        return widened, True
+    if obj.is_bottom():
+        return widened, True
+    widened = widened.__class__({
+        var: _threshold_widen(value, obj[var], landmarks)
+        for var, value in widened.items()})
+    return widened, True
+
+
+def _narrow(fix_expr, state, head_state):
+    """Narrows the loop head values `head_state` with decreasing iterations
+    from the loop input `state`, returns the entry, exit and loop end states
+    of the narrowed loop head.
+
+    Any `head_state` containing all values of the loop head gives sound
+    results, as the loop head is the least fixpoint of
+    ``state | F(head_state & bool_expr)``.
+    """
+    def split_and_eval(head_state):
+        entry_state, exit_state = bool_eval(fix_expr.bool_expr, head_state)
+        if entry_state.is_bottom():
+            return entry_state, exit_state, entry_state
+        end_state = entry_state.immu_merge(
+            arith_eval(fix_expr.loop_state, entry_state))
+        return entry_state, exit_state, end_state
+
+    for step in range(context.narrow_steps):
+        logger.info('Narrowing', step + 1)
+        _, _, end_state = split_and_eval(head_state)
+        narrowed_state = state | end_state
+        if narrowed_state.is_fixpoint(head_state):
+            break
+        head_state = narrowed_state
+    return split_and_eval(head_state)
 
 
 def _extrapolate(value, factor):
@@ -43,6 +171,12 @@ def _extrapolate(value, factor):
         if value.is_scalar():
             scalar = _extrapolate(value.scalar, factor)
             return value.__class__(scalar=scalar, _shape=value.shape)
+        if value.is_segmented():
+            cells = _extrapolate(value.cells, factor)
+            return value.__class__(
+                cuts=value.cuts, cells=cells, _shape=value.shape)
+        if isinstance(value, ErrorSemanticsArray):
+            return value.scale(factor)
         items = [_extrapolate(val, factor) for val in value._flat_items]
         return value.__class__(_flat_items=items, _shape=value.shape)
     if isinstance(value, BoxState):
@@ -52,6 +186,52 @@ def _extrapolate(value, factor):
     raise TypeError('Do not know how to extrapolate {}'.format(value))
 
 
+def _loop_dependencies(loop_meta_state):
+    """The variables each variable in the loop body depends on."""
+    return {
+        var: set() if is_numeral(expr) else expr.vars()
+        for var, expr in loop_meta_state.items()}
+
+
+def _changed_vars(state, prev_state):
+    """Variables with values in `state` different from `prev_state`, or
+    `None` if all variables should be considered as changed."""
+    if prev_state is None or prev_state.is_bottom() or state.is_bottom():
+        return None
+    return {var for var, value in state.items() if value != prev_state[var]}
+
+
+def _incremental_eval(
+        loop_meta_state, dependencies, state, changed_vars, prev_values):
+    """Evaluates the loop body with `state`, only variables depending on
+    `changed_vars` are recomputed, the remaining variables are stable and
+    reuse their values in `prev_values`."""
+    if changed_vars is None or prev_values is None:
+        return arith_eval(loop_meta_state, state)
+    values = {}
+    for var, expr in loop_meta_state.items():
+        if dependencies[var] & changed_vars:
+            values[var] = arith_eval(expr, state)
+        else:
+            values[var] = prev_values[var]
+    return state.__class__(values)
+
+
+def _incremental_join(join_state, state, changed_vars):
+    """Joins `state` into `join_state`, where only variables in
+    `changed_vars` changed since the previous state joined into
+    `join_state`."""
+    if changed_vars is None or join_state.is_bottom():
+        return join_state | state
+    mapping = {}
+    for var in changed_vars:
+        value = state[var]
+        if var in join_state:
+            value = join_state[var] | value
+        mapping[var] = value
+    return join_state.immu_merge(mapping)
+
+
 class TripCount(object):
     def __init__(self, fix_expr):
         super().__init__()
@@ -108,6 +288,60 @@ def _is_fast_finish(
     return info
 
 
+def _unrolled_fixpoint(fix_expr, state):
+    """Derives loop information of a partially unrolled for loop from the
+    fixpoint of its original loop, returns `None` if it cannot be derived.
+
+    The loop heads of the unrolled loop are the loop heads of the original
+    loop at multiples of the unroll depth, so its exit state is the last
+    original loop head reaching the new stop value, and its entry and loop
+    end states are the original ones bounded by the new stop value.  If the
+    original loop is accelerated, the original loop body is accelerated up
+    to the new stop value instead.
+    """
+    from soap.semantics.schedule.extract import ForLoopExtractor
+    origin = getattr(fix_expr, 'unroll_origin', None)
+    if origin is None:
+        return
+    extractor = ForLoopExtractor(fix_expr)
+    if not extractor.is_for_loop:
+        return
+    iter_var, stop = extractor.iter_var, extractor.iter_slice.stop
+    if not isinstance(stop, int):
+        return
+
+    info = fixpoint_eval(origin, state)
+    if info['path'] == 'acceleration':
+        truncated_expr = FixExpr(
+            fix_expr.bool_expr, origin.loop_state, origin.loop_var,
+            origin.init_state)
+        info = accelerate_fixpoint(truncated_expr, state)
+        if info is None:
+            return
+        info.update(trip_count=extractor.trip_count, path='unrolled')
+        return info
+
+    stop = IntegerInterval(stop)
+    exit_state = None
+    for head_state in info.get('heads', ()):
+        if head_state[iter_var] == stop:
+            exit_state = head_state
+    if exit_state is None:
+        return
+    entry_state, _ = bool_eval(fix_expr.bool_expr, info['entry'])
+    end_state, _ = bool_eval(
+        BinaryBoolExpr(operators.LESS_EQUAL_OP, iter_var, stop), info['end'])
+    return {
+        'entry': entry_state,
+        'exit': exit_state,
+        'last_entry': state.empty(),
+        'last_exit': exit_state,
+        'end': end_state,
+        'trip_count': extractor.trip_count,
+        'path': 'unrolled',
+    }
+
+
 @cached
 def fixpoint_eval(fix_expr, state, run_init_state=False):
     """
@@ -122,7 +356,9 @@ def fixpoint_eval(fix_expr, state, run_init_state=False):
     state = state or BoxState(bottom=True)
 
     if run_init_state:
+        # shares cached results with evaluations from the loop input
         state = arith_eval(fix_expr.init_state, state)
+        return fixpoint_eval(fix_expr, state)
 
     if state.is_bottom():
         # shortcut for bottom values
@@ -152,8 +388,22 @@ def fixpoint_eval(fix_expr, state, run_init_state=False):
             'path': 'fast_outer',
         }
 
+    info = _unrolled_fixpoint(fix_expr, state)
+    if info is not None:
+        return info
+
+    if context.loop_acceleration > 0:
+        info = accelerate_fixpoint(fix_expr, state)
+        if info is not None:
+            return info
+
     iteration = 0
-    state_class = state.__class__
+    dependencies = _loop_dependencies(loop_meta_state)
+    landmarks = None
+    is_widened = False
+    # the last loop heads, for deriving fixpoints of unrolled loops
+    heads = collections.deque(maxlen=context.unroll_depth + 2)
+    prev_exit_state = prev_end_state = body_exit_state = None
 
     # input state
     loop_state = state
@@ -168,14 +418,22 @@ def fixpoint_eval(fix_expr, state, run_init_state=False):
 
         logger.persistent('Iteration', iteration, l=logger.levels.debug)
 
+        heads.append(loop_state)
+
         # split state by the conditional of the while loop
         entry_state, exit_state = bool_eval(bool_expr, loop_state)
 
-        # join all exit states together, this is the possible output
-        exit_join_state |= exit_state
+        # join all exit states together, this is the possible output, only
+        # variables changed from the previous iteration are joined
+        exit_join_state = _incremental_join(
+            exit_join_state, exit_state,
+            _changed_vars(exit_state, prev_exit_state))
+        prev_exit_state = exit_state
 
         # test if fixpoint reached
-        entry_join_state = entry_state | prev_entry_join_state
+        changed_vars = _changed_vars(entry_state, prev_entry_state)
+        entry_join_state = _incremental_join(
+            prev_entry_join_state, entry_state, changed_vars)
         if _is_fixpoint(
                 entry_state, prev_entry_state,
                 entry_join_state, prev_entry_join_state,
@@ -195,21 +453,36 @@ def fixpoint_eval(fix_expr, state, run_init_state=False):
         prev_entry_join_state = entry_join_state
         prev_loop_state = loop_state
 
-        # analyze loop body
-        diff_state = arith_eval(loop_meta_state, entry_state)
+        # analyze loop body, variables with unchanged inputs are stable and
+        # reuse values from the previous iteration
+        diff_state = _incremental_eval(
+            loop_meta_state, dependencies, entry_state, changed_vars,
+            body_exit_state)
+        body_exit_state = diff_state
         # arith_eval only computes value changes with loop_meta_state,
         # need to use changes to update existing state
-        loop_state = dict(entry_state)
-        loop_state.update(diff_state)
-        loop_state = state_class(loop_state)
+        loop_state = entry_state.immu_merge(diff_state)
 
-        loop_end_join_state = loop_state | loop_end_join_state
+        loop_end_join_state = _incremental_join(
+            loop_end_join_state, loop_state,
+            _changed_vars(loop_state, prev_end_state))
+        prev_end_state = loop_state
 
-        # widening
-        loop_state = _widen(loop_state, prev_loop_state, iteration)
+        # widening with landmarks as thresholds
+        if landmarks is None and context.widen_factor > 0:
+            landmarks = _widen_landmarks(fix_expr, state)
+        loop_state, widened = _widen(
+            loop_state, prev_loop_state, iteration, landmarks)
+        is_widened = is_widened or widened
 
     logger.unpersistent('Iteration')
 
+    if is_widened and context.narrow_steps > 0:
+        # the loop head values are contained in the joined entry and exit
+        # states, narrowing recovers precision lost in widening
+        entry_join_state, exit_join_state, loop_end_join_state = _narrow(
+            fix_expr, state, entry_join_state | exit_join_state)
+
     return {
         'entry': entry_join_state,
         'exit': exit_join_state,
@@ -217,6 +490,7 @@ def fixpoint_eval(fix_expr, state, run_init_state=False):
         'last_exit': loop_state,
         'end': loop_end_join_state,
         'trip_count': iteration,
+        'heads': tuple(heads),
         'path': 'normal',
     }
 
@@ -224,7 +498,8 @@ def fixpoint_eval(fix_expr, state, run_init_state=False):
 def fix_expr_eval(expr, state):
     fixpoint = fixpoint_eval(expr, state, run_init_state=True)
     last_entry = fixpoint['last_entry']
-    if fixpoint['path'] not in ['fast_factor', 'fast_outer']:
+    fast_paths = ['fast_factor', 'fast_outer', 'acceleration', 'unrolled']
+    if fixpoint['path'] not in fast_paths:
         if last_entry is not None and not last_entry.is_bottom():
             logger.warning(
                 'Loop/fixpoint computation "{}" may never terminate with state'
@@ -299,6 +574,7 @@ def _unroll_for_loop(expr, iter_var, iter_slice, depth):
 
         fix_expr = FixExpr(bool_expr, new_loop_state, loop_var, init_state)
         fix_expr.unroll_depth = d
+        fix_expr.unroll_origin = expr_list[0]
 
         loop_expr = loop_state[loop_var]
         id_state = MetaState({var: var for var in loop_expr.vars()})
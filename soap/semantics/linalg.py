@@ -1,29 +1,152 @@
+import bisect
 import collections
 import functools
 import itertools
 
+import numpy
+
+from soap.context import context
 from soap.lattice.base import join, Lattice
-from soap.semantics.error import ErrorSemantics, FloatInterval, IntegerInterval
+from soap.semantics.bounds import _exact_round, _interval_mul, _mul_exact
+from soap.semantics.error import (
+    ErrorSemantics, FloatInterval, IntegerInterval, inf, mpfr, _float_backend
+)
+
+
+_nan = float('NaN')
+_inf = float('Inf')
+
+
+def _float_bounds(*values):
+    """Converts bounds to doubles, returns `None` if they cannot be
+    represented exactly."""
+    try:
+        bounds = tuple(float(v) for v in values)
+    except (OverflowError, TypeError, ValueError):
+        return None
+    for b, v in zip(bounds, values):
+        if b != v:
+            return None
+    return bounds
+
+
+def _is_top_bounds(bounds):
+    return (bounds[0] == -_inf) & (bounds[1] == _inf)
+
+
+def _normalize_bounds(bounds):
+    """Bottom items have NaN bounds, and top items have infinite bounds for
+    both values and errors."""
+    top = _is_top_bounds(bounds)
+    bounds[0::2, top] = -_inf
+    bounds[1::2, top] = _inf
+    bounds[:, numpy.isnan(bounds[0])] = _nan
+    return bounds
+
+
+def _join_bounds(bounds, other_bounds):
+    joined = numpy.empty(numpy.broadcast(bounds, other_bounds).shape)
+    # fmin and fmax ignore NaN, i.e. the bottom element
+    joined[0::2] = numpy.fmin(bounds[0::2], other_bounds[0::2])
+    joined[1::2] = numpy.fmax(bounds[1::2], other_bounds[1::2])
+    return _normalize_bounds(joined)
+
+
+def _meet_bounds(bounds, other_bounds):
+    min_bounds = numpy.maximum(bounds[0::2], other_bounds[0::2])
+    max_bounds = numpy.minimum(bounds[1::2], other_bounds[1::2])
+    with numpy.errstate(invalid='ignore'):
+        empty = min_bounds > max_bounds
+    min_bounds[empty] = max_bounds[empty] = _nan
+    meet = numpy.empty(bounds.shape)
+    meet[0::2] = min_bounds
+    meet[1::2] = max_bounds
+    return _normalize_bounds(meet)
+
+
+def _widen_bounds(bounds, other_bounds):
+    # errors are joined
+    widened = _join_bounds(bounds, other_bounds)
+    v_min, v_max = bounds[0], bounds[1]
+    with numpy.errstate(invalid='ignore'):
+        widened[0] = numpy.where(other_bounds[0] < v_min, -_inf, v_min)
+        widened[1] = numpy.where(other_bounds[1] > v_max, _inf, v_max)
+    top = _is_top_bounds(bounds) | _is_top_bounds(other_bounds)
+    bottom = numpy.isnan(v_min) | numpy.isnan(other_bounds[0])
+    widened[:, bottom & ~top] = _nan
+    widened[0::2, top] = -_inf
+    widened[1::2, top] = _inf
+    return _normalize_bounds(widened)
+
+
+def _le_bounds(bounds, other_bounds):
+    min_bounds, max_bounds = bounds[0::2], bounds[1::2]
+    other_min_bounds = other_bounds[0::2]
+    other_max_bounds = other_bounds[1::2]
+    with numpy.errstate(invalid='ignore'):
+        le = numpy.isnan(min_bounds) | (
+            ~numpy.isnan(other_min_bounds) &
+            (min_bounds >= other_min_bounds) &
+            (max_bounds <= other_max_bounds))
+    return bool(numpy.all(le))
+
+
+def _bounds_equal(bounds, other_bounds):
+    if bounds.shape != other_bounds.shape:
+        return False
+    nan = numpy.isnan(bounds)
+    if not numpy.array_equal(nan, numpy.isnan(other_bounds)):
+        return False
+    return bool(numpy.all((bounds == other_bounds) | nan))
 
 
 class MultiDimensionalArray(Lattice, collections.Sequence):
-    __slots__ = ('_flat_items', 'scalar', 'shape', '_c_top', '_c_bottom')
+    """Multi-dimensional arrays of values.
+
+    Items are stored as a struct of arrays, each row of `_flat_bounds` is a
+    NumPy array of a bound of all items.  Items with bounds that cannot be
+    represented exactly by doubles are kept as a tuple of objects instead.
+
+    A segmented array partitions each dimension with sorted `cuts`, and
+    summarizes each region between consecutive cuts with an item in the
+    array `cells`, e.g. `a[0:i]`, `a[i]` and `a[i + 1:n]` in a loop over `i`.
+    """
+    __slots__ = (
+        '_items', '_flat_bounds', 'scalar', 'cuts', 'cells', 'shape',
+        '_shape_prod', '_c_top', '_c_bottom')
     value_class = None
+    bound_count = 2
 
     def __init__(self, items=None, scalar=None, _flat_items=None,
-                 _shape=None, bottom=False, top=False):
+                 _flat_bounds=None, _shape=None, cuts=None, cells=None,
+                 bottom=False, top=False):
         super().__init__(bottom=bottom, top=top)
         self.shape = _shape
+        self.scalar = scalar
+        self.cuts = cuts
+        self.cells = cells
+        self._items = self._flat_bounds = None
         if top or bottom:
             return
-        self.scalar = scalar
-        if scalar is None:
-            self._init_flat_items(items, _flat_items, _shape)
+        if scalar is None and cells is None:
+            self._init_flat_items(items, _flat_items, _flat_bounds, _shape)
+
+    @classmethod
+    def segmented(cls, value, shape):
+        """A segmented array with a single region of `value`."""
+        if not isinstance(value, cls.value_class):
+            value = cls.value_class(value)
+        cells = cls(_flat_items=[value], _shape=(1, ) * len(shape))
+        cuts = tuple((0, size) for size in shape)
+        return cls(cuts=cuts, cells=cells, _shape=tuple(shape))
 
     def is_scalar(self):
         return self.scalar is not None
 
-    def _init_flat_items(self, items, _flat_items, _shape):
+    def is_segmented(self):
+        return self.cells is not None
+
+    def _init_flat_items(self, items, _flat_items, _flat_bounds, _shape):
         def append_flat_items(flattened_flat_items, items):
             n = [len(items)]
             if not isinstance(items[0], (list, tuple)):
@@ -38,18 +161,23 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
                     raise ValueError('Shape mismatch.')
             return n + first_len_list
 
-        if _flat_items is not None:
+        if _flat_bounds is not None:
             self.shape = _shape
-            if not isinstance(_flat_items, tuple):
-                _flat_items = tuple(_flat_items)
-            self._flat_items = _flat_items
+            self._flat_bounds = _flat_bounds
         else:
-            flattened_flat_items = []
-            shape = tuple(append_flat_items(flattened_flat_items, items))
-            self.shape = _shape or shape
-            self._flat_items = tuple(
-                item if isinstance(item, self.value_class) else
-                self.value_class(item) for item in flattened_flat_items)
+            if _flat_items is not None:
+                self.shape = _shape
+            else:
+                flattened_flat_items = []
+                shape = tuple(append_flat_items(flattened_flat_items, items))
+                self.shape = _shape or shape
+                _flat_items = (
+                    item if isinstance(item, self.value_class) else
+                    self.value_class(item) for item in flattened_flat_items)
+            _flat_items = tuple(_flat_items)
+            self._flat_bounds = self._items_to_bounds(_flat_items)
+            if self._flat_bounds is None:
+                self._items = _flat_items
 
         # set up shape_prod for index translation
         shape_prod = []
@@ -59,6 +187,70 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
             prod *= size
         self._shape_prod = tuple(reversed(shape_prod))
 
+    @classmethod
+    def _item_bounds(cls, item):
+        """Bounds of an item, or `None` if they are not representable."""
+        if type(item) is not cls.value_class:
+            return None
+        if item.is_bottom():
+            return (_nan, ) * cls.bound_count
+        if item.is_top():
+            return (-_inf, _inf) * (cls.bound_count // 2)
+        return _float_bounds(item.min, item.max)
+
+    @classmethod
+    def _bounds_item(cls, bounds):
+        v_min, v_max = bounds
+        if v_min != v_min:
+            return cls.value_class(bottom=True)
+        if v_min == -_inf and v_max == _inf:
+            return cls.value_class(top=True)
+        return cls.value_class([float(v_min), float(v_max)])
+
+    @classmethod
+    def _items_to_bounds(cls, items):
+        bounds = []
+        for item in items:
+            item_bounds = cls._item_bounds(item)
+            if item_bounds is None:
+                return None
+            bounds.append(item_bounds)
+        bounds = numpy.array(bounds, dtype=float).reshape(
+            (len(items), cls.bound_count)).T
+        return _normalize_bounds(numpy.ascontiguousarray(bounds))
+
+    @property
+    def _flat_items(self):
+        items = self._items
+        if items is not None:
+            return items
+        if self.cells is not None:
+            items = self.cells._item_array()
+            for axis, cuts in enumerate(self.cuts):
+                items = numpy.repeat(items, numpy.diff(cuts), axis=axis)
+            items = tuple(items.ravel().tolist())
+        else:
+            items = tuple(
+                self._bounds_item(bounds) for bounds in self._flat_bounds.T)
+        self._items = items
+        return items
+
+    def _item_array(self):
+        items = numpy.empty(self.size, dtype=object)
+        for i, item in enumerate(self._flat_items):
+            items[i] = item
+        return items.reshape(self.shape)
+
+    def _is_numeric(self, other=None):
+        if self._flat_bounds is None:
+            return False
+        return other is None or other._flat_bounds is not None
+
+    def _item(self, index):
+        if self._items is not None:
+            return self._items[index]
+        return self._bounds_item(self._flat_bounds[:, index])
+
     @property
     def size(self):
         return functools.reduce(lambda x, y: x * y, self.shape)
@@ -70,6 +262,10 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
             pass
         if self.scalar is not None:
             top = self.scalar.is_top()
+        elif self.cells is not None:
+            top = self.cells.is_top()
+        elif self._is_numeric():
+            top = bool(numpy.all(_is_top_bounds(self._flat_bounds)))
         else:
             top = all(i.is_top() for i in self._flat_items)
         self._c_top = top
@@ -77,35 +273,164 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
 
     def is_bottom(self):
         try:
-            return self._c_top
+            return self._c_bottom
         except AttributeError:
             pass
         if self.scalar is not None:
             bot = self.scalar.is_bottom()
+        elif self.cells is not None:
+            bot = self.cells.is_bottom()
+        elif self._is_numeric():
+            bot = bool(numpy.all(numpy.isnan(self._flat_bounds[0])))
         else:
             bot = all(i.is_bottom() for i in self._flat_items)
         self._c_bottom = bot
         return bot
 
-    def join(self, other):
+    def _binary_operation(self, other, name, bounds_func):
         if self.shape != other.shape:
             raise ValueError('Shape mismatch.')
+        if self.cells is not None or other.cells is not None:
+            return self._segmented_operation(other, name)
         if self.scalar is not None:
-            return self.__class__(
-                scalar=self.scalar.join(other.scalar), _shape=self.shape)
+            scalar = getattr(self.scalar, name)(other.scalar)
+            return self.__class__(scalar=scalar, _shape=self.shape)
+        if self._is_numeric(other):
+            bounds = bounds_func(self._flat_bounds, other._flat_bounds)
+            return self.__class__(_flat_bounds=bounds, _shape=self.shape)
         items = tuple(
-            x.join(y) for x, y in zip(self._flat_items, other._flat_items))
+            getattr(x, name)(y)
+            for x, y in zip(self._flat_items, other._flat_items))
         return self.__class__(_flat_items=items, _shape=self.shape)
 
+    def join(self, other):
+        return self._binary_operation(other, 'join', _join_bounds)
+
     def meet(self, other):
-        if self.shape != other.shape:
-            raise ValueError('Shape mismatch.')
+        return self._binary_operation(other, 'meet', _meet_bounds)
+
+    def _take(self, indices, axis):
+        """Selects slices `indices` along `axis` of a dense array."""
+        shape = list(self.shape)
+        shape[axis] = len(indices)
+        shape = tuple(shape)
+        if self._is_numeric():
+            bounds = self._flat_bounds.reshape(
+                (self.bound_count, ) + self.shape)
+            bounds = numpy.take(bounds, indices, axis=axis + 1)
+            bounds = numpy.ascontiguousarray(
+                bounds.reshape((self.bound_count, -1)))
+            return self.__class__(_flat_bounds=bounds, _shape=shape)
+        items = numpy.take(self._item_array(), indices, axis=axis)
+        return self.__class__(_flat_items=items.ravel().tolist(), _shape=shape)
+
+    def _segments(self):
+        """The cuts and cells of the array viewed as a segmented array."""
+        if self.cells is not None:
+            return self.cuts, self.cells
         if self.scalar is not None:
-            return self.__class__(
-                scalar=self.scalar.meet(other.scalar), _shape=self.shape)
-        items = tuple(
-            x.meet(y) for x, y in zip(self._flat_items, other._flat_items))
-        return self.__class__(_flat_items=items, _shape=self.shape)
+            cells = self.__class__(
+                _flat_items=[self.scalar], _shape=(1, ) * len(self.shape))
+            return tuple((0, size) for size in self.shape), cells
+        return tuple(tuple(range(size + 1)) for size in self.shape), self
+
+    @staticmethod
+    def _refine_cells(cuts, cells, new_cuts):
+        """Splits `cells` partitioned by `cuts` into finer `new_cuts`."""
+        for axis, (old, new) in enumerate(zip(cuts, new_cuts)):
+            if old == new:
+                continue
+            indices = numpy.searchsorted(old, new[:-1], side='right') - 1
+            cells = cells._take(indices, axis)
+        return cells
+
+    @classmethod
+    def _from_segments(cls, cuts, cells, shape):
+        """Constructs a segmented array, regions with equal items are merged,
+        and the narrowest pairs of regions are joined if a dimension has more
+        regions than `context.array_segments`."""
+        cuts, cells = cls._merge_equal_segments(cuts, cells)
+        limit = context.array_segments
+        if limit > 0 and any(len(c) - 1 > limit for c in cuts):
+            cuts = list(cuts)
+            for axis, axis_cuts in enumerate(cuts):
+                while len(axis_cuts) - 1 > limit:
+                    widths = [
+                        axis_cuts[i + 2] - axis_cuts[i]
+                        for i in range(len(axis_cuts) - 2)]
+                    i = widths.index(min(widths))
+                    indices = list(range(len(axis_cuts) - 1))
+                    left = cells._take(indices[:i + 1] + indices[i + 2:], axis)
+                    right = cells._take(indices[:i] + indices[i + 1:], axis)
+                    cells = left.join(right)
+                    axis_cuts = axis_cuts[:i + 1] + axis_cuts[i + 2:]
+                cuts[axis] = axis_cuts
+            cuts, cells = cls._merge_equal_segments(tuple(cuts), cells)
+        return cls(cuts=cuts, cells=cells, _shape=shape)
+
+    @staticmethod
+    def _merge_equal_segments(cuts, cells):
+        new_cuts = []
+        for axis, axis_cuts in enumerate(cuts):
+            count = len(axis_cuts) - 1
+            if count == 1:
+                new_cuts.append(tuple(axis_cuts))
+                continue
+            items = cells._item_array()
+            equal = (
+                numpy.take(items, range(count - 1), axis=axis) ==
+                numpy.take(items, range(1, count), axis=axis))
+            equal = numpy.moveaxis(equal, axis, 0).reshape((count - 1, -1))
+            equal = equal.all(axis=1)
+            indices = [0] + [i + 1 for i in range(count - 1) if not equal[i]]
+            if len(indices) < count:
+                cells = cells._take(indices, axis)
+            new_cuts.append(
+                tuple(axis_cuts[i] for i in indices) + (axis_cuts[-1], ))
+        return tuple(new_cuts), cells
+
+    def _unified_segments(self, other):
+        """Refines the cells of both arrays to the union of their cuts."""
+        cuts, cells = self._segments()
+        other_cuts, other_cells = other._segments()
+        new_cuts = tuple(
+            tuple(sorted(set(c) | set(o))) for c, o in zip(cuts, other_cuts))
+        cells = self._refine_cells(cuts, cells, new_cuts)
+        other_cells = self._refine_cells(other_cuts, other_cells, new_cuts)
+        return new_cuts, cells, other_cells
+
+    def _segmented_operation(self, other, name):
+        cuts, cells, other_cells = self._unified_segments(other)
+        cells = getattr(cells, name)(other_cells)
+        return self._from_segments(cuts, cells, self.shape)
+
+    @staticmethod
+    def _cell_index(cuts, ranges):
+        """Indices of cells overlapping `ranges` of item indices."""
+        cell_index = []
+        for cuts, r in zip(cuts, ranges):
+            min_index = bisect.bisect_right(cuts, r[0]) - 1
+            max_index = bisect.bisect_right(cuts, r[-1]) - 1
+            if min_index == max_index:
+                cell_index.append(min_index)
+            else:
+                cell_index.append([min_index, max_index])
+        return tuple(cell_index)
+
+    def _segmented_update(self, index, value):
+        ranges = self._index_ranges(index)
+        regions = [(int(r[0]), int(r[-1]) + 1) for r in ranges]
+        cuts = tuple(
+            tuple(sorted(set(c) | set(region)))
+            for c, region in zip(self.cuts, regions))
+        cells = self._refine_cells(self.cuts, self.cells, cuts)
+        cell_index = self._cell_index(cuts, ranges)
+        if all(isinstance(i, int) for i in cell_index):
+            if any(len(r) > 1 for r in ranges):
+                # the region is a cell with many items, weak update
+                value = value.join(cells[cell_index])
+        cells = cells.update(cell_index, value)
+        return self._from_segments(cuts, cells, self.shape)
 
     def _to_flat_index(self, index):
         return sum((i * p for i, p in zip(index, self._shape_prod)))
@@ -126,7 +451,7 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
     def T(self):
         return self.transpose()
 
-    def _normalize_index(self, index):
+    def _index_ranges(self, index):
         if not isinstance(index, collections.Sequence):
             index = [index]
 
@@ -145,7 +470,17 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
             else:
                 raise TypeError(
                     'Index must be an integer or an IntegerInterval.')
-        return tuple(itertools.product(*index_iterer))
+        return index_iterer
+
+    def _normalize_index(self, index):
+        return tuple(itertools.product(*self._index_ranges(index)))
+
+    def _flat_indices(self, index):
+        flat_indices = numpy.zeros(1, dtype=int)
+        for r, p in zip(self._index_ranges(index), self._shape_prod):
+            r = numpy.array(r, dtype=int) * p
+            flat_indices = (flat_indices[:, None] + r).ravel()
+        return flat_indices
 
     def __getitem__(self, index):
         top = self.is_top()
@@ -156,15 +491,29 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
         if self.scalar is not None:
             return self.scalar
 
+        if self.cells is not None:
+            ranges = self._index_ranges(index)
+            return self.cells[self._cell_index(self.cuts, ranges)]
+
         # fast path for one-dimensional arrays
         if isinstance(index, int):
-            return self._flat_items[index]
-
-        items = []
-        for i in self._normalize_index(index):
-            item = self._flat_items[self._to_flat_index(i)]
-            items.append(item)
-        return join(items)
+            return self._item(index)
+
+        if not self._is_numeric():
+            items = []
+            for i in self._normalize_index(index):
+                item = self._flat_items[self._to_flat_index(i)]
+                items.append(item)
+            return join(items)
+
+        flat_indices = self._flat_indices(index)
+        if len(flat_indices) == 1:
+            return self._item(flat_indices[0])
+        bounds = self._flat_bounds[:, flat_indices]
+        joined = numpy.empty((self.bound_count, 1))
+        joined[0::2, 0] = numpy.fmin.reduce(bounds[0::2], axis=1)
+        joined[1::2, 0] = numpy.fmax.reduce(bounds[1::2], axis=1)
+        return self._bounds_item(_normalize_bounds(joined)[:, 0])
 
     def update(self, index, value):
         top = self.is_top()
@@ -177,14 +526,21 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
             value = value.join(self.scalar)
             return self.__class__(scalar=value, _shape=shape)
 
+        cls = self.value_class
+        if not isinstance(value, cls):
+            value = cls(value)
+        if self.cells is not None:
+            return self._segmented_update(index, value)
+        value_bounds = self._item_bounds(value)
+        if value_bounds is not None and (
+                top or bottom or self._is_numeric()):
+            return self._update_bounds(index, value_bounds, top, bottom)
+
         if top or bottom:
             # extrapolate items in the matrix
-            other_value = self.value_class(top=top, bottom=bottom)
+            other_value = cls(top=top, bottom=bottom)
             items = [other_value] * self.size
         else:
-            cls = self.value_class
-            if not isinstance(value, cls):
-                value = cls(value)
             items = list(self._flat_items)
 
         # fast path for one-dimensional arrays
@@ -205,39 +561,101 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
 
         return self.__class__(_flat_items=items, _shape=shape)
 
+    def _update_bounds(self, index, value_bounds, top, bottom):
+        if top or bottom:
+            # extrapolate items in the matrix
+            other_value = self.value_class(top=top, bottom=bottom)
+            bounds = numpy.empty((self.bound_count, self.size))
+            bounds.T[:] = self._item_bounds(other_value)
+        else:
+            # copy on write
+            bounds = self._flat_bounds.copy()
+        value_bounds = numpy.array(value_bounds)
+
+        # fast path for one-dimensional arrays
+        if isinstance(index, int):
+            bounds[:, index] = value_bounds
+            return self.__class__(_flat_bounds=bounds, _shape=self.shape)
+
+        flat_indices = self._flat_indices(index)
+
+        # only a specific item is changed
+        if len(flat_indices) == 1:
+            bounds[:, flat_indices[0]] = value_bounds
+        else:
+            bounds[:, flat_indices] = _join_bounds(
+                bounds[:, flat_indices], value_bounds[:, None])
+        return self.__class__(_flat_bounds=bounds, _shape=self.shape)
+
     def le(self, other):
         if self.shape != other.shape:
             raise ValueError('Cannot compare arrays with different shapes.')
+        if self.cells is not None or other.cells is not None:
+            _, cells, other_cells = self._unified_segments(other)
+            return cells.le(other_cells)
         if self.scalar is not None:
             return self.scalar.le(other.scalar)
+        if self._is_numeric(other):
+            return _le_bounds(self._flat_bounds, other._flat_bounds)
         return all(
             x.le(y) for x, y in zip(self._flat_items, other._flat_items))
 
     def widen(self, other):
-        if self.scalar is not None:
-            return self.__class__(
-                scalar=self.scalar.widen(other.scalar), _shape=self.shape)
-        items = [
-            x.widen(y) for x, y in zip(self._flat_items, other._flat_items)]
-        return self.__class__(_flat_items=items, _shape=self.shape)
+        return self._binary_operation(other, 'widen', _widen_bounds)
 
     def __len__(self):
-        return self.size()
+        return self.size
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
         if self.shape != other.shape:
             return False
+        if self.cells is not None or other.cells is not None:
+            _, cells, other_cells = self._unified_segments(other)
+            return cells == other_cells
         if self.scalar is not None:
             return self.scalar == other.scalar
+        if self._is_numeric(other):
+            return _bounds_equal(self._flat_bounds, other._flat_bounds)
         return self._flat_items == other._flat_items
 
+    def _expanded(self):
+        """The bounds of all items as laid out in a dense array, or the items
+        if their bounds are not representable, without storing them."""
+        cuts, cells = self._segments()
+        if cells is self:
+            if self._is_numeric():
+                return self._flat_bounds
+            return self._flat_items
+        if cells._is_numeric():
+            bounds = cells._flat_bounds.reshape(
+                (self.bound_count, ) + cells.shape)
+            for axis, axis_cuts in enumerate(cuts):
+                bounds = numpy.repeat(
+                    bounds, numpy.diff(axis_cuts), axis=axis + 1)
+            return bounds.reshape((self.bound_count, -1))
+        items = cells._item_array()
+        for axis, axis_cuts in enumerate(cuts):
+            items = numpy.repeat(items, numpy.diff(axis_cuts), axis=axis)
+        items = tuple(items.ravel().tolist())
+        # cells of empty regions may not be representable
+        bounds = self._items_to_bounds(items)
+        return items if bounds is None else bounds
+
     def __hash__(self):
-        if self.scalar is not None:
-            hash_val = hash((self.scalar, self.shape))
+        hash_val = self._hash
+        if hash_val is not None:
+            return hash_val
+        # equal arrays may be segmented differently, so all are hashed as
+        # dense arrays
+        expanded = self._expanded()
+        if isinstance(expanded, tuple):
+            hash_val = hash((expanded, self.shape))
         else:
-            hash_val = hash((self._flat_items, self.shape))
+            # canonical NaN and zero signs
+            bounds = numpy.where(numpy.isnan(expanded), _nan, expanded) + 0.0
+            hash_val = hash((bounds.tobytes(), self.shape))
         self._hash = hash_val
         return hash_val
 
@@ -263,10 +681,21 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
                     for i, v in enumerate(row)))
                 for row in items))
 
+    def _format_segments(self):
+        regions = itertools.product(*(
+            ['[{}:{}]'.format(start, stop)
+             for start, stop in zip(cuts, cuts[1:])]
+            for cuts in self.cuts))
+        return ', '.join(
+            '{}: {}'.format(''.join(region), item)
+            for region, item in zip(regions, self.cells._flat_items))
+
     def __str__(self):
+        shape = 'x'.join(str(s) for s in self.shape)
         if self.scalar is not None:
-            shape = 'x'.join(str(s) for s in self.shape)
             return '[{}: {}]'.format(shape, self.scalar)
+        if self.cells is not None:
+            return '[{}: {}]'.format(shape, self._format_segments())
         if len(self.shape) == 1:
             return '[{}]'.format(', '.join(str(v) for v in self._flat_items))
         if len(self.shape) == 2:
@@ -277,12 +706,26 @@ class MultiDimensionalArray(Lattice, collections.Sequence):
         if self.scalar is not None:
             return '{}(scalar={!r}, _shape={!r})'.format(
                 self.__class__.__name__, self.scalar, self.shape)
+        if self.cells is not None:
+            return '{}(cuts={!r}, cells={!r}, _shape={!r})'.format(
+                self.__class__.__name__, self.cuts, self.cells, self.shape)
         return '{}({!r})'.format(self.__class__.__name__, self._flat_items)
 
 
 class IntegerIntervalArray(MultiDimensionalArray):
     value_class = IntegerInterval
 
+    @classmethod
+    def _bounds_item(cls, bounds):
+        v_min, v_max = bounds
+        if v_min != v_min:
+            return IntegerInterval(bottom=True)
+        if v_min == -_inf and v_max == _inf:
+            return IntegerInterval(top=True)
+        v_min = -inf if v_min == -_inf else int(v_min)
+        v_max = inf if v_max == _inf else int(v_max)
+        return IntegerInterval([v_min, v_max])
+
 
 class FloatIntervalArray(MultiDimensionalArray):
     value_class = FloatInterval
@@ -290,3 +733,78 @@ class FloatIntervalArray(MultiDimensionalArray):
 
 class ErrorSemanticsArray(MultiDimensionalArray):
     value_class = ErrorSemantics
+    bound_count = 4
+
+    @classmethod
+    def _item_bounds(cls, item):
+        if type(item) is not ErrorSemantics:
+            return None
+        if item.is_bottom():
+            return (_nan, ) * 4
+        if item.is_top():
+            return (-_inf, _inf) * 2
+        v, e = item
+        if e.is_bottom():
+            bounds = _float_bounds(v.min, v.max)
+            return bounds and bounds + (_nan, _nan)
+        return _float_bounds(v.min, v.max, e.min, e.max)
+
+    @classmethod
+    def _bounds_item(cls, bounds):
+        v_min, v_max, e_min, e_max = bounds
+        if v_min != v_min:
+            return ErrorSemantics(bottom=True)
+        if v_min == -_inf and v_max == _inf:
+            return ErrorSemantics(top=True)
+        v = FloatInterval([float(v_min), float(v_max)])
+        if e_min != e_min:
+            e = FloatInterval(bottom=True)
+        else:
+            e = FloatInterval([float(e_min), float(e_max)])
+        return ErrorSemantics(v, e)
+
+    def scale(self, factor):
+        """Multiplies values and errors of all items by `factor`."""
+        if self.cells is not None:
+            return self.__class__(
+                cuts=self.cuts, cells=self.cells.scale(factor),
+                _shape=self.shape)
+        bounds = None
+        if self._is_numeric():
+            bounds = _scale_bounds(self._flat_bounds, factor)
+        if bounds is None:
+            items = [
+                ErrorSemantics(v * factor, e * factor)
+                for v, e in self._flat_items]
+            return self.__class__(_flat_items=items, _shape=self.shape)
+        return self.__class__(_flat_bounds=bounds, _shape=self.shape)
+
+
+def _scale_bounds(bounds, factor):
+    """Multiplies bounds by `factor` as FloatInterval does, returns `None` if
+    it cannot be done exactly with doubles."""
+    factor = float(mpfr(factor))
+    regular = ~numpy.isnan(bounds[0]) & ~_is_top_bounds(bounds)
+    scaled = bounds.copy()
+    with numpy.errstate(all='ignore'):
+        for i in (0, 2):
+            b_min, b_max = bounds[i, regular], bounds[i + 1, regular]
+            if _float_backend():
+                b_min, b_max = _interval_mul(b_min, b_max, factor, factor)
+            else:
+                # mpfr rounds to nearest
+                b_min, min_lo = _mul_exact(b_min, factor)
+                b_max, max_lo = _mul_exact(b_max, factor)
+                b_min, _, _, min_invalid = _exact_round(b_min, min_lo)
+                b_max, _, _, max_invalid = _exact_round(b_max, max_lo)
+                if numpy.any(~numpy.isnan(b_min) & min_invalid):
+                    return None
+                if numpy.any(~numpy.isnan(b_max) & max_invalid):
+                    return None
+                b_min, b_max = (
+                    numpy.minimum(b_min, b_max), numpy.maximum(b_min, b_max))
+            if numpy.any(
+                    numpy.isnan(b_min) & ~numpy.isnan(bounds[i, regular])):
+                return None
+            scaled[i, regular], scaled[i + 1, regular] = b_min, b_max
+    return _normalize_bounds(scaled)
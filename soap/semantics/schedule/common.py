@@ -1,13 +1,9 @@
 import collections
 import math
 
-import islpy
-
 from soap.common.cache import cached
-from soap.expression import (
-    expression_factory, is_expression, is_variable, Variable, FixExpr,
-    expression_variables
-)
+from soap.expression import is_expression, is_variable, operators, FixExpr
+from soap.semantics.error import inf, IntegerInterval, mpz_type
 
 
 class DependenceType(object):
@@ -17,27 +13,88 @@ class DependenceType(object):
     output = 3
 
 
-def is_isl_expr(expr):
-    variables = expression_variables(expr)
-    try:
-        problem = '{{ [{vars}]: {expr} > 0 }}'.format(
-            vars=', '.join(v.name for v in variables), expr=expr)
-        islpy.Set(problem)
-    except islpy.Error:
-        return False
-    return True
+_affine_operators = {
+    operators.ADD_OP, operators.SUBTRACT_OP, operators.UNARY_SUBTRACT_OP,
+    operators.MULTIPLY_OP,
+}
+
+
+def _constant(form):
+    if any(coeff for var, coeff in form.items() if var != 1):
+        return None
+    return form.get(1, 0)
+
 
+def _scale(form, factor):
+    return {var: coeff * factor for var, coeff in form.items()}
 
-def rename_var_in_expr(expr, var_list, format_str):
+
+def _add(form, other):
+    form = dict(form)
+    for var, coeff in other.items():
+        form[var] = form.get(var, 0) + coeff
+    return form
+
+
+def _affine_form(expr):
     if is_variable(expr):
-        if expr in var_list:
-            return Variable(format_str.format(expr.name), dtype=expr.dtype)
-        return expr
-    if is_expression(expr):
-        args = (rename_var_in_expr(a, var_list, format_str)
-                for a in expr.args)
-        return expression_factory(expr.op, *args)
-    return expr
+        return {expr: 1}
+    if isinstance(expr, IntegerInterval):
+        if expr.min != expr.max or expr.min in (-inf, inf):
+            return None
+        return {1: int(expr.min)}
+    if isinstance(expr, (int, mpz_type)) and not isinstance(expr, bool):
+        return {1: int(expr)}
+    if not is_expression(expr) or expr.op not in _affine_operators:
+        return None
+    forms = [_affine_form(a) for a in expr.args]
+    if any(form is None for form in forms):
+        return None
+    if expr.op == operators.UNARY_SUBTRACT_OP:
+        return _scale(forms[0], -1)
+    form, other = forms
+    if expr.op == operators.ADD_OP:
+        return _add(form, other)
+    if expr.op == operators.SUBTRACT_OP:
+        return _add(form, _scale(other, -1))
+    # multiplication is affine only if either side is a constant
+    factor = _constant(other)
+    if factor is not None:
+        return _scale(form, factor)
+    factor = _constant(form)
+    if factor is not None:
+        return _scale(other, factor)
+    return None
+
+
+def affine_form(expr):
+    """
+    Extracts the affine form of an integer expression, by walking it
+    syntactically instead of asking ISL to parse it.
+
+    Returns a tuple of the constant term and a tuple of pairs of variables
+    and their non-zero integer coefficients ordered by variable names, or
+    `None` if `expr` is not affine.  The result is kept on `expr`, which is
+    interned, so equal subscripts are only walked once.
+    """
+    try:
+        return expr.__dict__['_affine_form']
+    except (AttributeError, KeyError):
+        pass
+    form = _affine_form(expr)
+    if form is not None:
+        constant = form.pop(1, 0)
+        coefficients = sorted(
+            ((var, coeff) for var, coeff in form.items() if coeff),
+            key=lambda var_coeff: var_coeff[0].name)
+        form = constant, tuple(coefficients)
+    try:
+        # left out of pickles, as with the cached hash
+        expr.__dict__['_affine_form'] = form
+    except AttributeError:
+        # constants
+        pass
+    return form
 
 
 def iter_point_count(iter_slice):
@@ -1,10 +1,9 @@
+import collections
+
 import islpy
 
-from soap.expression import Variable, expression_variables
 from soap.semantics.error import inf
-from soap.semantics.schedule.common import (
-    is_isl_expr, rename_var_in_expr, iter_point_count
-)
+from soap.semantics.schedule.common import affine_form, iter_point_count
 
 
 class ISLIndependenceException(Exception):
@@ -25,28 +24,30 @@ def dependence_vector(iter_vars, iter_slices, source, sink, invariant=None):
 
     inner_most_iter_var = iter_vars[-1]
     dist_vars = []
+    # constraints are pairs of whether it is an equality, and coefficients
+    # of variable names, where the key 1 is for the constant term
     constraints = []
-    exists_vars = set()
+    exists_vars = []
     for var, iter_slice in zip(iter_vars, iter_slices):
         dist_var = '__dist_{}'.format(var.name)
+        src_var = '__src_{}'.format(var.name)
+        snk_var = '__snk_{}'.format(var.name)
         dist_vars.append(dist_var)
+        exists_vars += [src_var, snk_var]
 
-        lower, upper = iter_slice.start, iter_slice.stop
-        constraints.append(
-            '{dist_var} = __snk_{iter_var} - __src_{iter_var}'
-            .format(dist_var=dist_var, iter_var=var))
+        # dist_var = snk_var - src_var
+        constraints.append((True, {dist_var: 1, snk_var: -1, src_var: 1}))
 
-        bound_cstr = ''
+        lower, upper = iter_slice.start, iter_slice.stop
         if lower != -inf:
-            bound_cstr += '{lower} <= '
-        bound_cstr += '__src_{iter_var} {op} __snk_{iter_var}'
+            # lower <= src_var
+            constraints.append((False, {src_var: 1, 1: -int(lower)}))
+        # src_var < snk_var for the inner most loop, else src_var <= snk_var
+        offset = -1 if var == inner_most_iter_var else 0
+        constraints.append((False, {snk_var: 1, src_var: -1, 1: offset}))
         if upper != inf:
-            bound_cstr += ' < {upper}'
-        compare_op = '<' if var == inner_most_iter_var else '<='
-        bound_cstr = bound_cstr.format(
-            iter_var=var, op=compare_op, lower=iter_slice.start,
-            upper=iter_slice.stop)
-        constraints.append(bound_cstr)
+            # snk_var < upper
+            constraints.append((False, {snk_var: -1, 1: int(upper) - 1}))
 
         step = iter_slice.step
         if step <= 0:
@@ -54,48 +55,58 @@ def dependence_vector(iter_vars, iter_slices, source, sink, invariant=None):
                 'For now we only deal with positive step size.')
         if step == 1:
             continue
-        for node_type in ['src', 'snk']:
-            exists_vars.add(Variable(
-                '__stride_{}_{}'.format(node_type, var.name), var.dtype))
-            constraints.append(
-                '__stride_{node_type}_{iter_var} * {step_size} = '
-                '__{node_type}_{iter_var}'.format(
-                    node_type=node_type, iter_var=var, step_size=step))
-
+        for node_type, node_var in [('src', src_var), ('snk', snk_var)]:
+            stride_var = '__stride_{}_{}'.format(node_type, var.name)
+            exists_vars.append(stride_var)
+            # stride_var * step = node_var
+            constraints.append((True, {stride_var: int(step), node_var: -1}))
+
+    # loop invariant variables in subscripts
+    invar_vars = {}
     for src_idx, snk_idx in zip(source.args, sink.args):
-        if not (is_isl_expr(src_idx) and is_isl_expr(snk_idx)):
+        src_form = affine_form(src_idx)
+        snk_form = affine_form(snk_idx)
+        if src_form is None or snk_form is None:
             raise NotImplementedError(
                 'Non-linear expression cannot be handled by ISL.')
-        src_idx = rename_var_in_expr(src_idx, iter_vars, '__src_{}')
-        snk_idx = rename_var_in_expr(snk_idx, iter_vars, '__snk_{}')
-        constraints.append('{} = {}'.format(src_idx, snk_idx))
-        exists_vars |= expression_variables(src_idx)
-        exists_vars |= expression_variables(snk_idx)
-        exists_vars |= {
-            Variable('__src_{}'.format(v.name), v.dtype) for v in iter_vars}
-        exists_vars |= {
-            Variable('__snk_{}'.format(v.name), v.dtype) for v in iter_vars}
-
-    do_invar_vars = exists_vars if invariant else []
-    for var in do_invar_vars:
-        if var.name.startswith('__'):
-            # __src_*, __snk_*, __stride_*
+        # src_idx - snk_idx = 0
+        coefficients = collections.defaultdict(int)
+        for (constant, var_coeffs), node_type, sign in [
+                (src_form, 'src', 1), (snk_form, 'snk', -1)]:
+            coefficients[1] += sign * constant
+            for var, coeff in var_coeffs:
+                if var in iter_vars:
+                    name = '__{}_{}'.format(node_type, var.name)
+                else:
+                    name = var.name
+                    invar_vars[name] = var
+                coefficients[name] += sign * coeff
+        constraints.append((True, coefficients))
+
+    for name, var in sorted(invar_vars.items()):
+        exists_vars.append(name)
+        if not invariant:
             continue
         lower, upper = invariant[var]
         if lower != -inf:
-            constraints.append('{lower} <= {var}'.format(lower=lower, var=var))
+            # lower <= var
+            constraints.append((False, {name: 1, 1: -int(lower)}))
         if upper != inf:
-            constraints.append('{var} <= {upper}'.format(upper=upper, var=var))
-
-    problem = \
-        '{{ [{dist_vars}] : exists ( {exists_vars} : \n{constraints} \n) }}'
-    problem = problem.format(
-        dist_vars=', '.join(dist_vars),
-        iter_vars=', '.join(v.name for v in iter_vars),
-        constraints=' and \n'.join(constraints),
-        exists_vars=', '.join(v.name for v in exists_vars))
+            # var <= upper
+            constraints.append((False, {name: -1, 1: int(upper)}))
+
+    space = islpy.Space.create_from_names(
+        islpy.DEFAULT_CONTEXT, set=dist_vars + exists_vars)
+    basic_set = islpy.BasicSet.universe(space)
+    for is_equality, coefficients in constraints:
+        if is_equality:
+            constraint = islpy.Constraint.eq_from_names(space, coefficients)
+        else:
+            constraint = islpy.Constraint.ineq_from_names(space, coefficients)
+        basic_set = basic_set.add_constraint(constraint)
+    basic_set = basic_set.project_out(
+        islpy.dim_type.set, len(dist_vars), len(exists_vars))
 
-    basic_set = islpy.BasicSet(problem)
     dist_vect_list = []
     basic_set.lexmin().foreach_point(dist_vect_list.append)
 
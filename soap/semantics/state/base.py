@@ -72,9 +72,17 @@ class BaseState(base_dispatcher('visit')):
         Generate a new copy of this MetaState, and update the content with a
         new pair `key`: `value`.
         """
-        new_mapping = dict(self)
-        new_mapping[self._cast_key(key)] = self._cast_value(key, value)
-        return self.__class__(new_mapping)
+        return self.immu_merge({key: value})
+
+    def immu_merge(self, mapping):
+        """
+        Generate a new copy of this state updated with the pairs in
+        `mapping`, which shares unchanged items with this state.
+        """
+        items = [
+            self._init_key_value(self._cast_key(key), value)
+            for key, value in mapping.items()]
+        return self._from_persistent_map(self._mapping.merge(items))
 
     def filter(self, key_set):
         return self.__class__({
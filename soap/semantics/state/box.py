@@ -5,12 +5,26 @@ from soap.semantics.error import cast, ErrorSemantics
 from soap.semantics.label import Label
 from soap.semantics.linalg import MultiDimensionalArray
 from soap.semantics.state.base import BaseState
+from soap.semantics.state.vector import AlignedValues
 
 
 class KeyErrorFromString(Exception):
     """Failed to convert string into a correct variable. """
 
 
+def _is_bottom(value):
+    return value.is_bottom()
+
+
+def _is_value_fixpoint(value, other_value):
+    if type(value) is not type(other_value):
+        return False
+    if isinstance(value, ErrorSemantics):
+        if not value.is_top() and not other_value.is_top():
+            value, other_value = value.v, other_value.v
+    return value == other_value
+
+
 class BoxState(BaseState, MapLattice):
     __slots__ = ()
 
@@ -61,21 +75,46 @@ class BoxState(BaseState, MapLattice):
             return True
         if self.is_bottom() and other.is_bottom():
             return True
+        aligned = AlignedValues.from_states(self, other)
+        if aligned is not None and not aligned.has_bottom():
+            equal, unchecked = aligned.values_equal()
+            return equal and all(
+                _is_value_fixpoint(v, u) for _, v, u in unchecked)
         non_bottom_keys = lambda d: set(
             [k for k, v in d.items() if not v.is_bottom()])
         if non_bottom_keys(self) != non_bottom_keys(other):
             return False
         for k, v in self.items():
-            u = other[k]
-            if type(v) is not type(u):
-                return False
-            if isinstance(v, ErrorSemantics):
-                if not v.is_top() and not u.is_top():
-                    u, v = u.v, v.v
-            if u != v:
+            if not _is_value_fixpoint(v, other[k]):
                 return False
         return True
 
+    def _merge_items(self, items):
+        if not items:
+            return self
+        return self.immu_merge(dict(items))
+
+    def join(self, other):
+        aligned = AlignedValues.from_states(self, other)
+        if aligned is None:
+            return super().join(other)
+        return self._merge_items(aligned.join_items())
+
+    def meet(self, other):
+        aligned = AlignedValues.from_states(self, other)
+        # keys of bottom values are removed by the meet of mappings
+        if aligned is None or aligned.has_bottom() or \
+                self._mapping.any_value(_is_bottom):
+            return super().meet(other)
+        mapping = self._mapping
+        items = []
+        for key, value in aligned.meet_items():
+            if value.is_bottom():
+                mapping = mapping.delete(key)
+            else:
+                items.append((key, value))
+        return self._from_persistent_map(mapping)._merge_items(items)
+
     def widen(self, other):
         """Simple widening operator, jumps to infinity if interval widens.
 
@@ -85,10 +124,12 @@ class BoxState(BaseState, MapLattice):
             return self
         if self.is_bottom() or other.is_top():
             return other
-        mapping = dict(self)
+        aligned = AlignedValues.from_states(self, other)
+        if aligned is not None:
+            return self._merge_items(aligned.widen_items())
+        mapping = {}
         for k, v in other.items():
-            if k not in mapping:
-                mapping[k] = v
-            else:
-                mapping[k] = mapping[k].widen(v)
-        return self.__class__(mapping)
+            if k in self:
+                v = self[k].widen(v)
+            mapping[k] = v
+        return self.immu_merge(mapping)
@@ -1,6 +1,9 @@
+from collections import Mapping
+
 from soap import logger
 
 from soap.common import indent
+from soap.common.hamt import PersistentMap
 from soap.expression import (
     AccessExpr, Expression, FixExpr, OutputVariableTuple, SelectExpr,
     UpdateExpr, Variable
@@ -12,17 +15,36 @@ from soap.semantics.label import Label
 from soap.semantics.state.base import BaseState
 
 
-class MetaState(BaseState, dict):
-    __slots__ = ('_hash')
+class MetaState(BaseState, Mapping):
+    __slots__ = ('_mapping', '_hash')
 
     def __init__(self, dictionary=None, **kwargs):
+        super().__init__()
+        self._hash = None
+        if isinstance(dictionary, MetaState) and not kwargs:
+            self._mapping = dictionary._mapping
+            return
+        # string keys are looked up in the state under construction
+        self._mapping = PersistentMap()
         dictionary = dict(dictionary or {}, **kwargs)
-        mapping = {
-            self._cast_key(key): self._cast_value(key, value)
-            for key, value in dictionary.items()
-        }
-        super().__init__(mapping)
+        self._mapping = PersistentMap(
+            self._init_key_value(key, value)
+            for key, value in dictionary.items())
+
+    @classmethod
+    def _from_persistent_map(cls, mapping):
+        """Creates a state from the persistent map `mapping` with cast keys
+        and values, which shares its structure."""
+        self = cls.__new__(cls)
+        self._mapping = mapping
         self._hash = None
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (list(self.items()), )
+
+    def _init_key_value(self, key, value):
+        return self._cast_key(key), self._cast_value(key, value)
 
     def _cast_key(self, key):
         if isinstance(key, (Variable, Label, OutputVariableTuple)):
@@ -46,18 +68,52 @@ class MetaState(BaseState, dict):
             return parse(value)
         if isinstance(value, (int, float)) or is_numeral(value):
             return cast(value)
-        if isinstance(value, dict):
+        if isinstance(value, (dict, MetaState)):
             return self.__class__(value)
         raise TypeError(
             'Do not know how to convert {!r} into an expression'.format(value))
 
     def __getitem__(self, key):
         try:
-            return super().__getitem__(key)
+            return self._mapping[key]
         except KeyError:
             logger.warning('Variable {} does not exist.'.format(key))
             return Variable('__unreachable', key.dtype)
 
+    def __setitem__(self, key, value):
+        self._mapping = self._mapping.set(key, value)
+        self._hash = None
+
+    def __delitem__(self, key):
+        self._mapping = self._mapping.delete(key)
+        self._hash = None
+
+    def get(self, key, default=None):
+        return self._mapping.get(key, default)
+
+    def __contains__(self, key):
+        return key in self._mapping
+
+    def __len__(self):
+        return len(self._mapping)
+
+    def __iter__(self):
+        return iter(self._mapping)
+
+    def items(self):
+        return self._mapping.items()
+
+    def values(self):
+        return self._mapping.values()
+
+    def __eq__(self, other):
+        if isinstance(other, MetaState):
+            return self._mapping == other._mapping
+        return self._mapping == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
     def is_fixpoint(self, other):
         raise RuntimeError('Should not be called.')
 
@@ -83,7 +139,7 @@ class MetaState(BaseState, dict):
         false_state = self.transition(flow.false_flow)
         var_list = set(self.keys())
         var_list |= set(true_state.keys()) | set(false_state.keys())
-        mapping = dict(self)
+        mapping = {}
         for var in var_list:
             true_expr = get(true_state, var)
             false_expr = get(false_state, var)
@@ -91,8 +147,9 @@ class MetaState(BaseState, dict):
                 value = true_expr
             else:
                 value = SelectExpr(bool_expr, true_expr, false_expr)
-            mapping[var] = value
-        return self.__class__(mapping)
+            if self.get(var) is not value:
+                mapping[var] = value
+        return self.immu_merge(mapping)
 
     @staticmethod
     def _input_vars(meta_state, var):
@@ -131,12 +188,12 @@ class MetaState(BaseState, dict):
             init_map[var] = self.__class__(
                 {k: v for k, v in init_state.items() if k in local_loop_vars})
 
-        mapping = dict(init_state)
+        mapping = {}
         for var in loop_map:
             # fixpoint expression
             mapping[var] = FixExpr(
                 bool_expr, loop_map[var], var, init_map[var])
-        return self.__class__(mapping)
+        return self.__class__(init_state).immu_merge(mapping)
 
     def visit_WhileFlow(self, flow):
         return self._visit_loop(self, flow.conditional_expr, flow.loop_flow)
@@ -160,7 +217,7 @@ class MetaState(BaseState, dict):
 
     def __hash__(self):
         if self._hash is None:
-            self._hash = hash(tuple(sorted(self.items(), key=hash)))
+            self._hash = hash(self._mapping)
         return self._hash
 
 
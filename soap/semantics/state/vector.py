@@ -0,0 +1,153 @@
+"""
+.. module:: soap.semantics.state.vector
+    :synopsis: Vectorized operations on the values of states sharing keys.
+"""
+import numpy
+
+from soap.semantics.error import ErrorSemantics, FloatInterval, IntegerInterval
+from soap.semantics.linalg import (
+    ErrorSemanticsArray, FloatIntervalArray, IntegerIntervalArray,
+    _is_top_bounds, _join_bounds, _meet_bounds, _nan, _widen_bounds
+)
+
+
+_array_classes = {
+    IntegerInterval: IntegerIntervalArray,
+    FloatInterval: FloatIntervalArray,
+    ErrorSemantics: ErrorSemanticsArray,
+}
+_no_error = (0.0, 0.0)
+_unknown = (_nan, ) * 4
+
+
+def _bounds_equal(bounds, other_bounds, errors=None):
+    """Column-wise equality of bounds, where NaN equals NaN.  Error bounds are
+    only compared for the columns in the mask `errors`."""
+    with numpy.errstate(invalid='ignore'):
+        equal = (bounds == other_bounds) | (
+            numpy.isnan(bounds) & numpy.isnan(other_bounds))
+    value_equal = numpy.all(equal[:2], axis=0)
+    if errors is None:
+        return value_equal
+    return value_equal & (~errors | numpy.all(equal[2:], axis=0))
+
+
+class AlignedValues(object):
+    """The values of two states with the same keys, which differ between the
+    states, aligned in arrays of bounds.
+
+    Bounds are laid out as in
+    :class:`soap.semantics.linalg.ErrorSemanticsArray`, with a column for
+    each key and zero errors for intervals.  Columns of values without
+    comparable bounds, e.g. of different types or not exactly representable
+    by doubles, are not `regular` and use the operators of the values.
+    """
+    def __init__(self, changes):
+        super().__init__()
+        self.keys, self.values, self.other_values = [], [], []
+        self.array_classes = []
+        bounds, other_bounds = [], []
+        for key, value, other_value in changes:
+            cls = value.__class__
+            array_cls = _array_classes.get(cls)
+            value_bounds = other_value_bounds = None
+            if array_cls is not None and other_value.__class__ is cls:
+                value_bounds = array_cls._item_bounds(value)
+                other_value_bounds = array_cls._item_bounds(other_value)
+            if value_bounds is None or other_value_bounds is None:
+                value_bounds = other_value_bounds = _unknown
+                array_cls = None
+            elif array_cls.bound_count == 2:
+                value_bounds += _no_error
+                other_value_bounds += _no_error
+            self.keys.append(key)
+            self.values.append(value)
+            self.other_values.append(other_value)
+            self.array_classes.append(array_cls)
+            bounds.append(value_bounds)
+            other_bounds.append(other_value_bounds)
+        shape = (len(bounds), 4)
+        self.bounds = numpy.array(bounds, dtype=float).reshape(shape).T
+        self.other_bounds = numpy.array(
+            other_bounds, dtype=float).reshape(shape).T
+        self.regular = numpy.array(
+            [cls is not None for cls in self.array_classes], dtype=bool)
+        self.errors = numpy.array(
+            [cls is ErrorSemanticsArray for cls in self.array_classes],
+            dtype=bool)
+
+    @classmethod
+    def from_states(cls, state, other):
+        """Aligns the values of two states, or returns `None` if their keys
+        differ."""
+        changes = state._mapping.changes(other._mapping)
+        if changes is None:
+            return None
+        return cls(changes)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def irregular_items(self):
+        for key, value, other_value, regular in zip(
+                self.keys, self.values, self.other_values, self.regular):
+            if not regular:
+                yield key, value, other_value
+
+    def has_bottom(self):
+        """Checks if any of the aligned values is bottom."""
+        if numpy.any(numpy.isnan(self.bounds[0, self.regular])):
+            return True
+        if numpy.any(numpy.isnan(self.other_bounds[0, self.regular])):
+            return True
+        return any(
+            value.is_bottom() or other_value.is_bottom()
+            for _, value, other_value in self.irregular_items())
+
+    def _combine(self, name, bounds_func):
+        """Returns items of values combined by `name`, each value which equals
+        the value in the first state is omitted, and a value which equals the
+        value in the second state is reused.  Bounds of regular values are
+        computed together by `bounds_func`."""
+        if not len(self):
+            return []
+        bounds = bounds_func(self.bounds, self.other_bounds)
+        unchanged = _bounds_equal(bounds, self.bounds, self.errors)
+        taken = _bounds_equal(bounds, self.other_bounds, self.errors)
+        items = []
+        for index, key in enumerate(self.keys):
+            value = self.values[index]
+            other_value = self.other_values[index]
+            array_cls = self.array_classes[index]
+            if array_cls is None:
+                items.append((key, getattr(value, name)(other_value)))
+            elif unchanged[index]:
+                continue
+            elif taken[index]:
+                items.append((key, other_value))
+            else:
+                value_bounds = bounds[:array_cls.bound_count, index]
+                items.append((key, array_cls._bounds_item(value_bounds)))
+        return items
+
+    def join_items(self):
+        return self._combine('join', _join_bounds)
+
+    def meet_items(self):
+        return self._combine('meet', _meet_bounds)
+
+    def widen_items(self):
+        return self._combine('widen', _widen_bounds)
+
+    def values_equal(self):
+        """Checks if regular values which are not top have equal value bounds.
+        Returns the result and the items that cannot be checked this way."""
+        bounds, other_bounds = self.bounds, self.other_bounds
+        top = _is_top_bounds(bounds) | _is_top_bounds(other_bounds)
+        checked = self.regular & ~top
+        equal = bool(numpy.all(_bounds_equal(bounds, other_bounds)[checked]))
+        unchecked = [
+            (key, value, other_value) for key, value, other_value, c in zip(
+                self.keys, self.values, self.other_values, checked)
+            if not c]
+        return equal, unchecked
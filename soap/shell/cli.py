@@ -7,6 +7,7 @@ from docopt import docopt
 import soap
 from soap import logger
 from soap.analysis import analyze
+from soap.common.trace import trace
 from soap.context import context
 from soap.semantics import flow_to_meta_state, BoxState
 from soap.shell import interactive
@@ -60,16 +61,44 @@ Options:
                             Set the number of iterations before using widening
                             in loop analysis.
                             [default: {context.widen_factor}]
+    --widen-thresholds=<list>
+                            Comma-separated landmarks used as thresholds in
+                            widening, in addition to constants in loops.
+    --narrow-steps={context.narrow_steps}
+                            Set the number of decreasing iterations after
+                            widening in loop analysis.
+                            [default: {context.narrow_steps}]
     --window-depth={context.window_depth}
                             Set the depth limit window of structural
                             optimization.  [default: {context.window_depth}]
     --unroll-depth={context.unroll_depth}
                             Set the loop unrolling depth.
                             [default: {context.unroll_depth}]
+    --time-budget={context.time_budget}
+                            Limit the wall-clock time of optimization in
+                            seconds, the best results found so far are
+                            returned when it runs out, 0 for no limit.
+                            [default: {context.time_budget}]
+    --state-dir=<dir>       Periodically save completed frontiers of the
+                            optimization to a checkpoint in this directory.
+    --resume                Resume optimization from the checkpoint in
+                            `--state-dir`, skipping finished work.
     --algorithm=<str>       The name of the algorithm used for optimization.
                             Allows: `closure`, `expand`, `reduce`, `parsings`,
-                            `greedy`, `frontier`, `thick` or `partition`.
-                            [default: partition]
+                            `greedy`, `frontier`, `thick`, `beam`, `nsga`
+                            or `partition`.  [default: partition]
+    --beam-width={context.beam_width}
+                            Set the maximum number of expressions kept after
+                            each step of the `beam` algorithm.
+                            [default: {context.beam_width}]
+    --population-size={context.population_size}
+                            Set the number of candidates in each generation
+                            of the `nsga` algorithm.
+                            [default: {context.population_size}]
+    --evaluation-budget={context.evaluation_budget}
+                            Set the maximum number of candidates analyzed by
+                            the `nsga` algorithm for each subexpression.
+                            [default: {context.evaluation_budget}]
     --norm={context.norm}
                             Specify the name of the norm function to use.
                             Allows: `mean_error`, `mse_error`, `max_error`
@@ -82,6 +111,10 @@ Options:
     --no-warning            Silent all warnings.  Overrides `--verbose` and
                             `--debug`.
     --dump-cache-info       Show cache statistics on exit.
+    --dump-rule-stats       Show statistics of transform rules on exit.
+    --trace=<file>          Write nested spans of stages, including those of
+                            worker processes, to this file as Chrome trace
+                            events, which can be viewed in Perfetto.
     -v --verbose            Do a verbose execution.
     -d --debug              Show debug information, also enable `--verbose`.
 """.format(**vars(soap))
@@ -123,13 +156,28 @@ def _setup_context(args):
     context.fast_factor = float(args['--fast-factor'])
     context.unroll_factor = int(args['--unroll-factor'])
     context.widen_factor = int(args['--widen-factor'])
+    widen_thresholds = args['--widen-thresholds']
+    if widen_thresholds:
+        context.widen_thresholds = widen_thresholds
+    context.narrow_steps = int(args['--narrow-steps'])
     context.window_depth = int(args['--window-depth'])
     context.unroll_depth = int(args['--unroll-depth'])
+    context.time_budget = float(args['--time-budget'])
+    context.beam_width = int(args['--beam-width'])
+    context.population_size = int(args['--population-size'])
+    context.evaluation_budget = int(args['--evaluation-budget'])
+    state_dir = args['--state-dir']
+    if state_dir:
+        context.state_dir = state_dir
+    context.resume = args['--resume']
     context.norm = args['--norm']
 
     if args['--no-multiprocessing']:
         context.multiprocessing = False
 
+    if args['--dump-rule-stats']:
+        context.rule_statistics = True
+
 
 def _file(args):
     command = args['--command']
@@ -252,6 +300,10 @@ def _post_run(args):
         from soap.common.cache import dump_cache_info
         with logger.info_context():
             dump_cache_info()
+    if args['--dump-rule-stats']:
+        from soap.transformer.statistics import dump_rule_statistics
+        with logger.info_context():
+            dump_rule_statistics()
 
 
 def main():
@@ -261,10 +313,11 @@ def main():
         _plot, _csv, _report, _unreachable,
     ]
     try:
-        for f in functions:
-            return_code = f(args)
-            if return_code is not None:
-                break
+        with trace(args['--trace']):
+            for f in functions:
+                return_code = f(args)
+                if return_code is not None:
+                    break
         _post_run(args)
         sys.exit(return_code)
     except CommandError as e:
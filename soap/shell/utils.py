@@ -1,21 +1,29 @@
 import csv
+import math
 import os
 import random
 import time
 
 from soap import logger
 from soap.analysis import frontier as analysis_frontier, Plot
+from soap.common import invalidate_cache
+from soap.common.budget import time_budget
+from soap.common.trace import trace_span
+from soap.common.parallel import pool
 from soap.context import context
 from soap.expression import is_expression
 from soap.parser import parse as _parse
 from soap.program.generator import generate_function
 from soap.semantics import (
-    arith_eval, BoxState, ErrorSemantics, flow_to_meta_state, IntegerInterval
+    batch_arith_eval, BoxState, ErrorSemantics, flow_to_meta_state,
+    IntegerInterval
 )
 from soap.transformer import (
-    closure, expand, frontier, greedy, parsings, reduce, thick,
+    beam, closure, expand, frontier, greedy, nsga, parsings, reduce, thick,
     partition_optimize
 )
+from soap.transformer.checkpoint import checkpoint
+from soap.transformer.statistics import record_frontier
 
 
 def parse(program):
@@ -29,45 +37,84 @@ def parse(program):
     return program, state, out_vars
 
 
-def _generate_samples(iv, population_size):
-    random.seed(0)
+def _task_seed(*keys):
+    """Derives a deterministic seed for a task, so that results do not
+    depend on the order in which workers pick up tasks.  """
+    return ':'.join(str(k) for k in (context.rand_seed, ) + keys)
+
+
+def _map(func, items):
+    if context.multiprocessing:
+        return pool.map_unordered(func, items)
+    return map(func, items)
+
+
+def _generate_sample(iv, seed):
+    rand = random.Random(seed)
 
     def sample(error):
         if isinstance(error, IntegerInterval):
-            v = random.randrange(error.min, error.max + 1)
+            v = rand.randrange(error.min, error.max + 1)
             return IntegerInterval([v, v])
-        v = random.uniform(error.v.min, error.v.max)
-        e = random.uniform(error.e.min, error.e.max)
+        v = rand.uniform(error.v.min, error.v.max)
+        e = rand.uniform(error.e.min, error.e.max)
         return ErrorSemantics(v, e)
 
-    samples = [
-        BoxState({var: sample(error) for var, error in iv.items()})
-        for i in range(population_size)]
-    return samples
+    # sort variables by name so that samples do not depend on hashing
+    items = sorted(iv.items(), key=lambda item: str(item[0]))
+    return BoxState({var: sample(error) for var, error in items})
 
 
-def _run_simulation(program, samples, outputs):
+def _simulate_samples(args):
+    key, program, iv, outputs, seeds = args
+    samples = [_generate_sample(iv, seed) for seed in seeds]
     max_error = 0
-    n = len(samples)
+    for result_state in batch_arith_eval(program, samples):
+        error = max(
+            max(abs(error.e.min), abs(error.e.max))
+            for var, error in result_state.items() if var in outputs)
+        max_error = max(error, max_error)
+    return key, max_error, len(seeds)
+
+
+def _simulation_tasks(key, program, iv, outputs, population_size):
+    # samples in a task are evaluated together in a batch
+    if context.multiprocessing:
+        chunk_size = math.ceil(population_size / pool.cpu_count)
+    else:
+        chunk_size = population_size
+    seeds = [_task_seed(key, i) for i in range(population_size)]
+    return [
+        (key, program, iv, outputs, seeds[i:i + chunk_size])
+        for i in range(0, population_size, max(chunk_size, 1))]
+
+
+def _run_simulation_tasks(tasks):
+    max_errors = {}
+    n = sum(len(task[-1]) for task in tasks)
+    i = 0
     try:
-        for i, iv in enumerate(samples):
+        for key, error, count in _map(_simulate_samples, tasks):
+            i += count
             logger.persistent(
-                'Sim', '{}/{}'.format(i + 1, n), l=logger.levels.debug)
-            result_state = arith_eval(program, iv)
-            error = max(
-                max(abs(error.e.min), abs(error.e.max))
-                for var, error in result_state.items() if var in outputs)
-            max_error = max(error, max_error)
+                'Sim', '{}/{}'.format(i, n), l=logger.levels.debug)
+            max_errors[key] = max(error, max_errors.get(key, 0))
         logger.unpersistent('Sim')
     except KeyboardInterrupt:
         pass
-    return max_error
+    return max_errors
+
+
+def _run_simulation(program, iv, outputs, population_size, task=0):
+    tasks = _simulation_tasks(task, program, iv, outputs, population_size)
+    return _run_simulation_tasks(tasks).get(task, 0)
 
 
 def simulate_error(program, population_size):
     program, inputs, outputs = parse(program)
-    samples = _generate_samples(BoxState(inputs), population_size)
-    return _run_simulation(flow_to_meta_state(program), samples, outputs)
+    return _run_simulation(
+        flow_to_meta_state(program), BoxState(inputs), outputs,
+        population_size)
 
 
 _algorithm_map = {
@@ -78,22 +125,38 @@ _algorithm_map = {
     'greedy': greedy,
     'frontier': frontier,
     'thick': thick,
+    'beam': beam,
+    'nsga': nsga,
     'partition': partition_optimize,
 }
 
 
 def optimize(source, file_name=None):
-    program, inputs, outputs = parse(source)
+    with trace_span('parse'):
+        program, inputs, outputs = parse(source)
     if not is_expression(program):
-        program = flow_to_meta_state(program).filter(outputs)
+        with trace_span('flow_to_meta_state'):
+            program = flow_to_meta_state(program).filter(outputs)
     func = _algorithm_map[context.algorithm]
     state = BoxState(inputs)
 
-    original = analysis_frontier([program], state, outputs).pop()
+    with trace_span('original analysis'):
+        original = analysis_frontier([program], state, outputs).pop()
 
     start_time = time.time()
-    results = func(program, state, outputs)
+    with checkpoint(context.state_dir, source, context.resume):
+        with time_budget(context.time_budget or None) as budget:
+            with trace_span('optimize', algorithm=context.algorithm):
+                results = func(program, state, outputs)
     elapsed_time = time.time() - start_time
+    if budget.exceeded():
+        logger.warning(
+            'Optimization stopped early after {:.2f}s, returning the best '
+            'results found so far.'.format(elapsed_time))
+        # cached results of stopped optimizations are incomplete
+        invalidate_cache()
+    if context.rule_statistics:
+        record_frontier(results)
 
     # results = analysis_frontier(expr_set, state, out_vars)
     emir = {
@@ -120,6 +183,12 @@ def plot(emir, file_name, reanalyze=False):
     plot.show()
 
 
+def _generate_row(args):
+    name, result, inputs, outputs = args
+    code = generate_function(name, result.expression, inputs, outputs)
+    return result.stats() + (code, )
+
+
 def emir2csv(emir, file):
     name = os.path.split(emir['file'])[-1]
     name = name.split(os.path.extsep)[0]
@@ -127,21 +196,23 @@ def emir2csv(emir, file):
     orig = emir['original']
     csvwriter.writerow(orig._fields)
     csvwriter.writerow(orig[:-1] + (emir['source'], ))
-    for i, result in enumerate(emir['results']):
-        logger.persistent(
-            'Generate', '{}/{}'.format(i + 1, len(emir['results'])))
-        stats = result.stats()
-        expr = result.expression
-        code = generate_function(name, expr, emir['inputs'], emir['outputs'])
-        csvwriter.writerow(stats + (code, ))
+    results = emir['results']
+    tasks = [
+        (name, result, emir['inputs'], emir['outputs'])
+        for result in results]
+    if context.multiprocessing:
+        rows = pool.map(_generate_row, tasks)
+    else:
+        rows = map(_generate_row, tasks)
+    # rows are streamed into the file in order as they are generated
+    for i, row in enumerate(rows):
+        logger.persistent('Generate', '{}/{}'.format(i + 1, len(tasks)))
+        csvwriter.writerow(row)
     logger.unpersistent('Generate')
 
 
-def report(emir, file_name):
-    def sub_report(result):
-        samples = _generate_samples(emir['inputs'], 100)
-        sim_error = _run_simulation(
-            result.expression, samples, emir['outputs'])
+def report(emir, file_name, population_size=100):
+    def sub_report(result, sim_error):
         return {
             'Accuracy': {
                 'Error Bound': float(result.error),
@@ -150,22 +221,32 @@ def report(emir, file_name):
             'Resources': {
                 'Estimated': {
                     'LUTs': result.lut,
-                    'Registers': result.ff,
                     'DSP Elements': result.dsp,
                 },
             },
+            'Latency': result.latency,
         }
-    original = emir['original']
     results = sorted(emir['results'])
+    picks = {
+        'Original': emir['original'],
+        'Fewest Resources': results[0],
+        'Most Accurate': results[-1],
+        'Best Latency': min(results, key=lambda r: r.latency),
+    }
+    # simulations of all picked results share one pool of tasks
+    tasks = []
+    for key, result in sorted(picks.items()):
+        tasks += _simulation_tasks(
+            key, result.expression, emir['inputs'], emir['outputs'],
+            population_size)
+    sim_errors = _run_simulation_tasks(tasks)
     report = {
         'Name': file_name,
         'Time': emir['time'],
         'Total': len(emir['results']),
         'Statistics': {
-            'Original': sub_report(original),
-            'Fewest Resources': sub_report(results[0]),
-            'Most Accurate': sub_report(results[-1]),
-            'Best Latency': sub_report(...),
+            key: sub_report(result, sim_errors.get(key, 0))
+            for key, result in picks.items()
         },
         'Context': emir['context'],
     }
@@ -2,5 +2,7 @@ from soap.transformer.arithmetic import ArithTreeTransformer
 from soap.transformer.utils import (
     closure, greedy_frontier_closure, transform, expand, reduce, parsings,
 )
-from soap.transformer.discover import greedy, frontier, thick
+from soap.transformer.discover import (
+    greedy, frontier, thick, beam, nsga
+)
 from soap.transformer.partition import partition_optimize
@@ -0,0 +1,213 @@
+"""
+.. module:: soap.transformer.checkpoint
+    :synopsis: Checkpoints of optimization runs for resuming.
+"""
+import collections
+import hashlib
+import os
+import pickle
+import time
+from contextlib import contextmanager
+
+from soap import logger
+from soap.analysis import AnalysisResult
+from soap.context import context
+from soap.expression import (
+    expression_factory, is_expression, is_variable, COMMUTATIVITY_OPERATORS
+)
+from soap.semantics import Label
+
+
+CHECKPOINT_FILE = 'checkpoint.pkl'
+_volatile_options = {
+    'ipdb', 'autocall', 'xmode', 'repr', 'logger', 'multiprocessing',
+    'time_budget', 'state_dir', 'resume', 'checkpoint_interval',
+    'rule_statistics',
+}
+
+
+def _stable_repr(obj, labels):
+    """A representation of `obj` which is the same across processes.
+
+    Labels are represented by the expressions they label, as their values
+    depend on the order they are created, and are collected in `labels`.
+    Arguments of commutative operators are sorted, as their order in
+    canonical expressions follows hashes, which differ across processes.
+    """
+    if isinstance(obj, Label):
+        label_repr = 'Label({})'.format(_stable_repr(obj.expr(), labels))
+        labels[label_repr] = obj
+        return label_repr
+    if is_variable(obj):
+        return '{}({!r}, {})'.format(
+            obj.__class__.__name__, obj.name, obj.dtype)
+    if is_expression(obj):
+        args = [_stable_repr(arg, labels) for arg in obj.args]
+        if obj.op in COMMUTATIVITY_OPERATORS:
+            args = sorted(args)
+        return '{}({!r}, {})'.format(
+            obj.__class__.__name__, obj.op, ', '.join(args))
+    if isinstance(obj, collections.Mapping):
+        items = sorted(
+            '{}: {}'.format(_stable_repr(k, labels), _stable_repr(v, labels))
+            for k, v in obj.items())
+        return '{}({{{}}})'.format(obj.__class__.__name__, ', '.join(items))
+    if isinstance(obj, (set, frozenset)):
+        items = sorted(_stable_repr(v, labels) for v in obj)
+        return '{{{}}}'.format(', '.join(items))
+    if isinstance(obj, (list, tuple)):
+        return '({})'.format(', '.join(_stable_repr(v, labels) for v in obj))
+    return '{!r}'.format(obj)
+
+
+def _relabel(obj, label_map):
+    """Replaces labels in `obj` by labels in `label_map` with the same label
+    values."""
+    if isinstance(obj, Label):
+        return label_map[obj.label_value]
+    if is_variable(obj):
+        return obj
+    if is_expression(obj):
+        return expression_factory(
+            obj.op, *(_relabel(arg, label_map) for arg in obj.args))
+    if isinstance(obj, AnalysisResult):
+        *stats, expr = obj
+        return AnalysisResult(*(stats + [_relabel(expr, label_map)]))
+    if isinstance(obj, collections.Mapping):
+        return obj.__class__({
+            _relabel(k, label_map): _relabel(v, label_map)
+            for k, v in obj.items()})
+    if isinstance(obj, (set, frozenset, list, tuple)):
+        return obj.__class__(_relabel(v, label_map) for v in obj)
+    return obj
+
+
+def run_config(source):
+    """The configuration of a run, which a checkpoint must match to resume
+    from it."""
+    options = {
+        k: v for k, v in context.items()
+        if k not in _volatile_options and not k.startswith('_')}
+    return _stable_repr((source, options), {})
+
+
+class Checkpoint(object):
+    """Completed frontiers of an optimization run, which are periodically
+    saved to the file `CHECKPOINT_FILE` in `state_dir`.
+
+    Frontiers are stored by namespaces, and looked up by stable
+    representations of keys, so that a run resumed in a new process can find
+    frontiers of the same partitions and subexpressions.
+    """
+    def __init__(self, state_dir, config, interval=None):
+        super().__init__()
+        self.path = os.path.join(state_dir, CHECKPOINT_FILE)
+        self.config = config
+        if interval is None:
+            interval = context.checkpoint_interval
+        self.interval = interval
+        self.entries = {}
+        self._last_save = time.time()
+        self._dirty = False
+
+    def resume(self):
+        """Loads saved frontiers if the checkpoint is from a run with the same
+        configuration."""
+        try:
+            with open(self.path, 'rb') as f:
+                config, entries = pickle.load(f)
+        except FileNotFoundError:
+            logger.info('No checkpoint found in {}.'.format(self.path))
+            return False
+        if config != self.config:
+            logger.warning(
+                'Checkpoint {} is from a different run configuration, '
+                'starting afresh.'.format(self.path))
+            return False
+        self.entries = entries
+        logger.info('Resuming from {} with {} frontiers.'.format(
+            self.path, len(entries)))
+        return True
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump((self.config, self.entries), f)
+        os.replace(temp_path, self.path)
+        self._last_save = time.time()
+        self._dirty = False
+
+    def _key(self, namespace, key):
+        labels = {}
+        key_repr = _stable_repr(key, labels)
+        digest = hashlib.sha1(key_repr.encode()).hexdigest()
+        return (namespace, digest), labels
+
+    def load(self, namespace, key):
+        """Finds the frontier saved for `key` in `namespace`, with labels
+        replaced by the current labels of the same expressions, or `None` if
+        it does not exist."""
+        entry_key, labels = self._key(namespace, key)
+        entry = self.entries.get(entry_key)
+        if entry is None:
+            return None
+        label_reprs, value = entry
+        try:
+            label_map = {
+                label_value: labels[label_repr]
+                for label_value, label_repr in label_reprs.items()}
+            return _relabel(value, label_map) if label_map else value
+        except (KeyError, ValueError):
+            return None
+
+    def store(self, namespace, key, value):
+        entry_key, labels = self._key(namespace, key)
+        label_reprs = {
+            label.label_value: label_repr
+            for label_repr, label in labels.items()}
+        self.entries[entry_key] = (label_reprs, value)
+        self._dirty = True
+        if time.time() - self._last_save >= self.interval:
+            self.save()
+
+    def close(self):
+        if self._dirty:
+            self.save()
+
+
+_checkpoints = [None]
+
+
+@contextmanager
+def checkpoint(state_dir, source, resume=False):
+    """Withable checkpoint of the run optimizing `source` in `state_dir`,
+    which is saved on exit, and resumed from if `resume` is set.  Does
+    nothing if `state_dir` is `None`."""
+    if state_dir is None:
+        yield None
+        return
+    ckpt = Checkpoint(state_dir, run_config(source))
+    if resume:
+        ckpt.resume()
+    _checkpoints.append(ckpt)
+    try:
+        yield ckpt
+    finally:
+        _checkpoints.pop()
+        ckpt.close()
+
+
+def load_checkpoint(namespace, key):
+    ckpt = _checkpoints[-1]
+    if ckpt is None:
+        return None
+    return ckpt.load(namespace, key)
+
+
+def store_checkpoint(namespace, key, value):
+    ckpt = _checkpoints[-1]
+    if ckpt is not None:
+        ckpt.store(namespace, key, value)
@@ -10,13 +10,22 @@ import sys
 
 from soap import logger
 from soap.common import cached
+from soap.common.budget import budget_exceeded, expire_budget
 from soap.common.parallel import pool
+from soap.common.trace import (
+    local_tracing, merge_trace_events, trace_span, tracing_enabled
+)
 from soap.context import context
-from soap.expression.common import expression_factory, is_expression
+from soap.expression.common import (
+    canonicalize, expression_factory, is_expression
+)
 from soap.parser import parse
 from soap.semantics import LabelContext
 from soap.transformer.pattern import transform
 from soap.transformer.depth import crop, stitch
+from soap.transformer.statistics import (
+    merge_rule_statistics, recording_rules, rule_statistics_enabled
+)
 
 
 RECURSION_LIMIT = sys.getrecursionlimit()
@@ -40,18 +49,19 @@ class TreeFarmer(object):
             self._crop_env.update(e)
         return cropped
 
+    def _stitch(self, tree):
+        if not self._crop_env:
+            return tree
+        try:
+            return stitch(tree, self._crop_env)
+        except AttributeError:
+            return tree
+
     def _seed(self, trees):
         """Stitches all trees."""
         if not self._crop_env:
             return trees
-        seeded = set()
-        for t in trees:
-            try:
-                t = stitch(t, self._crop_env)
-            except AttributeError:
-                pass
-            seeded.add(t)
-        return seeded
+        return {self._stitch(t) for t in trees}
 
 
 class TreeTransformer(TreeFarmer):
@@ -100,11 +110,10 @@ class TreeTransformer(TreeFarmer):
             self.multiprocessing = context.multiprocessing
 
         if isinstance(tree_or_trees, str):
-            self._expressions = [parse(tree_or_trees)]
+            tree_or_trees = [parse(tree_or_trees)]
         elif is_expression(tree_or_trees):
-            self._expressions = [tree_or_trees]
-        else:
-            self._expressions = tree_or_trees
+            tree_or_trees = [tree_or_trees]
+        self._expressions = [canonicalize(t) for t in tree_or_trees]
 
     def _plugin(self, curr_step, trees, plugin):
         """Plugin function call setup and cleanup."""
@@ -137,9 +146,18 @@ class TreeTransformer(TreeFarmer):
             map = pool.map
         else:
             map = lambda func, args_list: [func(args) for args in args_list]
-        args_list = [(expression, rules, closure, depth)
-                     for index, expression in enumerate(expressions)]
-        should_include, discovered_sets = zip(*map(_walk, args_list))
+        statistics, tracing = rule_statistics_enabled(), tracing_enabled()
+        args_list = [
+            (expression, rules, closure, depth, statistics, tracing)
+            for index, expression in enumerate(expressions)]
+        span = 'closure step' if closure else 'reduction step'
+        with trace_span(span, size=len(args_list)):
+            should_include, discovered_sets, recordings, events = zip(
+                *map(_walk, args_list))
+        for recording in recordings:
+            merge_rule_statistics(recording, stitch=self._stitch)
+        for walk_events in events:
+            merge_trace_events(walk_events)
         expressions = {
             expression for index, expression in enumerate(expressions)
             if should_include[index]}
@@ -148,35 +166,55 @@ class TreeTransformer(TreeFarmer):
             discovered.update(s)
         return expressions, discovered
 
+    def _closure_step(self, curr_step, todo_trees, done_trees, reduced):
+        """One step of the transitive closure algorithm."""
+        if not reduced:
+            todo_trees = self._sample(todo_trees)
+            _, step_trees = self._step(todo_trees, not reduced, None)
+            step_trees -= done_trees
+            step_trees = self._recursive_closure(step_trees, True)
+            step_trees = self._plugin(
+                curr_step, step_trees, self.step_plugin)
+            done_trees = done_trees | todo_trees
+            todo_trees = step_trees - done_trees
+        else:
+            nore_trees, step_trees = self._step(
+                todo_trees, not reduced, None)
+            step_trees = self._plugin(
+                curr_step, step_trees, self.reduce_plugin)
+            done_trees = done_trees | nore_trees
+            todo_trees = step_trees - nore_trees
+        return todo_trees, done_trees
+
     def _recursive_closure(self, trees, reduced=False):
         """Transitive closure algorithm."""
         done_trees = set()
         todo_trees = set(trees)
         curr_step = 1
+        stopped = False
         while todo_trees and curr_step <= self.steps:
+            if budget_exceeded():
+                logger.debug('Time budget exceeded, closure stopped.')
+                stopped = True
+                break
             # print set size
             logger.persistent(
                 'Iteration' if not reduced else 'Reduction', curr_step)
             logger.persistent('Trees', len(done_trees))
             logger.persistent('Todo', len(todo_trees))
-            if not reduced:
-                todo_trees = self._sample(todo_trees)
-                _, step_trees = self._step(todo_trees, not reduced, None)
-                step_trees -= done_trees
-                step_trees = self._recursive_closure(step_trees, True)
-                step_trees = self._plugin(
-                    curr_step, step_trees, self.step_plugin)
-                done_trees |= todo_trees
-                todo_trees = step_trees - done_trees
-            else:
-                nore_trees, step_trees = self._step(
-                    todo_trees, not reduced, None)
-                step_trees = self._plugin(
-                    curr_step, step_trees, self.reduce_plugin)
-                done_trees |= nore_trees
-                todo_trees = step_trees - nore_trees
+            try:
+                todo_trees, done_trees = self._closure_step(
+                    curr_step, todo_trees, done_trees, reduced)
+            except KeyboardInterrupt:
+                logger.warning('Closure interrupted.')
+                expire_budget()
+                stopped = True
+                break
             curr_step += 1
         logger.unpersistent('Iteration', 'Reduction', 'Trees', 'Todo')
+        if stopped:
+            # trees yet to be transformed are still equivalent
+            done_trees |= todo_trees
         return done_trees
 
     def closure(self):
@@ -191,11 +229,14 @@ class TreeTransformer(TreeFarmer):
 
 
 def _walk(args):
-    expression, rules, closure, depth = args
+    expression, rules, closure, depth, statistics, tracing = args
     discovered = set()
     depth = depth if closure and depth else RECURSION_LIMIT
     try:
-        discovered = _recursive_walk(expression, rules, depth)
+        with local_tracing(tracing) as events, trace_span('walk'):
+            with recording_rules(statistics) as recording:
+                discovered = _recursive_walk(expression, rules, depth)
+        discovered = {canonicalize(e) for e in discovered}
     except Exception:
         import sys
         from IPython.core.ultratb import VerboseTB
@@ -203,7 +244,9 @@ def _walk(args):
         raise
     if closure:
         discovered.add(expression)
-    return not closure and not discovered, discovered
+    # statistics and spans recorded in workers are sent back with the results
+    return (
+        not closure and not discovered, discovered, recording, events)
 
 
 @cached
@@ -7,9 +7,13 @@ import itertools
 
 from soap import logger
 from soap.analysis import (
+    beam_frontier as beam_analysis_frontier,
     frontier as analysis_frontier, thick_frontier as thick_analysis_frontier
 )
 from soap.common import base_dispatcher, cached
+from soap.common.budget import budget_incomplete, split_budget
+from soap.common.cache import uncache_result
+from soap.common.trace import trace_span
 from soap.context import context
 from soap.expression import (
     expression_factory, UnaryExpression, SelectExpr, FixExpr, operators
@@ -19,8 +23,11 @@ from soap.semantics import BoxState, ErrorSemantics, MetaState
 from soap.semantics.functions import (
     arith_eval, unroll_fix_expr, fixpoint_eval,
 )
+from soap.transformer.checkpoint import load_checkpoint, store_checkpoint
+from soap.transformer.evolve import nsga_closure
 from soap.transformer.utils import (
-    closure, greedy_frontier_closure, thick_frontier_closure
+    beam_frontier_closure, closure, greedy_frontier_closure,
+    thick_frontier_closure
 )
 
 
@@ -100,14 +107,22 @@ class BaseDiscoverer(base_dispatcher('discover')):
 
     def _discover_expression(self, expr, state, out_vars):
         op = expr.op
-        frontier_args_list = [self(arg, state, out_vars) for arg in expr.args]
+        # shares time with the remaining arguments and the closure
+        count = len(expr.args) + 1
+        frontier_args_list = []
+        for i, arg in enumerate(expr.args):
+            with split_budget(count - i):
+                frontier_args_list.append(self(arg, state, out_vars))
         frontier_expr_set = {
             expression_factory(op, *args)
             for args in itertools.product(*frontier_args_list)
         }
         frontier_expr_set.add(expr)
         logger.info('Discovering: {}'.format(expr))
-        frontier = self._closure(frontier_expr_set, state, out_vars)
+        with trace_span(
+                'discover step', discoverer=self.__class__.__name__,
+                expression=str(expr), size=len(frontier_expr_set)):
+            frontier = self._closure(frontier_expr_set, state, out_vars)
         logger.info('Discovered: {}, Frontier: {}'.format(expr, len(frontier)))
         return frontier
 
@@ -198,7 +213,8 @@ class BaseDiscoverer(base_dispatcher('discover')):
         n = len(expr_set)
         for i, expr in enumerate(expr_set):
             logger.persistent('Unroll', '{}/{}'.format(i + 1, n))
-            frontier |= set(self(expr, state, out_vars))
+            with split_budget(n - i):
+                frontier |= set(self(expr, state, out_vars))
         logger.unpersistent('Unroll')
         return self.filter(frontier, state, out_vars, size_limit=0)
 
@@ -213,7 +229,8 @@ class BaseDiscoverer(base_dispatcher('discover')):
         n = len(var_list)
         for i, var in enumerate(var_list):
             logger.persistent('Merge', '{}/{}'.format(i, n))
-            var_expr_set = self(var_expr_state[var], state, out_vars)
+            with split_budget(n - i):
+                var_expr_set = self(var_expr_state[var], state, out_vars)
             iterer = itertools.product(frontier, var_expr_set)
             new_frontier = []
             for meta_state, var_expr in iterer:
@@ -234,7 +251,17 @@ class BaseDiscoverer(base_dispatcher('discover')):
 
     @cached
     def __call__(self, expr, state, out_vars=None):
-        return super().__call__(expr, state, out_vars)
+        key = (self.__class__.__name__, expr, state, out_vars)
+        frontier = load_checkpoint('discover', key)
+        if frontier is not None:
+            return frontier
+        frontier = super().__call__(expr, state, out_vars)
+        if budget_incomplete():
+            # truncated frontiers are neither cached nor checkpointed
+            uncache_result()
+        else:
+            store_checkpoint('discover', key, frontier)
+        return frontier
 
     def __eq__(self, other):
         return self.__class__ == other.__class__
@@ -271,6 +298,20 @@ class ThickDiscoverer(BaseDiscoverer):
         return thick_frontier_closure(expr_set, state, out_vars, **kwargs)
 
 
+class BeamDiscoverer(BaseDiscoverer):
+    """A subclass of :class:`BaseDiscoverer` which keeps at most
+    `context.beam_width` equivalent expressions after each step, so that
+    frontiers merged from multiple variables do not explode."""
+    def filter(self, expr_set, state, out_vars, **kwargs):
+        frontier = [
+            r.expression for r in beam_analysis_frontier(
+                expr_set, state, out_vars, **kwargs)]
+        return frontier
+
+    def closure(self, expr_set, state, out_vars, **kwargs):
+        return beam_frontier_closure(expr_set, state, out_vars, **kwargs)
+
+
 class FrontierDiscoverer(_FrontierFilter):
     """A subclass of :class:`BaseDiscoverer` to generate our frontier_trace
     equivalent expressions."""
@@ -279,6 +320,14 @@ class FrontierDiscoverer(_FrontierFilter):
         return self.filter(expr_set, state, out_vars)
 
 
+class EvolutionaryDiscoverer(_FrontierFilter):
+    """A subclass of :class:`BaseDiscoverer` to generate equivalent
+    expressions by our evolutionary search, which analyzes a fixed number of
+    candidates for each subexpression."""
+    def closure(self, expr_set, state, out_vars, **kwargs):
+        return nsga_closure(expr_set, state, out_vars, **kwargs)
+
+
 def _discover(discoverer, expr, state, out_vars):
     if isinstance(expr, Flow):
         state = state or expr.inputs()
@@ -305,6 +354,8 @@ def _discover(discoverer, expr, state, out_vars):
 _greedy_discoverer = GreedyDiscoverer()
 _frontier_discoverer = FrontierDiscoverer()
 _thick_discoverer = ThickDiscoverer()
+_evolutionary_discoverer = EvolutionaryDiscoverer()
+_beam_discoverer = BeamDiscoverer()
 
 
 def thick(expr, state=None, out_vars=None):
@@ -350,3 +401,33 @@ def frontier(expr, state=None, out_vars=None):
     :type out_vars: :class:`collections.Sequence`
     """
     return _discover(_frontier_discoverer, expr, state, out_vars)
+
+
+def beam(expr, state=None, out_vars=None):
+    """Finds our equivalent expressions using :class:`BeamDiscoverer`.
+
+    :param expr: An expression or a variable-expression mapping
+    :type expr:
+        :class:`soap.expression.Expression` or
+        :class:`soap.semantics.state.MetaState`
+    :param state: The ranges of input variables.
+    :type state: :class:`soap.semantics.state.BoxState`
+    :param out_vars: The output variables of the metastate
+    :type out_vars: :class:`collections.Sequence`
+    """
+    return _discover(_beam_discoverer, expr, state, out_vars)
+
+
+def nsga(expr, state=None, out_vars=None):
+    """Finds our equivalent expressions using :class:`EvolutionaryDiscoverer`.
+
+    :param expr: An expression or a variable-expression mapping
+    :type expr:
+        :class:`soap.expression.Expression` or
+        :class:`soap.semantics.state.MetaState`
+    :param state: The ranges of input variables.
+    :type state: :class:`soap.semantics.state.BoxState`
+    :param out_vars: The output variables of the metastate
+    :type out_vars: :class:`collections.Sequence`
+    """
+    return _discover(_evolutionary_discoverer, expr, state, out_vars)
@@ -0,0 +1,302 @@
+"""
+.. module:: soap.transformer.evolve
+    :synopsis: Evolutionary multi-objective search of equivalent expressions.
+"""
+import collections
+import random
+
+from soap import logger
+from soap.analysis.core import (
+    Analysis, _crowding_distances, _pareto_frontier, sample_unique
+)
+from soap.common.budget import budget_exceeded
+from soap.common.trace import trace_span
+from soap.context import context
+from soap.expression import (
+    expression_factory, is_expression, operators, FixExpr
+)
+from soap.semantics import IntegerInterval, mpz_type
+from soap.transformer.arithmetic import ArithTreeTransformer
+from soap.transformer.pattern import transform as rule_transform
+from soap.transformer.utils import transform
+
+
+_PRIME = 2 ** 61 - 1
+_FINGERPRINT_SEEDS = (0, 1)
+
+
+def _subexpressions(expr, path=()):
+    """Generates the paths and subexpressions of `expr`, or of the
+    expressions of variables if `expr` is a mapping.  Loops are not
+    descended into."""
+    if isinstance(expr, collections.Mapping):
+        for var in sorted(expr, key=str):
+            yield from _subexpressions(expr[var], path + (var, ))
+        return
+    if not is_expression(expr) or isinstance(expr, FixExpr):
+        return
+    yield path, expr
+    for index, arg in enumerate(expr.args):
+        yield from _subexpressions(arg, path + (index, ))
+
+
+def _replace(expr, path, new_expr):
+    """Replaces the subexpression of `expr` at `path` with `new_expr`."""
+    if not path:
+        return new_expr
+    key, *path = path
+    if isinstance(expr, collections.Mapping):
+        mapping = dict(expr)
+        mapping[key] = _replace(expr[key], path, new_expr)
+        return expr.__class__(mapping)
+    args = list(expr.args)
+    args[key] = _replace(args[key], path, new_expr)
+    return expression_factory(expr.op, *args)
+
+
+def _fingerprint_value(expr, seed, values):
+    value = values.get(expr)
+    if value is not None:
+        return value
+    if isinstance(expr, (IntegerInterval, mpz_type)):
+        if isinstance(expr, IntegerInterval) and expr.min != expr.max:
+            value = hash((seed, expr)) % _PRIME
+        else:
+            value = int(getattr(expr, 'min', expr)) % _PRIME
+    elif is_expression(expr) and expr.op in _fingerprint_operators:
+        args = [_fingerprint_value(a, seed, values) for a in expr.args]
+        value = _fingerprint_operators[expr.op](*args) % _PRIME
+    else:
+        # variables, labels, non-integer constants and other expressions
+        # are opaque values
+        value = hash((seed, expr)) % _PRIME
+    values[expr] = value
+    return value
+
+
+_fingerprint_operators = {
+    operators.ADD_OP: lambda a, b: a + b,
+    operators.SUBTRACT_OP: lambda a, b: a - b,
+    operators.MULTIPLY_OP: lambda a, b: a * b,
+    operators.UNARY_SUBTRACT_OP: lambda a: -a,
+}
+
+
+def fingerprint(expr, cache=None):
+    """Computes a fingerprint of the value of `expr`, by evaluating it as a
+    polynomial over a prime field at pseudo-random points, in which
+    variables and other opaque subexpressions are independent unknowns.
+
+    Expressions with different fingerprints are never equivalent by the
+    real arithmetic of the rewrite rules, and by the Schwartz-Zippel lemma,
+    expressions with the same fingerprints are equivalent with an error
+    probability below `degree / 2 ** 61` per point.
+    """
+    cache = {} if cache is None else cache
+    return tuple(
+        _fingerprint_value(expr, seed, cache.setdefault(seed, {}))
+        for seed in _FINGERPRINT_SEEDS)
+
+
+class EvolutionarySearch(object):
+    """NSGA-II search of equivalent expressions with small statistics.
+
+    Candidates are mutated by applying a random transform rule of
+    :class:`soap.transformer.arithmetic.ArithTreeTransformer` to a random
+    subexpression, and crossed over by exchanging subexpressions with the
+    same :func:`fingerprint` between two candidates.  The candidates are
+    ranked by non-dominated sorting of the 4-objective analysis results,
+    with ties broken by crowding distances.  Each generation of new
+    candidates is analyzed in one batch, until `evaluations` candidates are
+    analyzed or the time budget runs out.
+
+    :param population_size: The number of candidates kept in each
+        generation.
+    :type population_size: int
+    :param evaluations: The maximum number of candidates to analyze.
+    :type evaluations: int
+    :param crossover_rate: The probability of crossing over two candidates
+        to breed a new candidate.
+    :type crossover_rate: float
+    """
+    transform_rules = ArithTreeTransformer.transform_rules
+    reduction_rules = ArithTreeTransformer.reduction_rules
+
+    def __init__(self, state, out_vars=None, recurrences=None,
+                 population_size=None, evaluations=None, crossover_rate=None,
+                 round_values=None):
+        super().__init__()
+        self.state = state
+        self.out_vars = out_vars
+        self.recurrences = recurrences
+        self.round_values = round_values
+        self.population_size = population_size or context.population_size
+        self.evaluations = evaluations or context.evaluation_budget
+        if crossover_rate is None:
+            crossover_rate = context.crossover_rate
+        self.crossover_rate = crossover_rate
+        self.random = random.Random(context.rand_seed)
+        self.results = {}
+        self._fingerprints = {}
+
+    def _ordered(self, items):
+        return sorted(items, key=str)
+
+    def _reduce(self, expr):
+        reduced = transform(
+            expr, self.reduction_rules, multiprocessing=False)
+        if len(reduced) > 1:
+            reduced.discard(expr)
+        return self._ordered(reduced)[0]
+
+    def mutate(self, expr):
+        """Rewrites a random subexpression of `expr` by a random transform
+        rule, or returns `expr` if no rules apply."""
+        nodes = [
+            (path, node) for path, node in _subexpressions(expr)
+            if node.op in self.transform_rules]
+        self.random.shuffle(nodes)
+        for path, node in nodes:
+            rules = list(self.transform_rules[node.op])
+            self.random.shuffle(rules)
+            for rule in rules:
+                discovered = rule_transform(rule, node)
+                discovered.discard(node)
+                if discovered:
+                    new_node = self.random.choice(self._ordered(discovered))
+                    return _replace(expr, path, self._reduce(new_node))
+        return expr
+
+    def crossover(self, expr, other_expr):
+        """Replaces a random subexpression of `expr` with a different but
+        equivalent subexpression of `other_expr`, or returns `expr` if there
+        are none."""
+        other_nodes = collections.defaultdict(list)
+        for _, node in _subexpressions(other_expr):
+            other_nodes[fingerprint(node, self._fingerprints)].append(node)
+        swaps = []
+        for path, node in _subexpressions(expr):
+            equivalent_nodes = other_nodes.get(
+                fingerprint(node, self._fingerprints), [])
+            swaps += [(path, n) for n in equivalent_nodes if n != node]
+        if not swaps:
+            return expr
+        path, node = self.random.choice(swaps)
+        return _replace(expr, path, node)
+
+    def evaluate(self, expr_list):
+        """Analyzes new candidates in `expr_list` in one batch, within the
+        remaining number of evaluations."""
+        remaining = self.evaluations - len(self.results)
+        expr_list = [e for e in expr_list if e not in self.results]
+        expr_list = expr_list[:max(remaining, 0)]
+        if not expr_list:
+            return []
+        results = Analysis(
+            expr_list, self.state, self.out_vars,
+            recurrences=self.recurrences, size_limit=-1,
+            round_values=self.round_values).analyze()
+        for result in results:
+            self.results[result.expression] = result
+        return results
+
+    def _rank(self, results):
+        """Non-dominated sorting of `results` into fronts."""
+        fronts = []
+        results = set(results)
+        while results:
+            front, results = _pareto_frontier(results)
+            fronts.append(self._ordered(front))
+        return fronts
+
+    def select(self, results):
+        """Selects the next generation from `results`, and returns it with
+        the fitness of each selected candidate."""
+        population = []
+        fitness = {}
+        for rank, front in enumerate(self._rank(results)):
+            distances = _crowding_distances(front)
+            for result in front:
+                fitness[result] = (rank, -distances[result])
+            if len(population) + len(front) > self.population_size:
+                front = sorted(front, key=lambda r: fitness[r])
+                front = front[:self.population_size - len(population)]
+            population += front
+            if len(population) >= self.population_size:
+                break
+        return population, fitness
+
+    def _tournament(self, population, fitness):
+        result = self.random.choice(population)
+        other_result = self.random.choice(population)
+        if fitness[other_result] < fitness[result]:
+            result = other_result
+        return result.expression
+
+    def breed(self, population, fitness):
+        """Breeds a generation of new candidates."""
+        offspring = []
+        tries = 0
+        while len(offspring) < self.population_size:
+            tries += 1
+            if tries > 10 * self.population_size:
+                break
+            expr = self._tournament(population, fitness)
+            if self.random.random() < self.crossover_rate:
+                other_expr = self._tournament(population, fitness)
+                expr = self.crossover(expr, other_expr)
+            expr = self.mutate(expr)
+            if expr in self.results or expr in offspring:
+                continue
+            offspring.append(expr)
+        return offspring
+
+    def __call__(self, expr_set):
+        """Searches for expressions equivalent to `expr_set` with small
+        statistics, and returns the Pareto frontier of all analyzed
+        candidates."""
+        if is_expression(expr_set) or isinstance(
+                expr_set, collections.Mapping):
+            expr_set = [expr_set]
+        expr_list = self._ordered(set(expr_set))
+        if len(expr_list) > self.population_size:
+            expr_list = self.random.sample(expr_list, self.population_size)
+        population, fitness = self.select(self.evaluate(expr_list))
+        generation = 1
+        while population and len(self.results) < self.evaluations:
+            if budget_exceeded():
+                logger.debug('Time budget exceeded, evolution stopped.')
+                break
+            logger.persistent('Generation', generation)
+            logger.persistent('Evaluated', len(self.results))
+            with trace_span('generation', generation=generation):
+                offspring = self.breed(population, fitness)
+                if not offspring:
+                    break
+                results = self.evaluate(offspring)
+                population, fitness = self.select(
+                    set(population) | set(results))
+            generation += 1
+        logger.unpersistent('Generation', 'Evaluated')
+        return sample_unique(_pareto_frontier(self.results.values())[0])
+
+
+def nsga_closure(expr, state, out_vars=None, recurrences=None, **kwargs):
+    """Our evolutionary multi-objective search by
+    :class:`EvolutionarySearch`.
+
+    :param expr: The expression(s) under transform.
+    :type expr:
+        :class:`soap.expression.Expression` or
+        :class:`soap.semantics.state.MetaState`
+    :param state: The ranges of input variables.
+    :type state: dictionary containing mappings from variables to
+        :class:`soap.semantics.error.Interval`
+    :param out_vars: The output variables of the metastate
+    :type out_vars: :class:`collections.Sequence`
+    :param recurrences: A dictionary containing information about
+        loop recurrences
+    :type recurrences: dict
+    """
+    search = EvolutionarySearch(state, out_vars, recurrences, **kwargs)
+    return [r.expression for r in search(expr)]
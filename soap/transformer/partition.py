@@ -2,8 +2,12 @@ import itertools
 
 from soap import logger
 from soap.analysis.core import (
-    Analysis, AnalysisResult, thick_frontier, sample_unique
+    Analysis, AnalysisResult, pareto_frontier, thick_frontier, sample_unique
 )
+from soap.common.budget import (
+    budget_exceeded, budget_incomplete, split_budget
+)
+from soap.common.trace import trace_span
 from soap.context import context
 from soap.expression import (
     expression_factory, FixExpr, UnaryExpression, TernaryExpression,
@@ -14,6 +18,7 @@ from soap.semantics.functions import (
     error_eval, fixpoint_eval, unroll_fix_expr
 )
 from soap.semantics.schedule.graph.base import loop_graph
+from soap.transformer.checkpoint import load_checkpoint, store_checkpoint
 
 
 def is_innermost_loop(expr):
@@ -226,10 +231,18 @@ class PartitionOptimizer(GenericExecuter):
         return results
 
     def _optimize_expression(self, expr, state, recurrences):
+        key = (expr, state, recurrences)
+        results = load_checkpoint('partition', key)
+        if results is not None:
+            logger.info('Resumed: {}, size: {}'.format(expr, len(results)))
+            return results
         logger.info('Optimizing: {}'.format(expr))
-        expr_set = self.optimize_algorithm(expr, state, recurrences)
-        results = self.analyze_algorithm(expr_set, state, recurrences)
+        with trace_span('optimize partition', expression=str(expr)):
+            expr_set = self.optimize_algorithm(expr, state, recurrences)
+            results = self.analyze_algorithm(expr_set, state, recurrences)
         logger.info('Optimized: {}, size: {}'.format(expr, len(results)))
+        if not budget_incomplete():
+            store_checkpoint('partition', key, results)
         return results
 
     def _execute_atom(self, expr, state, recurrences):
@@ -246,7 +259,9 @@ class PartitionOptimizer(GenericExecuter):
         for count, env in enumerate(fix_expr_list):
             logger.persistent(
                 'Unroll', '{}/{}'.format(count, len(fix_expr_list) - 1))
-            results += self._execute_mapping(env, state, None)
+            # shares time with the remaining variants and the init state
+            with split_budget(len(fix_expr_list) - count + 1):
+                results += self._execute_mapping(env, state, None)
         logger.unpersistent('Unroll')
         results = self.filter_algorithm(results)
 
@@ -311,7 +326,8 @@ class PartitionOptimizer(GenericExecuter):
         for idx, var in enumerate(var_list):
             logger.persistent('Merge', '{}/{}'.format(idx, len(var_list)))
             each_expr = meta_state[var]
-            expr_results = self(each_expr, state, recurrences)
+            with split_budget(len(var_list) - idx):
+                expr_results = self(each_expr, state, recurrences)
             logger.info('Merging: {}'.format(each_expr))
             new_results = []
             iterer = itertools.product(results, expr_results)
@@ -395,12 +411,14 @@ def partition_optimize(
     meta_state_str = str(meta_state)
 
     logger.info('Partitioning:', meta_state_str)
-    label, env = _generate(_mark_unroll(meta_state), state)
+    with trace_span('partition generation'):
+        label, env = _generate(_mark_unroll(meta_state), state)
     logger.info('Partitioned:', meta_state_str)
 
     logger.info('Optimizing:', meta_state_str)
     optimizer = PartitionOptimizer(optimize_algorithm=optimize_algorithm)
-    results = optimizer(env, state, recurrences)
+    with trace_span('partition optimization'):
+        results = optimizer(env, state, recurrences)
     logger.info('Optimized:', meta_state_str)
 
     if context.logger.level == logger.levels.debug:
@@ -416,10 +434,17 @@ def partition_optimize(
     if not final_analysis:
         return spliced_results
 
+    if budget_exceeded():
+        logger.warning(
+            'Time budget exceeded, skips final analysis of {} results.'
+            .format(len(spliced_results)))
+        return sample_unique(pareto_frontier(spliced_results))
+
     logger.info('Final analysis: ', len(spliced_results))
     expr_list = [result.expression for result in spliced_results]
     analysis = Analysis(expr_list, state, out_vars, round_values=True)
-    results = analysis.frontier()
+    with trace_span('final analysis', size=len(expr_list)):
+        results = analysis.frontier()
     logger.info('Final frontier: ', len(expr_list))
 
     return results
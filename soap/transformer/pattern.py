@@ -1,5 +1,6 @@
 import collections
 import itertools
+import time
 
 from patmat.mimic import _Mimic, Val
 
@@ -10,6 +11,7 @@ from soap.expression.common import (
 from soap.expression.operators import ASSOCIATIVITY_OPERATORS
 from soap.parser import expr_parse
 from soap.semantics.common import is_constant
+from soap.transformer.statistics import record_rule, rule_statistics_enabled
 
 
 class ExprMimic(_Mimic):
@@ -105,6 +107,15 @@ def decompile(mimic, env):
 
 
 def transform(rule, expression):
+    if not rule_statistics_enabled():
+        return _transform(rule, expression)
+    start = time.time()
+    concrete_matches = _transform(rule, expression)
+    record_rule(rule[2], expression, concrete_matches, time.time() - start)
+    return concrete_matches
+
+
+def _transform(rule, expression):
     patterns, matches, name = rule
     concrete_matches = set()
     for p in patterns:
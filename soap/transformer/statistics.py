@@ -0,0 +1,149 @@
+"""
+.. module:: soap.transformer.statistics
+    :synopsis: Per-rule profiling and yield statistics of transform rules.
+"""
+import collections
+from contextlib import contextmanager
+
+from soap.context import context
+from soap.expression import is_expression
+
+
+RULE_STATISTICS_FIELDS = [
+    'attempts', 'matches', 'discovered', 'new', 'time', 'frontier']
+(_ATTEMPTS, _MATCHES, _DISCOVERED, _NEW, _TIME, _FRONTIER) = range(
+    len(RULE_STATISTICS_FIELDS))
+
+
+def _new_statistics():
+    return [0] * len(RULE_STATISTICS_FIELDS)
+
+
+def _new_recording():
+    return collections.defaultdict(_new_statistics), []
+
+
+# statistics of rules, and expressions discovered by rules which are yet to
+# be counted, of the current process and of the tasks running in it
+_recordings = [_new_recording()]
+# workers may be forked before the option is set, so tasks are told by the
+# parent process whether to record
+_recording = [False]
+# hashes of all discovered expressions, to the names of rules which
+# discovered them first
+_origins = {}
+
+
+def rule_statistics_enabled():
+    return _recording[-1] or context.rule_statistics
+
+
+@contextmanager
+def recording_rules(enabled=True):
+    """Withable context of a task, e.g. in a worker, which records statistics
+    of rules if `enabled`, and yields them for :func:`merge_rule_statistics`.
+    """
+    recording = _new_recording()
+    _recording.append(enabled)
+    _recordings.append(recording)
+    try:
+        yield recording
+    finally:
+        _recordings.pop()
+        _recording.pop()
+
+
+def record_rule(name, expression, discovered, elapsed):
+    """Records an attempt of the rule `name` on `expression`, which
+    discovered `discovered` in `elapsed` seconds."""
+    stats, discoveries = _recordings[-1]
+    rule_stats = stats[name]
+    rule_stats[_ATTEMPTS] += 1
+    discovered = discovered - {expression}
+    if discovered:
+        rule_stats[_MATCHES] += 1
+        rule_stats[_DISCOVERED] += len(discovered)
+        discoveries.append((name, discovered))
+    rule_stats[_TIME] += elapsed
+
+
+def _count_new(stats, discoveries, stitch=None):
+    for name, discovered in discoveries:
+        for expr in discovered:
+            if stitch:
+                expr = stitch(expr)
+            key = hash(expr)
+            if key in _origins:
+                continue
+            _origins[key] = name
+            stats[name][_NEW] += 1
+
+
+def merge_rule_statistics(recording, stitch=None):
+    """Merges statistics of a task from :func:`recording_rules` into the
+    current process.  Discovered expressions are counted as new for the
+    first rule which discovered them, after expanding them with `stitch`."""
+    stats, discoveries = _recordings[-1]
+    task_stats, task_discoveries = recording
+    for name, rule_stats in task_stats.items():
+        merged_stats = stats[name]
+        for index, value in enumerate(rule_stats):
+            merged_stats[index] += value
+    _count_new(stats, task_discoveries, stitch)
+
+
+def _merged_statistics():
+    stats, discoveries = _recordings[0]
+    _count_new(stats, discoveries)
+    del discoveries[:]
+    return stats
+
+
+def _subexpressions(expr):
+    if isinstance(expr, collections.Mapping):
+        for var_expr in expr.values():
+            yield from _subexpressions(var_expr)
+        return
+    if not is_expression(expr):
+        return
+    yield expr
+    for arg in expr.args:
+        yield from _subexpressions(arg)
+
+
+def record_frontier(results):
+    """Counts for each rule the number of `results`, i.e. expressions or
+    analysis results, which contain expressions first discovered by it."""
+    stats = _merged_statistics()
+    for result in results:
+        expr = getattr(result, 'expression', result)
+        names = {
+            _origins.get(hash(subexpr)) for subexpr in _subexpressions(expr)}
+        names.discard(None)
+        for name in names:
+            stats[name][_FRONTIER] += 1
+
+
+def rule_statistics():
+    """Returns the statistics of rules, merged from all workers, as a
+    dictionary from rule names to dictionaries of fields."""
+    return {
+        name: dict(zip(RULE_STATISTICS_FIELDS, rule_stats))
+        for name, rule_stats in _merged_statistics().items()}
+
+
+def clear_rule_statistics():
+    _recordings[0] = _new_recording()
+    _origins.clear()
+
+
+def dump_rule_statistics():
+    from soap import logger
+    logger.info('Rule Statistics')
+    logger.info('{:<55}\tAttempts\tMatches\tFound\tNew\tTime\tFrontier'
+                .format('Name'))
+    stats = rule_statistics()
+    for name in sorted(stats, key=lambda n: -stats[n]['time']):
+        logger.info(
+            '{:<55}\t{attempts}\t\t{matches}\t{discovered}\t{new}\t'
+            '{time:.3f}\t{frontier}'.format(name, **stats[name]))
@@ -14,7 +14,7 @@ from soap.transformer.arithmetic import (
     distributivity_distribute_multiplication,
     distributivity_distribute_division, ArithTreeTransformer
 )
-from soap.analysis import frontier, thick_frontier
+from soap.analysis import beam_frontier, frontier, thick_frontier
 
 
 def closure(expr, **kwargs):
@@ -79,6 +79,28 @@ def thick_frontier_closure(
         thick_frontier, expr, state, out_vars, recurrences, **kwargs)
 
 
+def beam_frontier_closure(
+        expr, state, out_vars=None, recurrences=None, **kwargs):
+    """Our beam search transitive closure, which keeps at most
+    `context.beam_width` expressions after each step.
+
+    :param expr: The expression(s) under transform.
+    :type expr:
+        :class:`soap.expression.Expression` or
+        :class:`soap.semantics.state.MetaState`
+    :param state: The ranges of input variables.
+    :type state: dictionary containing mappings from variables to
+        :class:`soap.semantics.error.Interval`
+    :param out_vars: The output variables of the metastate
+    :type out_vars: :class:`collections.Sequence`
+    :param recurrences: A dictionary containing information about
+        loop recurrences
+    :type recurrences: dict
+    """
+    return _plugin_closure(
+        beam_frontier, expr, state, out_vars, recurrences, **kwargs)
+
+
 def transform(expr, reduction_rules=None, transform_rules=None,
               step_plugin=None, reduce_plugin=None, depth=None,
               multiprocessing=True):
@@ -0,0 +1,112 @@
+import unittest
+
+from soap.analysis.bound import stats_lower_bound
+from soap.analysis.core import (
+    analyze_expressions, beam_frontier, hypervolume, pareto_frontier
+)
+from soap.common.budget import time_budget
+from soap.context import context
+from soap.datatype import float_type, int_type
+from soap.expression import (
+    operators, BinaryArithExpr, UnaryArithExpr, Variable
+)
+from soap.semantics import BoxState, MetaState
+from soap.transformer.utils import beam_frontier_closure, parsings
+
+
+class TestLowerBound(unittest.TestCase):
+    def setUp(self):
+        self.x = Variable('x', float_type)
+        self.y = Variable('y', float_type)
+        self.n = Variable('n', int_type)
+        self.state = BoxState(x=[1.0, 2.0], y=[-1.0, 3.0], n=[1, 4])
+        add = BinaryArithExpr(operators.ADD_OP, self.x, self.y)
+        mul = BinaryArithExpr(operators.MULTIPLY_OP, add, self.y)
+        self.expr = BinaryArithExpr(
+            operators.MULTIPLY_OP, add,
+            BinaryArithExpr(operators.ADD_OP, mul, self.x))
+        self.int_expr = BinaryArithExpr(
+            operators.MULTIPLY_OP, self.n,
+            BinaryArithExpr(operators.ADD_OP, self.n, self.n))
+        self.exprs = parsings(BinaryArithExpr(
+            operators.ADD_OP, BinaryArithExpr(operators.ADD_OP, self.x, mul),
+            BinaryArithExpr(operators.ADD_OP, self.y, self.x)))
+
+    def test_stats_lower_bound(self):
+        exprs = [self.expr, self.int_expr, MetaState({
+            self.x: self.expr, self.y: self.y, self.n: self.int_expr})]
+        results = analyze_expressions(exprs, self.state, [self.x, self.n])
+        for result in results:
+            lut, dsp, latency = stats_lower_bound(
+                result.expression, [self.x, self.n])
+            self.assertLessEqual(lut, result.lut)
+            self.assertLessEqual(dsp, result.dsp)
+            self.assertLessEqual(latency, result.latency)
+        # critical path of two float additions and two multiplications
+        self.assertEqual(stats_lower_bound(self.expr)[2], 34)
+
+    def test_zero_latency_operators(self):
+        add = BinaryArithExpr(operators.ADD_OP, self.x, self.y)
+        neg = UnaryArithExpr(operators.UNARY_SUBTRACT_OP, self.x)
+        exprs = [
+            UnaryArithExpr(operators.UNARY_SUBTRACT_OP, add),
+            BinaryArithExpr(operators.MULTIPLY_OP, neg, self.y),
+        ]
+        for result in analyze_expressions(exprs, self.state):
+            lut, dsp, latency = stats_lower_bound(result.expression)
+            self.assertLessEqual(lut, result.lut)
+            self.assertLessEqual(dsp, result.dsp)
+            self.assertLessEqual(latency, result.latency)
+
+    def test_prune(self):
+        results = set(analyze_expressions(self.exprs, self.state))
+        pruned_results = set(
+            analyze_expressions(self.exprs, self.state, prune=True))
+        self.assertLess(len(pruned_results), len(results))
+        self.assertEqual(
+            pareto_frontier(results), pareto_frontier(pruned_results))
+        # bounds are not computed for all expressions once the budget expires
+        with time_budget(0):
+            pruned_results = list(
+                analyze_expressions(self.exprs, self.state, prune=True))
+        self.assertEqual(len(pruned_results), 1)
+
+
+class TestHypervolume(unittest.TestCase):
+    def test_hypervolume(self):
+        points = [(1, 3), (2, 2), (3, 1)]
+        self.assertEqual(hypervolume(points, (4, 4)), 6)
+        # dominated and clipped points add nothing
+        points += [(3, 3), (5, 0)]
+        self.assertEqual(hypervolume(points, (4, 4)), 6)
+        self.assertEqual(hypervolume([(1, 1, 1)], (2, 3, 4)), 6)
+        self.assertEqual(hypervolume([(0, 0, 1), (1, 1, 0)], (2, 2, 2)), 5)
+        self.assertEqual(hypervolume([], (1, 1, 1, 1)), 0)
+
+
+class TestBeamFrontier(unittest.TestCase):
+    def setUp(self):
+        self.x = Variable('x', float_type)
+        self.y = Variable('y', float_type)
+        self.state = BoxState(x=[1.0, 2.0], y=[-1.0, 3.0])
+        add = BinaryArithExpr(operators.ADD_OP, self.x, self.y)
+        self.expr = BinaryArithExpr(
+            operators.MULTIPLY_OP, add, BinaryArithExpr(
+                operators.ADD_OP, add, BinaryArithExpr(
+                    operators.MULTIPLY_OP, self.x, self.y)))
+
+    def test_beam_frontier(self):
+        results = set(analyze_expressions(parsings(self.expr), self.state))
+        frontier = pareto_frontier(results)
+        self.assertLess(len(frontier), len(results))
+        beam = beam_frontier(results, len(frontier))
+        self.assertEqual(set(beam), frontier)
+        beam = beam_frontier(results, len(frontier) + 1)
+        self.assertLess(frontier, set(beam))
+        self.assertEqual(len(beam_frontier(results, 1)), 1)
+
+    def test_beam_frontier_closure(self):
+        for width in [1, 3]:
+            with context.local(beam_width=width, multiprocessing=False):
+                expr_list = beam_frontier_closure(self.expr, self.state)
+            self.assertLessEqual(len(expr_list), width)
@@ -1,12 +1,19 @@
+import random
 import unittest
 
+from soap.context import context
 from soap.datatype import int_type, float_type, IntegerArrayType
 from soap.expression import (
     operators, UnaryArithExpr, BinaryArithExpr, SelectExpr, FixExpr,
     AccessExpr, UpdateExpr, BinaryBoolExpr, Variable
 )
+from soap.lattice.map import MapLattice
 from soap.semantics.error import IntegerInterval, ErrorSemantics
-from soap.semantics.functions.arithmetic import arith_eval
+from soap.semantics.functions.arithmetic import (
+    arith_eval, SharedArithmeticEvaluator
+)
+from soap.semantics.functions.batch import batch_arith_eval
+from soap.semantics.functions.fixpoint import fixpoint_eval
 from soap.semantics.linalg import IntegerIntervalArray
 from soap.semantics.state.box import BoxState
 from soap.semantics.state.meta import MetaState
@@ -88,6 +95,50 @@ class TestArithmeticEvaluator(unittest.TestCase):
         value = arith_eval(test_expr, self.state)
         self.assertEqual(test_value, value)
 
+    def test_FixExpr_stable_variables(self):
+        w = Variable('w', float_type)
+        bool_expr = BinaryBoolExpr(operators.LESS_OP, self.x, self.y)
+        double_expr = BinaryArithExpr(
+            operators.MULTIPLY_OP, self.z, ErrorSemantics(2))
+        loop_state = MetaState({
+            self.x: BinaryArithExpr(
+                operators.ADD_OP, self.x, IntegerInterval(1)),
+            self.y: self.y,
+            self.z: self.z,
+            w: double_expr,
+        })
+        init_state = MetaState({
+            self.x: self.x, self.y: self.y, self.z: self.z, w: self.z,
+        })
+        state = BoxState(x=[1, 2], y=3, z=[1.0, 2.0], w=[1.0, 2.0])
+        test_expr = FixExpr(bool_expr, loop_state, w, init_state)
+        test_value = arith_eval(double_expr, state)
+        value = arith_eval(test_expr, state)
+        self.assertEqual(test_value, value)
+
+    def test_FixExpr_threshold_widening(self):
+        bool_expr = BinaryBoolExpr(operators.LESS_OP, self.x, self.y)
+        init_state = MetaState({self.x: IntegerInterval(0), self.y: self.y})
+        state = BoxState(x=0, y=100)
+
+        def fix_expr(step):
+            loop_state = MetaState({
+                self.x: BinaryArithExpr(
+                    operators.ADD_OP, self.x, IntegerInterval(step)),
+                self.y: self.y,
+            })
+            return FixExpr(bool_expr, loop_state, self.x, init_state)
+
+        with context.local(widen_factor=1):
+            value = arith_eval(fix_expr(1), state)
+        self.assertEqual(IntegerInterval(100), value)
+        with context.local(widen_factor=1, narrow_steps=0):
+            value = arith_eval(fix_expr(7), state)
+        self.assertEqual(IntegerInterval([100, float('inf')]), value)
+        with context.local(widen_factor=1, narrow_steps=3):
+            value = arith_eval(fix_expr(7), state)
+        self.assertEqual(IntegerInterval([100, 106]), value)
+
     def test_MetaState(self):
         meta_state = MetaState({
             self.x: BinaryArithExpr(
@@ -98,3 +149,206 @@ class TestArithmeticEvaluator(unittest.TestCase):
         test_state = BoxState(x=[2, 3], y=[2, 4])
         state = arith_eval(meta_state, self.state)
         self.assertEqual(test_state, state)
+
+
+class TestSharedArithmeticEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.x = Variable('x', float_type)
+        self.y = Variable('y', float_type)
+        self.state = BoxState(x=[1.0, 2.0], y=[-1.0, 3.0])
+        shared = BinaryArithExpr(operators.ADD_OP, self.x, self.y)
+        self.exprs = [
+            BinaryArithExpr(operators.MULTIPLY_OP, shared, self.x),
+            BinaryArithExpr(operators.MULTIPLY_OP, self.x, shared),
+            MetaState({
+                self.x: BinaryArithExpr(operators.SUBTRACT_OP, shared, self.y),
+                self.y: shared,
+            }),
+        ]
+
+    def test_shared_values(self):
+        evaluator = SharedArithmeticEvaluator(self.state)
+        for expr in self.exprs:
+            self.assertEqual(
+                arith_eval(expr, self.state), evaluator(expr, self.state))
+        # x, y, x + y, the product, which is commutative, the subtraction
+        # and the meta state
+        self.assertEqual(len(evaluator._values), 6)
+
+    def test_analyze_expressions(self):
+        from soap.analysis.core import _analyze_expression, analyze_expressions
+        out_vars = [self.x, self.y]
+        results = list(analyze_expressions(self.exprs, self.state, out_vars))
+        # the products differ only in the order of commutative arguments,
+        # and are analyzed once
+        test_results = [
+            _analyze_expression((expr, self.state, out_vars, None, None))
+            for expr in self.exprs[1:]]
+        self.assertEqual(test_results, results)
+
+
+class TestBoxState(unittest.TestCase):
+    def setUp(self):
+        self.x = Variable('x', int_type)
+        self.y = Variable('y', int_type)
+        self.z = Variable('z', float_type)
+        self.a = Variable('a', IntegerArrayType([2]))
+        self.state = BoxState({
+            self.x: [1, 2], self.y: 3, self.z: [1.0, 2.0],
+            self.a: IntegerIntervalArray([1, 2])})
+        self.other = self.state.immu_merge({
+            self.x: [2, 4], self.z: ErrorSemantics([0.5, 1.5]),
+            self.a: IntegerIntervalArray([0, 2])})
+
+    def test_join_and_meet(self):
+        join = self.state | self.other
+        self.assertIs(join[self.y], self.state[self.y])
+        self.assertEqual(join[self.x], IntegerInterval([1, 4]))
+        self.assertEqual(join[self.z], ErrorSemantics([0.5, 2.0]))
+        self.assertEqual(
+            join[self.a], IntegerIntervalArray([IntegerInterval([0, 1]), 2]))
+        self.assertIs((join | self.state)._mapping, join._mapping)
+        meet = self.state & self.other
+        self.assertEqual(meet[self.x], IntegerInterval(2))
+        self.assertEqual(meet[self.z], ErrorSemantics([1.0, 1.5]))
+        disjoint = self.state & self.state.immu_update(self.x, 5)
+        self.assertNotIn(self.x, disjoint)
+        bottom = self.state.immu_update(
+            self.x, IntegerInterval(bottom=True))
+        self.assertNotIn(self.x, bottom & self.other)
+        # a bottom value shared by both states
+        other = bottom.immu_update(self.z, ErrorSemantics([1.5, 3.0]))
+        meet = bottom & other
+        self.assertNotIn(self.x, meet)
+        self.assertEqual(meet, MapLattice.meet(bottom, other))
+
+    def test_widen(self):
+        widen = self.state.widen(self.other)
+        self.assertEqual(widen[self.x], IntegerInterval([1, float('inf')]))
+        self.assertIs(widen[self.y], self.state[self.y])
+        self.assertIs(self.other.widen(self.state)[self.y], self.state[self.y])
+
+    def test_is_fixpoint(self):
+        self.assertTrue(self.state.is_fixpoint(BoxState(self.state)))
+        self.assertFalse(self.state.is_fixpoint(self.other))
+        error_state = self.state.immu_update(
+            self.z, ErrorSemantics([1.0, 2.0], [-1, 1]))
+        self.assertTrue(self.state.is_fixpoint(error_state))
+
+
+class TestLoopAcceleration(unittest.TestCase):
+    def setUp(self):
+        context.take_snapshot()
+        context.fast_factor = 0
+        self.i = Variable('i', int_type)
+        self.x = Variable('x', float_type)
+        self.y = Variable('y', float_type)
+        self.state = BoxState(i=0, x=[1.0, 2.0], y=[0.5, 1.0])
+
+    def tearDown(self):
+        context.restore_snapshot()
+        fixpoint_eval.cache_clear()
+
+    def _fix_expr(self, expr):
+        bool_expr = BinaryBoolExpr(
+            operators.LESS_OP, self.i, IntegerInterval(40))
+        loop_state = MetaState({
+            self.i: BinaryArithExpr(
+                operators.ADD_OP, self.i, IntegerInterval(1)),
+            self.x: expr,
+            self.y: self.y,
+        })
+        init_state = MetaState({self.i: 0, self.x: self.x, self.y: self.y})
+        return FixExpr(bool_expr, loop_state, self.x, init_state)
+
+    def _assert_overapproximates(self, expr):
+        fix_expr = self._fix_expr(expr)
+        context.loop_acceleration = 0
+        iterated = fixpoint_eval(fix_expr, self.state)
+        fixpoint_eval.cache_clear()
+        context.loop_acceleration = 1
+        accelerated = fixpoint_eval(fix_expr, self.state)
+        self.assertEqual(accelerated['path'], 'acceleration')
+        self.assertEqual(accelerated['trip_count'], 40)
+        for key in ['entry', 'exit', 'end']:
+            self.assertTrue(iterated[key].le(accelerated[key]))
+        self.assertEqual(accelerated['exit'][self.i], IntegerInterval(40))
+
+    def test_affine(self):
+        self._assert_overapproximates(
+            BinaryArithExpr(operators.ADD_OP, self.x, self.y))
+
+    def test_geometric(self):
+        self._assert_overapproximates(
+            BinaryArithExpr(operators.MULTIPLY_OP, self.x, self.y))
+
+    def test_non_linear_fallback(self):
+        context.loop_acceleration = 1
+        expr = BinaryArithExpr(operators.MULTIPLY_OP, self.x, self.x)
+        info = fixpoint_eval(self._fix_expr(expr), self.state)
+        self.assertEqual(info['path'], 'normal')
+
+
+class TestBatchArithmeticEvaluator(unittest.TestCase):
+    def setUp(self):
+        context.take_snapshot()
+        context.precision = 'single'
+        context.interval_backend = 'float'
+        self.x = Variable('x', float_type)
+        self.y = Variable('y', float_type)
+        self.n = Variable('n', int_type)
+        rand = random.Random(0)
+        self.states = []
+        for i in range(20):
+            x = rand.uniform(-2, 2)
+            y = rand.uniform(0.5, 3)
+            if i % 2:
+                x = ErrorSemantics(x, [-1e-6, 1e-6])
+                y = ErrorSemantics(y)
+            else:
+                x = ErrorSemantics([x, x + 1], [0, 1e-7])
+                y = ErrorSemantics([y, y + 1])
+            self.states.append(BoxState({self.x: x, self.y: y, self.n: i}))
+        self.states.append(BoxState({
+            self.x: ErrorSemantics(top=True), self.y: 1.0, self.n: 1}))
+
+    def tearDown(self):
+        context.restore_snapshot()
+
+    def _assert_batch_equal(self, expr):
+        values = batch_arith_eval(expr, self.states)
+        test_values = [arith_eval(expr, state) for state in self.states]
+        self.assertEqual(test_values, values)
+
+    def test_BinaryArithExpr(self):
+        for op in [operators.ADD_OP, operators.SUBTRACT_OP,
+                   operators.MULTIPLY_OP, operators.DIVIDE_OP]:
+            test_expr = BinaryArithExpr(
+                op, BinaryArithExpr(operators.MULTIPLY_OP, self.x, self.n),
+                BinaryArithExpr(operators.ADD_OP, self.y, self.x))
+            self._assert_batch_equal(test_expr)
+
+    def test_integer_interval_coercion(self):
+        self.states = [
+            BoxState({
+                self.x: state[self.x], self.y: state[self.y],
+                self.n: IntegerInterval([i - 3, i + 1])})
+            for i, state in enumerate(self.states)]
+        for op in [operators.ADD_OP, operators.MULTIPLY_OP,
+                   operators.DIVIDE_OP]:
+            self._assert_batch_equal(BinaryArithExpr(op, self.n, self.y))
+            self._assert_batch_equal(BinaryArithExpr(op, self.y, self.n))
+
+    def test_UnaryArithExpr(self):
+        test_expr = UnaryArithExpr(
+            operators.UNARY_SUBTRACT_OP,
+            BinaryArithExpr(operators.MULTIPLY_OP, self.n, self.n))
+        self._assert_batch_equal(test_expr)
+
+    def test_MetaState(self):
+        meta_state = MetaState({
+            self.x: BinaryArithExpr(operators.ADD_OP, self.x, self.y),
+            self.n: BinaryArithExpr(
+                operators.SUBTRACT_OP, self.n, IntegerInterval(1)),
+        })
+        self._assert_batch_equal(meta_state)
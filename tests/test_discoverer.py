@@ -7,7 +7,7 @@ from soap.parser import parse
 from soap.semantics.state.box import BoxState
 from soap.semantics.state.meta import flow_to_meta_state
 from soap.semantics.functions.arithmetic import arith_eval
-from soap.semantics.functions.fixpoint import unroll_fix_expr
+from soap.semantics.functions.fixpoint import fixpoint_eval, unroll_fix_expr
 
 
 class TestUnroller(unittest.TestCase):
@@ -61,6 +61,27 @@ class TestUnroller(unittest.TestCase):
                     arith_eval(fix_expr, inputs),
                     arith_eval(unrolled_expr, inputs))
 
+    def test_unrolled_fixpoint(self):
+        program = """
+        #pragma soap output x
+        float x = 1.0;
+        for (int i = 0; i < 9; i++)
+            x = x + 2.0;
+        """
+        x = Variable('x', float_type)
+        fix_expr = flow_to_meta_state(parse(program))[x]
+        unrolled = list(unroll_fix_expr(fix_expr, 2))
+        # 9 iterations unrolled by 3 has no epilogue
+        loop_expr = unrolled[2]
+        self.assertIs(unrolled[0], loop_expr.unroll_origin)
+        with context.local(fast_factor=0, loop_acceleration=0):
+            state = arith_eval(fix_expr.init_state, BoxState(bottom=True))
+            info = fixpoint_eval(loop_expr, state)
+            origin_info = fixpoint_eval(unrolled[0], state)
+        self.assertEqual('unrolled', info['path'])
+        self.assertEqual(3, info['trip_count'])
+        self.assertEqual(origin_info['exit'][x], info['exit'][x])
+
 
 class TestDiscoverer(unittest.TestCase):
     pass
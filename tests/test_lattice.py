@@ -1,5 +1,7 @@
+import random
 import unittest
 
+from soap.common.hamt import PersistentMap
 from soap.lattice import Lattice
 
 
@@ -23,3 +25,67 @@ class TestLattice(unittest.TestCase):
         self.assertIs(self.top >= self.bottom, True)
         self.assertIs(self.top <= self.top, True)
         self.assertIs(self.top >= self.top, True)
+
+
+class _Collide(object):
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, _Collide) and self.value == other.value
+
+    def __hash__(self):
+        return self.value % 3
+
+
+class TestPersistentMap(unittest.TestCase):
+    """Unittesting for :class:`soap.common.hamt.PersistentMap`."""
+    def test_updates(self):
+        rand = random.Random(0)
+        mapping, reference = PersistentMap(), {}
+        for _ in range(2000):
+            key = rand.randrange(300)
+            if key in reference and rand.random() < 0.3:
+                mapping = mapping.delete(key)
+                del reference[key]
+            else:
+                mapping = mapping.set(key, -key)
+                reference[key] = -key
+            self.assertEqual(len(mapping), len(reference))
+        self.assertEqual(dict(mapping.items()), reference)
+        self.assertEqual(hash(mapping), hash(PersistentMap(reference)))
+
+    def test_persistence(self):
+        mapping = PersistentMap({'a': 1, 'b': 2})
+        other = mapping.merge({'b': 3, 'c': 4})
+        self.assertEqual(dict(mapping.items()), {'a': 1, 'b': 2})
+        self.assertEqual(dict(other.items()), {'a': 1, 'b': 3, 'c': 4})
+        self.assertIs(mapping.set('a', 1), mapping)
+        self.assertNotEqual(mapping, other)
+
+    def test_collisions(self):
+        keys = [_Collide(i) for i in range(10)]
+        mapping = PersistentMap((k, k.value) for k in keys)
+        for k in keys:
+            self.assertEqual(mapping[_Collide(k.value)], k.value)
+        mapping = mapping.delete(_Collide(4))
+        self.assertNotIn(_Collide(4), mapping)
+        self.assertEqual(len(mapping), 9)
+
+    def test_changes(self):
+        mapping = PersistentMap((i, str(i)) for i in range(100))
+        other = mapping.merge({3: 'a', 70: 'b'})
+        self.assertEqual(
+            sorted(mapping.changes(other)), [(3, '3', 'a'), (70, '70', 'b')])
+        self.assertEqual(mapping.changes(mapping), [])
+
+    def test_any_value(self):
+        mapping = PersistentMap((i, i) for i in range(100))
+        negative = lambda value: value < 0
+        self.assertFalse(mapping.any_value(negative))
+        other = mapping.set(42, -1)
+        self.assertTrue(other.any_value(negative))
+        self.assertFalse(mapping.any_value(negative))
+        self.assertFalse(other.set(42, 1).any_value(negative))
+        self.assertIsNone(mapping.changes(other.set(100, '100')))
+        self.assertIsNone(mapping.changes(other.delete(3).set(100, '100')))
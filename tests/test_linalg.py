@@ -1,8 +1,11 @@
 import itertools
 import unittest
 
-from soap.semantics.error import IntegerInterval
-from soap.semantics.linalg import IntegerIntervalArray as IntArray
+from soap.context import context
+from soap.semantics.error import ErrorSemantics, IntegerInterval
+from soap.semantics.linalg import (
+    ErrorSemanticsArray, IntegerIntervalArray as IntArray
+)
 
 
 class TestIntArray(unittest.TestCase):
@@ -59,6 +62,19 @@ class TestIntArray(unittest.TestCase):
              [bot, bot, bot]])
         self.assertEqual(self.matrix & other_matrix, meet_test_matrix)
 
+    def test_update_copy_on_write(self):
+        mat = self.matrix.update(([0, 2], 0), IntegerInterval([0, 1]))
+        self.assertEqual(self.matrix[0, 0], IntegerInterval([1, 5]))
+        self.assertEqual(mat[0, 0], IntegerInterval([0, 5]))
+        self.assertEqual(mat[[0, 2], 0], IntegerInterval([0, 9]))
+
+    def test_widen(self):
+        other_matrix = self.matrix.update((0, 0), [0, 5])
+        widened = self.matrix.widen(other_matrix)
+        self.assertEqual(
+            widened[0, 0], IntegerInterval([-float('inf'), 5]))
+        self.assertEqual(widened[1, 1], self.matrix[1, 1])
+
     def test_to_nested_list(self):
         nested_list = self.matrix.to_nested_list()
         self.assertEqual(nested_list, self.matrix_values)
@@ -68,3 +84,99 @@ class TestIntArray(unittest.TestCase):
         matrix = IntArray([[1, 2], [3, 4], [5, 6]])
         transpose_test_matrix = IntArray([[1, 3, 5], [2, 4, 6]])
         self.assertEqual(matrix.transpose(), transpose_test_matrix)
+
+
+class TestErrorSemanticsArray(unittest.TestCase):
+    def setUp(self):
+        self.top = ErrorSemantics(top=True)
+        self.bottom = ErrorSemantics(bottom=True)
+        self.values = [
+            ErrorSemantics([1, 2], [0, 1e-3]), self.top, self.bottom,
+            ErrorSemantics(3)]
+        self.array = ErrorSemanticsArray(self.values)
+
+    def test_items(self):
+        self.assertListEqual(self.values, list(self.array))
+
+    def test_join_and_meet(self):
+        other = ErrorSemanticsArray([
+            ErrorSemantics([2, 4]), self.bottom,
+            ErrorSemantics([5, 6]), ErrorSemantics(4)])
+        for func in [lambda x, y: x | y, lambda x, y: x & y]:
+            test_values = [
+                func(x, y) for x, y in zip(self.values, other)]
+            self.assertListEqual(test_values, list(func(self.array, other)))
+
+    def test_scale(self):
+        array = self.array.scale(3)
+        self.assertEqual(
+            array[0], ErrorSemantics(self.values[0].v * 3, [0, 3e-3]))
+        self.assertEqual(array[1], self.top)
+        self.assertEqual(array[2], self.bottom)
+
+
+class TestSegmentedArray(unittest.TestCase):
+    def setUp(self):
+        context.take_snapshot()
+        context.array_segments = 4
+        self.array = IntArray.segmented(IntegerInterval(0), (10, ))
+
+    def tearDown(self):
+        context.restore_snapshot()
+
+    def _dense(self, array):
+        return IntArray(list(array))
+
+    def test_update(self):
+        array = self.array.update(2, IntegerInterval(5))
+        self.assertEqual(array.cuts, ((0, 2, 3, 10), ))
+        self.assertEqual(array[2], IntegerInterval(5))
+        self.assertEqual(array[3], IntegerInterval(0))
+        array = array.update(IntegerInterval([3, 6]), IntegerInterval(7))
+        self.assertEqual(
+            array[IntegerInterval([4, 5])], IntegerInterval([0, 7]))
+        self.assertEqual(
+            array[IntegerInterval([0, 2])], IntegerInterval([0, 5]))
+        array = array.update(IntegerInterval([3, 6]), IntegerInterval(0))
+        self.assertEqual(array.cuts, ((0, 2, 3, 7, 10), ))
+        self.assertEqual(self.array.update(2, IntegerInterval(0)), self.array)
+
+    def test_hash(self):
+        dense = IntArray([IntegerInterval(0)] * 10)
+        self.assertEqual(self.array, dense)
+        self.assertEqual(hash(self.array), hash(dense))
+        array = self.array.update(2, IntegerInterval(5))
+        self.assertEqual(hash(array), hash(self._dense(array)))
+        self.assertEqual(len({self.array, dense}), 1)
+        # arrays with the same join of items
+        self.assertNotEqual(
+            hash(IntArray([0, 1])), hash(IntArray([1, 0])))
+
+    def test_segment_limit(self):
+        array = self.array
+        dense = self._dense(array)
+        for i in range(10):
+            array = array.update(i, IntegerInterval(i))
+            dense = dense.update(i, IntegerInterval(i))
+        self.assertLessEqual(len(array.cuts[0]) - 1, 4)
+        self.assertTrue(dense <= self._dense(array))
+
+    def test_join_and_meet(self):
+        array = self.array.update(IntegerInterval([0, 4]), IntegerInterval(1))
+        other = self.array.update(IntegerInterval([3, 7]), IntegerInterval(2))
+        dense, other_dense = self._dense(array), self._dense(other)
+        self.assertEqual(self._dense(array | other), dense | other_dense)
+        self.assertEqual(self._dense(array & other), dense & other_dense)
+        self.assertEqual(array | dense, array)
+        self.assertTrue(array <= array | other)
+        self.assertFalse(array | other <= array)
+
+    def test_matrix(self):
+        matrix = ErrorSemanticsArray.segmented(ErrorSemantics(1), (4, 5))
+        value = ErrorSemantics([2, 3])
+        matrix = matrix.update((IntegerInterval([1, 2]), 3), value)
+        self.assertEqual(matrix[1, 3], ErrorSemantics([1, 3]))
+        self.assertEqual(
+            matrix[0, IntegerInterval([0, 4])], ErrorSemantics(1))
+        self.assertEqual(
+            matrix.to_nested_list()[2][3], ErrorSemantics([1, 3]))
@@ -1,9 +1,12 @@
+import operator
+import pickle
 import unittest
 
 from soap.context import context
 from soap.semantics import (
     inf, mpq, mpfr, ulp, FloatInterval, IntegerInterval, ErrorSemantics
 )
+from soap.semantics.error import round_off_error
 
 
 def setUp():
@@ -35,6 +38,20 @@ class TestFoundation(unittest.TestCase):
         self.assertLess(one, one + eps)
         self.assertGreater(one, one - eps)
 
+    def test_ulp_table(self):
+        self.assertEqual(
+            ulp(mpfr(3), underflow=False), ulp(2, underflow=False))
+        self.assertEqual(ulp(mpq('1/3')), ulp(mpfr(1) / 3))
+        self.assertEqual(ulp(-5), ulp(5))
+        self.assertEqual(ulp(mpfr('Inf')), inf)
+        self.assertGreater(ulp(0), 0)
+        one_ulp = ulp(1)
+        with context.local(precision=100):
+            self.assertLess(ulp(1), one_ulp)
+        self.assertEqual(
+            round_off_error(FloatInterval([-3, 2])),
+            FloatInterval([-ulp(3) / 2, ulp(3) / 2]))
+
 
 class TestInterval(unittest.TestCase):
     """Unittesting for :class:`soap.semantics.FloatInterval`."""
@@ -54,6 +71,17 @@ class TestInterval(unittest.TestCase):
         self.assertEqual(self.top + self.int14, self.top)
         self.assertEqual(self.int14 + self.top, self.top)
 
+    def test_construction(self):
+        for value in [self.top, self.bottom, self.int14]:
+            self.assertEqual(pickle.loads(pickle.dumps(value)), value)
+            self.assertEqual(hash(FloatInterval(value)), hash(value))
+        self.assertEqual(str(self.top), '⊤')
+        self.assertNotEqual(self.int14, IntegerInterval([1, 4]))
+        self.assertIsNot(FloatInterval([1, 4]), self.int14)
+        with context.local(intern_values=True):
+            self.assertIs(FloatInterval([1, 4]), FloatInterval([1, 4]))
+            self.assertIsNot(FloatInterval(0.0), FloatInterval(-0.0))
+
     def test_operators(self):
         self.assertEqual(self.int14 + self.int29, FloatInterval([3, 13]))
         self.assertEqual(self.int14 - self.int29, FloatInterval([-8, 2]))
@@ -136,6 +164,14 @@ class TestErrorSemantics(ErrorAssertionTestCase):
             self.assertEqual(e.e.min, 0)
             self.assertEqual(e.e.max, 0)
 
+    def test_construction(self):
+        for value in [self.top, self.bottom, self.e1]:
+            self.assertEqual(pickle.loads(pickle.dumps(value)), value)
+            self.assertEqual(hash(ErrorSemantics(value)), hash(value))
+        self.assertEqual(
+            ErrorSemantics([-inf, inf], [0, 0]), ErrorSemantics(top=True))
+        self.assertNotEqual(self.e12, ErrorSemantics(['1.0', '2.0'], 1))
+
     def test_top_and_bottom(self):
         self.assertEqual(self.top, ErrorSemantics([-inf, inf]))
         self.assertEqual(self.top, ErrorSemantics([-inf, inf], [-inf, inf]))
@@ -243,3 +279,58 @@ class TestCoercion(ErrorAssertionTestCase):
             lambda x, y: x > y,
             lambda x, y: x != y,
         ], self.interval_tests)
+
+
+class TestFloatBackend(unittest.TestCase):
+    """Unittesting for the hardware double interval backend."""
+    def setUp(self):
+        context.take_snapshot()
+        context.precision = 'single'
+        context.interval_backend = 'float'
+
+    def tearDown(self):
+        context.restore_snapshot()
+
+    def test_outward_rounding(self):
+        a = FloatInterval(['0.1', '0.3'])
+        b = FloatInterval(['0.7', '1.1'])
+        self.assertIs(type(a.min), float)
+        for r, f in [(a + b, operator.add), (a - b, operator.sub),
+                     (a * b, operator.mul), (a / b, operator.truediv)]:
+            for x in (a.min, a.max):
+                for y in (b.min, b.max):
+                    self.assertIn(f(mpq(x), mpq(y)), r)
+
+    def test_bounds_in_precision(self):
+        a = FloatInterval([1.2345678, 1.2345678])
+        self.assertEqual(a.min, float(mpfr(1.2345678)))
+        b = a * FloatInterval([3.4567891, 3.4567891])
+        for v in (b.min, b.max):
+            self.assertEqual(v, float(mpfr(v)))
+        self.assertLess(b.min, b.max)
+
+    def test_exact_operations_do_not_widen(self):
+        a = FloatInterval([1, 2])
+        self.assertEqual(a + a, FloatInterval([2, 4]))
+        self.assertEqual(a * a, FloatInterval([1, 4]))
+        self.assertEqual(a / FloatInterval([2, 2]), FloatInterval([0.5, 1]))
+
+    def test_ulp(self):
+        values = [1, mpq('0.3'), mpfr('1e-30'), mpfr('3.4e38'), 0]
+        float_ulps = [ulp(v) for v in values]
+        context.interval_backend = 'mpfr'
+        for v, u in zip(values, float_ulps):
+            self.assertLessEqual(ulp(v, underflow=False), u)
+            self.assertLessEqual(u, ulp(v))
+
+    def test_error_semantics(self):
+        e = ErrorSemantics(['1.2', '2.3'], ['0', '0.1']) * ErrorSemantics(
+            '3.4') + ErrorSemantics(['-0.5', '0.5'])
+        context.interval_backend = 'mpfr'
+        f = ErrorSemantics(['1.2', '2.3'], ['0', '0.1']) * ErrorSemantics(
+            '3.4') + ErrorSemantics(['-0.5', '0.5'])
+        self.assertAlmostEqual(e.e.max, f.e.max, places=6)
+        self.assertLessEqual(e.e.min, f.e.min)
+        self.assertGreaterEqual(e.e.max, f.e.max)
+        self.assertLessEqual(e.v.min, f.v.min)
+        self.assertGreaterEqual(e.v.max, f.v.max)
@@ -14,7 +14,7 @@ from soap.semantics.label import Label
 from soap.semantics.schedule.distance import (
     dependence_vector, dependence_distance, ISLIndependenceException
 )
-from soap.semantics.schedule.common import schedule_graph
+from soap.semantics.schedule.common import affine_form, schedule_graph
 from soap.semantics.schedule.graph import (
     LoopScheduleGraph, SequentialScheduleGraph
 )
@@ -84,6 +84,42 @@ class TestDependenceCheck(unittest.TestCase):
         self.assertEqual(dist_vect, (1, ))
 
 
+class TestAffineForm(unittest.TestCase):
+    def setUp(self):
+        self.x = Variable('x', dtype=int_type)
+        self.y = Variable('y', dtype=int_type)
+
+    def test_affine(self):
+        # 2 * (x - y) + -(1 - y * 3)
+        expr = expression_factory(
+            operators.ADD_OP,
+            expression_factory(
+                operators.MULTIPLY_OP, IntegerInterval(2),
+                expression_factory(operators.SUBTRACT_OP, self.x, self.y)),
+            expression_factory(
+                operators.UNARY_SUBTRACT_OP,
+                expression_factory(
+                    operators.SUBTRACT_OP, IntegerInterval(1),
+                    expression_factory(
+                        operators.MULTIPLY_OP, self.y, IntegerInterval(3)))))
+        self.assertEqual(affine_form(expr), (-1, ((self.x, 2), (self.y, 1))))
+
+    def test_cancelled_variable(self):
+        expr = expression_factory(
+            operators.SUBTRACT_OP,
+            expression_factory(operators.ADD_OP, self.x, IntegerInterval(1)),
+            self.x)
+        self.assertEqual(affine_form(expr), (1, ()))
+
+    def test_non_affine(self):
+        product = expression_factory(operators.MULTIPLY_OP, self.x, self.y)
+        self.assertIsNone(affine_form(product))
+        quotient = expression_factory(
+            operators.DIVIDE_OP, self.x, IntegerInterval(2))
+        self.assertIsNone(affine_form(quotient))
+        self.assertIsNone(affine_form(IntegerInterval([0, 1])))
+
+
 class _CommonMixin(unittest.TestCase):
     def setUp(self):
         context.take_snapshot()
@@ -1,13 +1,26 @@
+import json
 import nose
+import os
+import pickle
+import tempfile
 import unittest
 
-from soap.analysis.core import Analysis
+from soap.analysis.core import Analysis, AnalysisResult
+from soap.common.budget import budget_incomplete, TimeBudget, time_budget
+from soap.common.trace import trace, trace_span
 from soap.context import context
-from soap.expression import Expression, operators
+from soap.datatype import float_type
+from soap.expression import canonicalize, Expression, operators, Variable
 from soap.parser import expr_parse, parse
 from soap.semantics import BoxState, flow_to_meta_state, label
 from soap.transformer import arithmetic, pattern
-from soap.transformer.partition import partition_optimize
+from soap.transformer.checkpoint import Checkpoint
+from soap.transformer.discover import BaseDiscoverer, GreedyDiscoverer
+from soap.transformer.evolve import EvolutionarySearch, fingerprint
+from soap.transformer.partition import PartitionLabel, partition_optimize
+from soap.transformer.statistics import (
+    clear_rule_statistics, record_frontier, rule_statistics
+)
 from soap.transformer.utils import parsings, reduce
 from soap.transformer.linalg import linear_algebra_simplify
 
@@ -121,6 +134,199 @@ class TestArithTreeTransformer(unittest.TestCase):
         }
         self.assertEqual(f, g)
 
+    def test_canonical_order(self):
+        e = canonicalize(expr_parse('(b + a) * c + (d < a ? a * b : c)'))
+        for f in ['c * (a + b) + (d < a ? b * a : c)',
+                  '(d < a ? a * b : c) + (a + b) * c']:
+            self.assertEqual(pickle.dumps(e), pickle.dumps(
+                canonicalize(expr_parse(f))))
+        # parenthesization is kept
+        e = expr_parse('(a + b) + c')
+        self.assertNotEqual(
+            canonicalize(e), canonicalize(expr_parse('a + (b + c)')))
+        # closure only generates canonical expressions
+        for f in parsings(expr_parse('a + b + c + d')):
+            self.assertIs(canonicalize(f), f)
+
+    def test_time_budget(self):
+        e = expr_parse('a + b + c + d')
+        with time_budget(0):
+            f = parsings(e)
+        self.assertEqual(f, {e})
+
+
+class TestTimeBudget(unittest.TestCase):
+    def test_split(self):
+        budget = TimeBudget(100)
+        split = budget.split(4)
+        self.assertLessEqual(split.remaining(), 25)
+        self.assertGreater(split.remaining(), 24)
+        self.assertEqual(TimeBudget().split(4).remaining(), float('inf'))
+
+    def test_expire(self):
+        budget = TimeBudget()
+        split = budget.split(2).split(2)
+        self.assertFalse(budget.exceeded())
+        split.expire()
+        self.assertTrue(budget.exceeded())
+        self.assertTrue(budget.split(2).exceeded())
+        self.assertEqual(budget.split(2).remaining(), 0)
+
+    def test_incomplete(self):
+        with time_budget(100) as budget:
+            with time_budget(100):
+                pass
+            self.assertFalse(budget_incomplete())
+            # a task whose budget runs out leaves its parent incomplete
+            with time_budget(0):
+                pass
+            self.assertFalse(budget.exceeded())
+            self.assertTrue(budget_incomplete())
+
+    def test_truncated_frontier_uncached(self):
+        context.take_snapshot()
+        context.multiprocessing = False
+        self.addCleanup(context.restore_snapshot)
+        discover = GreedyDiscoverer()
+        a, b, c = (Variable(name, float_type) for name in 'abc')
+        expr = a + b + c
+        state = BoxState(a=[1.0, 2.0], b=[2.0, 3.0], c=[3.0, 4.0])
+        cache_info = BaseDiscoverer.__call__.cache_info
+        BaseDiscoverer.__call__.cache_clear()
+        with time_budget(0):
+            discover(expr, state)
+        self.assertEqual(cache_info()[2], 0)
+        discover(expr, state)
+        self.assertGreater(cache_info()[2], 0)
+
+
+class TestTrace(unittest.TestCase):
+    def test_trace(self):
+        file_name = os.path.join(tempfile.mkdtemp(), 'trace.json')
+        with trace(file_name):
+            with trace_span('outer', size=1):
+                parsings(expr_parse('a * b * c'))
+        with open(file_name) as f:
+            events = json.load(f)['traceEvents']
+        spans = {}
+        for event in events:
+            if event['ph'] == 'X':
+                spans.setdefault(event['name'], []).append(event)
+        outer = spans['outer'].pop()
+        self.assertEqual(outer['args'], {'size': 1})
+        # spans of walks in workers are merged and nested in time
+        for event in spans['closure step'] + spans['walk']:
+            self.assertGreaterEqual(event['ts'], outer['ts'])
+            self.assertLessEqual(
+                event['ts'] + event['dur'], outer['ts'] + outer['dur'])
+        self.assertIn('process_name', {e['name'] for e in events})
+        # nothing is traced outside
+        with trace_span('ignored'):
+            pass
+        with trace(file_name):
+            pass
+        with open(file_name) as f:
+            events = json.load(f)['traceEvents']
+        self.assertEqual([e for e in events if e['ph'] == 'X'], [])
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+
+    def label(self, label_value):
+        return PartitionLabel(
+            expr_parse('a * b'), None, None, 'test_checkpoint', label_value)
+
+    def test_resume(self):
+        old_label, new_label = self.label(1001), self.label(1002)
+        key = (expr_parse('a + b'), old_label)
+        value = {AnalysisResult(1, 2, 3, 4, expr_parse('a + b') + old_label)}
+        ckpt = Checkpoint(self.state_dir, 'config')
+        ckpt.store('test', key, value)
+        ckpt.close()
+
+        ckpt = Checkpoint(self.state_dir, 'other config')
+        self.assertFalse(ckpt.resume())
+        self.assertIsNone(ckpt.load('test', key))
+
+        ckpt = Checkpoint(self.state_dir, 'config')
+        self.assertTrue(ckpt.resume())
+        self.assertEqual(ckpt.load('test', key), value)
+        # labels of the same expressions are numbered differently on resume
+        key = (expr_parse('a + b'), new_label)
+        result = ckpt.load('test', key).pop()
+        self.assertEqual(result.expression, expr_parse('a + b') + new_label)
+        self.assertIsNone(ckpt.load('test', (expr_parse('a - b'), new_label)))
+
+
+class TestRuleStatistics(unittest.TestCase):
+    def setUp(self):
+        context.take_snapshot()
+        context.multiprocessing = False
+        context.rule_statistics = True
+        clear_rule_statistics()
+
+    def tearDown(self):
+        context.restore_snapshot()
+        clear_rule_statistics()
+
+    def test_statistics(self):
+        results = parsings(expr_parse('w + x + y + z'))
+        stats = rule_statistics()['associativity_addition']
+        self.assertGreater(stats['attempts'], 0)
+        self.assertGreater(stats['matches'], 0)
+        self.assertGreaterEqual(stats['discovered'], stats['new'])
+        self.assertGreater(stats['new'], 0)
+        self.assertEqual(stats['frontier'], 0)
+        record_frontier(results)
+        stats = rule_statistics()['associativity_addition']
+        self.assertGreater(stats['frontier'], 0)
+        self.assertLessEqual(stats['frontier'], len(results))
+
+
+class TestEvolutionarySearch(unittest.TestCase):
+    def setUp(self):
+        context.take_snapshot()
+        context.multiprocessing = False
+        a, b, c = (Variable(n, float_type) for n in 'abc')
+        self.expr = (a + b) * (a + c) + a * (b - c)
+        self.state = BoxState(a=[1.0, 2.0], b=[0.0, 3.0], c=[2.0, 4.0])
+
+    def tearDown(self):
+        context.restore_snapshot()
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint(expr_parse('(a + b) * c - 2 * a')),
+            fingerprint(expr_parse('b * c + (c - 1 - 1) * a')))
+        self.assertNotEqual(
+            fingerprint(expr_parse('(a + b) * c')),
+            fingerprint(expr_parse('(a + c) * b')))
+
+    def test_crossover(self):
+        search = EvolutionarySearch(self.state)
+        expr = expr_parse('(a + b) * c + d')
+        other_expr = expr_parse('(a * c + b * c) + d')
+        self.assertEqual(search.crossover(expr, other_expr), other_expr)
+        self.assertEqual(
+            search.crossover(expr, expr_parse('a + b')), expr)
+
+    def test_search(self):
+        search = EvolutionarySearch(
+            self.state, population_size=8, evaluations=30)
+        results = search(self.expr)
+        self.assertLessEqual(len(search.results), 30)
+        self.assertGreater(len(search.results), 8)
+        original = Analysis({self.expr}, self.state).analyze().pop()
+        for result in results:
+            self.assertEqual(
+                fingerprint(result.expression), fingerprint(self.expr))
+            # no result on the frontier is dominated by the original
+            if result.stats() != original.stats():
+                self.assertTrue(any(
+                    r < o for r, o in zip(result.stats(), original.stats())))
+
 
 class TestLinearAlgebraSimplifier(unittest.TestCase):
     def test_simple(self):